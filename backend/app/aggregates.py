@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import random
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from google.cloud import firestore
+
+
+SEVERITIES = ("high", "medium", "low")
+UNKNOWN_AREA = "Unknown"
+
+# Fields read from detection documents when (re)computing aggregates
+AGGREGATE_FIELDS = ["area", "severity", "status", "priority_score", "createdAt"]
+
+
+def _area_name(data: Dict[str, Any]) -> str:
+    return data.get("area") or UNKNOWN_AREA
+
+
+def _area_doc_id(area: str) -> str:
+    # Firestore document IDs cannot contain '/'
+    return area.replace("/", "_")
+
+
+def _shard_doc_id(base: str, shards: int) -> str:
+    """A random counter shard of the aggregate document `base` (the document itself with one shard)."""
+    return base if shards <= 1 else f"{base}#{random.randrange(shards)}"
+
+
+def _contribution(data: Dict[str, Any], sign: int = 1) -> Dict[str, int]:
+    """Counters a single detection document contributes to its area aggregate."""
+    severity = data.get("severity")
+    if severity not in SEVERITIES:
+        severity = "low"
+    repaired = data.get("status", "reported") == "repaired"
+    return {
+        "count": sign,
+        severity: sign,
+        "repaired": sign if repaired else 0,
+        "pending": 0 if repaired else sign,
+        "priority_sum": sign * int(data.get("priority_score") or 0),
+    }
+
+
+def _empty_stats() -> Dict[str, int]:
+    return {"count": 0, "high": 0, "medium": 0, "low": 0, "repaired": 0, "pending": 0, "priority_sum": 0}
+
+
+class AreaAggregates:
+    """Per-area aggregate documents maintained incrementally alongside detection writes.
+
+    Business:
+    - `/v1/analytics/by-area` reads one small document per area instead of scanning every detection,
+      so dashboard loads cost O(areas) reads regardless of collection size.
+
+    Operations:
+    - Writers call `on_create` / `on_update` / `on_delete` with the same batch or transaction
+      that writes the detection, so the aggregate and the record commit atomically.
+    - Counters use server-side `Increment`, so concurrent writers never lose updates.
+    - Each area is split over `shards` counter documents (`<area>#<n>`, one picked at random per
+      write) that `read_all` sums: a single document sustains only about one write per second, and
+      every upload in a busy area would otherwise contend on it.
+    - `rebuild` recomputes every area from the detections collection for drift repair
+      (see `scripts/rebuild_aggregates.py`). Run it during low traffic: writes that land mid-rebuild
+      may be counted twice or not at all until the next rebuild.
+    """
+
+    def __init__(self, client: Any, collection: str, shards: int = 1) -> None:
+        self._client = client
+        self._collection = client.collection(collection)
+        self.shards = shards
+
+    def _apply(self, writer: Any, area: str, counters: Dict[str, int]) -> None:
+        increments = {k: firestore.Increment(v) for k, v in counters.items() if v}
+        if not increments:
+            return
+        writer.set(
+            self._collection.document(_shard_doc_id(_area_doc_id(area), self.shards)),
+            {"area": area, **increments, "updatedAt": firestore.SERVER_TIMESTAMP},
+            merge=True,
+        )
+
+    def on_create(self, writer: Any, data: Dict[str, Any]) -> None:
+        self._apply(writer, _area_name(data), _contribution(data, +1))
+
+    def on_delete(self, writer: Any, data: Dict[str, Any]) -> None:
+        self._apply(writer, _area_name(data), _contribution(data, -1))
+
+    def on_status_change(self, writer: Any, data: Dict[str, Any], new_status: str) -> None:
+        """`data` is the document as it was before the status update."""
+        self.on_update(writer, data, {**data, "status": new_status})
+
+    def on_update(self, writer: Any, before: Dict[str, Any], after: Dict[str, Any]) -> None:
+        """In-place change of a detection (status, severity or priority; the area is unchanged)."""
+        removed = _contribution(before, -1)
+        added = _contribution(after, +1)
+        delta = {k: removed.get(k, 0) + added.get(k, 0) for k in set(removed) | set(added)}
+        self._apply(writer, _area_name(before), delta)
+
+    def read_all(self) -> List[Dict[str, Any]]:
+        """All area aggregates, summed over their shards (one document read per area shard)."""
+        totals: Dict[str, Dict[str, int]] = defaultdict(_empty_stats)
+        for doc in self._collection.stream():
+            data = doc.to_dict() or {}
+            stats = totals[data.get("area") or doc.id.split("#")[0]]
+            for k in stats:
+                stats[k] += int(data.get(k) or 0)
+        return [{"area": area, **stats} for area, stats in totals.items() if stats["count"] > 0]
+
+    def rebuild(self, detections: Any, page_size: int = 1000) -> int:
+        """Recompute all area aggregates from scratch (one unsharded document per area, other shards
+        deleted). Returns the number of areas written."""
+        totals = compute_area_stats(stream_projection(detections, page_size))
+
+        replace_collection(
+            self._client,
+            self._collection,
+            {_area_doc_id(area): {"area": area, **stats} for area, stats in totals.items()},
+        )
+        return len(totals)
+
+
+def replace_collection(client: Any, collection: Any, docs: Dict[str, Dict[str, Any]]) -> None:
+    """Overwrite `collection` with `docs` (doc ID -> data), deleting documents not in `docs`."""
+    existing = {doc.id for doc in collection.select([]).stream()}
+    batch = client.batch()
+    ops = 0
+    writes = [(doc_id, data) for doc_id, data in docs.items()]
+    writes += [(doc_id, None) for doc_id in existing - set(docs)]
+    for doc_id, data in writes:
+        if data is None:
+            batch.delete(collection.document(doc_id))
+        else:
+            batch.set(collection.document(doc_id), {**data, "updatedAt": firestore.SERVER_TIMESTAMP})
+        ops += 1
+        # Firestore batch limit is 500 operations
+        if ops % 500 == 0:
+            batch.commit()
+            batch = client.batch()
+    if ops % 500 != 0:
+        batch.commit()
+
+
+def created_date(value: Any) -> Optional[str]:
+    """UTC calendar day (YYYY-MM-DD) of a stored `createdAt`.
+
+    Records store `createdAt` as an ISO-8601 string (see `_persist_record`), so the date is the
+    first ten characters; no per-row datetime parsing is needed. Native timestamps are also accepted.
+    """
+    if isinstance(value, str) and len(value) >= 10:
+        return value[:10]
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    return None
+
+
+class DailyRollups:
+    """Per-day rollup documents (`YYYY-MM-DD`) backing `/v1/analytics/statistics`.
+
+    Each document holds the detections created that day: `count`, how many of them are `repaired`,
+    and a per-area `areas` count map. A 365-day statistics request reads ~365 small documents
+    instead of every detection in the window. Maintained with the same hooks as `AreaAggregates`;
+    a status change adjusts the rollup of the day the detection was created.
+
+    Every upload of the day increments that day's document, so it is split over `shards` counter
+    documents (`YYYY-MM-DD#<n>`) like the area aggregates; reads sum the shards of each day.
+    """
+
+    def __init__(self, client: Any, collection: str, shards: int = 1) -> None:
+        self._client = client
+        self._collection = client.collection(collection)
+        self.shards = shards
+
+    def _apply(self, writer: Any, day: Optional[str], count: int, repaired: int, area: Optional[str]) -> None:
+        if day is None or (count == 0 and repaired == 0):
+            return
+        data: Dict[str, Any] = {"date": day, "updatedAt": firestore.SERVER_TIMESTAMP}
+        if count:
+            data["count"] = firestore.Increment(count)
+            data["areas"] = {area or UNKNOWN_AREA: firestore.Increment(count)}
+        if repaired:
+            data["repaired"] = firestore.Increment(repaired)
+        writer.set(self._collection.document(_shard_doc_id(day, self.shards)), data, merge=True)
+
+    def on_create(self, writer: Any, data: Dict[str, Any]) -> None:
+        repaired = 1 if data.get("status") == "repaired" else 0
+        self._apply(writer, created_date(data.get("createdAt")), 1, repaired, _area_name(data))
+
+    def on_delete(self, writer: Any, data: Dict[str, Any]) -> None:
+        repaired = -1 if data.get("status") == "repaired" else 0
+        self._apply(writer, created_date(data.get("createdAt")), -1, repaired, _area_name(data))
+
+    def on_status_change(self, writer: Any, data: Dict[str, Any], new_status: str) -> None:
+        self.on_update(writer, data, {**data, "status": new_status})
+
+    def on_update(self, writer: Any, before: Dict[str, Any], after: Dict[str, Any]) -> None:
+        was_repaired = before.get("status") == "repaired"
+        is_repaired = after.get("status") == "repaired"
+        if was_repaired != is_repaired:
+            delta = 1 if is_repaired else -1
+            self._apply(writer, created_date(before.get("createdAt")), 0, delta, None)
+
+    def read_range(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """Rollups for each day in [start, end] that has detections, in date order.
+
+        One range query on `date` reads the shards that exist for the window (at most
+        days x `shards` small documents).
+        """
+        query = (
+            self._collection.where("date", ">=", start.isoformat())
+            .where("date", "<=", end.isoformat())
+        )
+        totals: Dict[str, Dict[str, Any]] = {}
+        for snap in query.stream():
+            data = snap.to_dict() or {}
+            day = data.get("date") or snap.id.split("#")[0]
+            row = totals.setdefault(day, {"date": day, "count": 0, "repaired": 0, "areas": defaultdict(int)})
+            row["count"] += int(data.get("count") or 0)
+            row["repaired"] += int(data.get("repaired") or 0)
+            for area, n in (data.get("areas") or {}).items():
+                row["areas"][area] += int(n or 0)
+        rows = [{**row, "areas": dict(row["areas"])} for row in totals.values() if row["count"] > 0]
+        rows.sort(key=lambda r: r["date"])
+        return rows
+
+    def rebuild(self, detections: Any, page_size: int = 1000) -> int:
+        """Recompute all daily rollups from scratch (one unsharded document per day, other shards
+        deleted). Returns the number of days written."""
+        totals: Dict[str, Dict[str, Any]] = {}
+        for data in stream_projection(detections, page_size):
+            day = created_date(data.get("createdAt"))
+            if day is None:
+                continue
+            row = totals.setdefault(day, {"date": day, "count": 0, "repaired": 0, "areas": defaultdict(int)})
+            row["count"] += 1
+            row["repaired"] += 1 if data.get("status") == "repaired" else 0
+            row["areas"][_area_name(data)] += 1
+
+        replace_collection(
+            self._client,
+            self._collection,
+            {day: {**row, "areas": dict(row["areas"])} for day, row in totals.items()},
+        )
+        return len(totals)
+
+
+def compute_area_stats(docs: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    """Aggregate raw detection dicts per area (full-scan path, used for rebuilds)."""
+    totals: Dict[str, Dict[str, int]] = defaultdict(_empty_stats)
+    for data in docs:
+        stats = totals[_area_name(data)]
+        for k, v in _contribution(data, +1).items():
+            stats[k] += v
+    return dict(totals)
+
+
+def stream_projection(
+    collection: Any,
+    page_size: int,
+    fields: Optional[List[str]] = None,
+    order_by: str = "__name__",
+):
+    """Page through a collection (or filtered query) reading only `fields`.
+
+    Pages are ordered by `order_by` (document ID by default); when the query has a range filter,
+    pass the filtered field so Firestore can serve it from the single-field index.
+    """
+    for doc in stream_snapshots(collection, page_size, fields, order_by):
+        data = doc.to_dict()
+        if data:
+            yield data
+
+
+def stream_snapshots(
+    collection: Any,
+    page_size: int,
+    fields: Optional[List[str]] = None,
+    order_by: str = "__name__",
+):
+    """Like `stream_projection`, but yields the document snapshots (for callers that need IDs)."""
+    query = collection.select(fields or AGGREGATE_FIELDS).order_by(order_by).limit(page_size)
+    last = None
+    while True:
+        page = list((query.start_after(last) if last is not None else query).stream())
+        yield from page
+        if len(page) < page_size:
+            return
+        last = page[-1]
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import ast
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from loguru import logger
+
+
+BACKENDS = ("ultralytics", "onnxruntime", "openvino")
+PRECISIONS = ("fp32", "int8")
+
+# Detections per image kept after NMS (ultralytics default)
+MAX_DETECTIONS = 300
+# Class offset used to run class-aware NMS as a single pass
+_CLASS_OFFSET = 7680.0
+
+
+class InferenceBackend:
+    """A loaded detection model that runs on letterboxed BGR `imgsz x imgsz` uint8 arrays.
+
+    `predict` returns one `(k, 6)` float32 array per input: `x1, y1, x2, y2, confidence, class`
+    in model-input pixels (the same layout as ultralytics `Boxes.data`).
+    """
+
+    name = "base"
+
+    def __init__(self, model_path: str, imgsz: int) -> None:
+        self.model_path = model_path
+        self.imgsz = imgsz
+        self.class_names: List[str] = []
+        self.model_version = Path(model_path.rstrip("/")).stem
+
+    def predict(self, batch: Sequence[np.ndarray], conf: float, iou: float) -> List[np.ndarray]:
+        raise NotImplementedError
+
+
+class UltralyticsBackend(InferenceBackend):
+    """PyTorch weights through the ultralytics runtime (the original serving path)."""
+
+    name = "ultralytics"
+
+    def __init__(self, model_path: str, imgsz: int, intra_op_threads: int = 0, inter_op_threads: int = 0) -> None:
+        super().__init__(model_path, imgsz)
+        from ultralytics import YOLO
+
+        if intra_op_threads > 0 or inter_op_threads > 0:
+            import torch
+
+            if intra_op_threads > 0:
+                torch.set_num_threads(intra_op_threads)
+            if inter_op_threads > 0:
+                torch.set_num_interop_threads(inter_op_threads)
+
+        self._model = YOLO(model_path)
+        names = getattr(self._model.model, "names", None) or getattr(self._model, "names", None)
+        self.class_names = _names_list(names)
+        args = getattr(self._model.model, "args", None) or {}
+        self.model_version = str(args.get("name", "yolov8")) if isinstance(args, dict) else "yolov8"
+
+    def predict(self, batch: Sequence[np.ndarray], conf: float, iou: float) -> List[np.ndarray]:
+        results = self._model.predict(
+            source=list(batch),
+            verbose=False,
+            conf=conf,
+            iou=iou,
+            imgsz=self.imgsz,
+            device="cpu",
+        )
+        outputs = []
+        for r in results:
+            if r.boxes is None:
+                outputs.append(np.empty((0, 6), dtype=np.float32))
+            else:
+                outputs.append(np.asarray(r.boxes.data.cpu().numpy(), dtype=np.float32).reshape(-1, 6))
+        return outputs
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """YOLOv8 exported to ONNX (`scripts/export_model.py`), run with ONNX Runtime on CPU.
+
+    Operations:
+    - Full graph optimizations (constant folding, node fusion) are applied when the session loads.
+    - `intra_op_threads` sets the threads used inside one operator (0 = one per physical core);
+      `inter_op_threads` only matters for parallel execution mode and is otherwise ignored.
+    - Exports with a fixed batch dimension of 1 are run image by image; the export script keeps the
+      batch dimension dynamic by default so micro-batches run in one call.
+    """
+
+    name = "onnxruntime"
+
+    def __init__(self, model_path: str, imgsz: int, intra_op_threads: int = 0, inter_op_threads: int = 0) -> None:
+        super().__init__(model_path, imgsz)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads > 0:
+            options.inter_op_num_threads = inter_op_threads
+
+        self._session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        self._input_dtype = np.float16 if "float16" in model_input.type else np.float32
+        batch_dim = model_input.shape[0]
+        self._fixed_batch = batch_dim if isinstance(batch_dim, int) else None
+        _check_input_size(model_input.shape, imgsz, model_path)
+
+        metadata = self._session.get_modelmeta().custom_metadata_map or {}
+        self.class_names = _names_list(_literal(metadata.get("names")))
+
+    def predict(self, batch: Sequence[np.ndarray], conf: float, iou: float) -> List[np.ndarray]:
+        x = to_model_input(batch, self._input_dtype)
+        if self._fixed_batch == 1 and len(batch) > 1:
+            preds = np.concatenate([self._session.run(None, {self._input_name: x[i:i + 1]})[0] for i in range(len(x))])
+        else:
+            preds = self._session.run(None, {self._input_name: x})[0]
+        return [decode_yolov8(p, conf, iou) for p in preds]
+
+
+class OpenVINOBackend(InferenceBackend):
+    """YOLOv8 exported to OpenVINO IR, compiled for the CPU plugin with a latency hint."""
+
+    name = "openvino"
+
+    def __init__(self, model_path: str, imgsz: int, intra_op_threads: int = 0, inter_op_threads: int = 0) -> None:
+        super().__init__(model_path, imgsz)
+        import openvino as ov
+
+        xml_path = _openvino_xml(model_path)
+        core = ov.Core()
+        model = core.read_model(str(xml_path))
+        config: Dict[str, Any] = {"PERFORMANCE_HINT": "LATENCY"}
+        if intra_op_threads > 0:
+            config["INFERENCE_NUM_THREADS"] = intra_op_threads
+        if inter_op_threads > 0:
+            config["NUM_STREAMS"] = inter_op_threads
+        self._compiled = core.compile_model(model, "CPU", config)
+        self._output = self._compiled.output(0)
+        batch_dim = model.input(0).get_partial_shape()[0]
+        self._fixed_batch = batch_dim.get_length() if batch_dim.is_static else None
+        self.class_names = _names_list(_openvino_names(xml_path.parent))
+
+    def predict(self, batch: Sequence[np.ndarray], conf: float, iou: float) -> List[np.ndarray]:
+        x = to_model_input(batch, np.float32)
+        if self._fixed_batch == 1 and len(batch) > 1:
+            preds = np.concatenate([self._compiled(x[i:i + 1])[self._output] for i in range(len(x))])
+        else:
+            preds = self._compiled(x)[self._output]
+        return [decode_yolov8(p, conf, iou) for p in preds]
+
+
+_BACKEND_CLASSES = {
+    "ultralytics": UltralyticsBackend,
+    "onnxruntime": OnnxRuntimeBackend,
+    "openvino": OpenVINOBackend,
+}
+
+
+def resolve_model_path(backend: str, weights_path: str, override: str = "", precision: str = "fp32") -> str:
+    """Model file for `backend`: the explicit override, or the export next to the `.pt` weights.
+
+    Exports follow the ultralytics naming: `model.onnx` and `model_openvino_model/`. The INT8
+    variant produced by `scripts/quantize_model.py` is `model.int8.onnx` (ONNX Runtime only).
+    """
+    if override:
+        return override
+    precision = precision.lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown inference precision '{precision}' (expected one of {', '.join(PRECISIONS)})")
+    if precision == "int8" and backend != "onnxruntime":
+        raise ValueError("INT8 models are only supported with INFERENCE_BACKEND=onnxruntime")
+    weights = Path(weights_path)
+    if backend == "onnxruntime":
+        suffix = ".int8.onnx" if precision == "int8" else ".onnx"
+        return str(weights.with_suffix(suffix))
+    if backend == "openvino":
+        return str(weights.with_name(f"{weights.stem}_openvino_model"))
+    return weights_path
+
+
+def load_backend(
+    backend: str, model_path: str, imgsz: int, intra_op_threads: int = 0, inter_op_threads: int = 0
+) -> InferenceBackend:
+    backend = backend.lower()
+    if backend not in _BACKEND_CLASSES:
+        raise ValueError(f"Unknown inference backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model not found at {model_path}")
+    loaded = _BACKEND_CLASSES[backend](model_path, imgsz, intra_op_threads, inter_op_threads)
+    logger.info(
+        f"Inference backend '{backend}' loaded from {model_path} "
+        f"(imgsz={imgsz}, intra_op_threads={intra_op_threads or 'auto'})"
+    )
+    return loaded
+
+
+# Pre/post-processing for exported graphs ------------------------------------------------------
+
+
+def to_model_input(batch: Sequence[np.ndarray], dtype: Any = np.float32) -> np.ndarray:
+    """Letterboxed BGR HWC uint8 arrays -> normalized RGB NCHW tensor."""
+    x = np.stack(batch)[..., ::-1].transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(x, dtype=dtype) * dtype(1.0 / 255.0)
+
+
+def decode_yolov8(pred: np.ndarray, conf: float, iou: float, max_det: int = MAX_DETECTIONS) -> np.ndarray:
+    """Decode one raw YOLOv8 head output `(4 + num_classes, anchors)` into `(k, 6)` detections."""
+    pred = np.asarray(pred, dtype=np.float32).T
+    scores = pred[:, 4:]
+    cls = scores.argmax(axis=1)
+    confidence = scores[np.arange(len(scores)), cls]
+    keep = confidence >= conf
+    if not keep.any():
+        return np.empty((0, 6), dtype=np.float32)
+
+    cx, cy, w, h = pred[keep, :4].T
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    confidence = confidence[keep]
+    cls = cls[keep].astype(np.float32)
+
+    selected = nms(boxes + cls[:, None] * _CLASS_OFFSET, confidence, iou)[:max_det]
+    return np.column_stack([boxes[selected], confidence[selected], cls[selected]]).astype(np.float32)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Greedy non-maximum suppression over `x1, y1, x2, y2` boxes. Returns kept indices, best first."""
+    x1, y1, x2, y2 = boxes.T
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    order = scores.argsort()[::-1]
+    keep: List[int] = []
+    while order.size:
+        i = int(order[0])
+        keep.append(i)
+        rest = order[1:]
+        inter_w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = inter_w * inter_h
+        overlap = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[overlap <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+# Helpers ------------------------------------------------------------------------------------------
+
+
+def _names_list(names: Any) -> List[str]:
+    if isinstance(names, dict):
+        return [str(names[k]) for k in sorted(names)]
+    if isinstance(names, (list, tuple)):
+        return [str(n) for n in names]
+    return []
+
+
+def _literal(value: Optional[str]) -> Any:
+    if not value:
+        return None
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return None
+
+
+def _check_input_size(shape: Sequence[Any], imgsz: int, model_path: str) -> None:
+    dims = [d for d in shape[2:] if isinstance(d, int)]
+    if dims and any(d != imgsz for d in dims):
+        raise ValueError(f"{model_path} was exported for input {dims}, but INFERENCE_IMGSZ={imgsz}")
+
+
+def _openvino_xml(model_path: str) -> Path:
+    path = Path(model_path)
+    if path.is_dir():
+        candidates = sorted(path.glob("*.xml"))
+        if not candidates:
+            raise FileNotFoundError(f"No OpenVINO .xml model in {model_path}")
+        return candidates[0]
+    return path
+
+
+def _openvino_names(directory: Path) -> Any:
+    """Class names from the `metadata.yaml` ultralytics writes next to an OpenVINO export."""
+    metadata = directory / "metadata.yaml"
+    if not metadata.exists():
+        return None
+    try:
+        import yaml
+
+        with open(metadata, encoding="utf-8") as fh:
+            return (yaml.safe_load(fh) or {}).get("names")
+    except Exception:
+        return None
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import json
+import posixpath
+import zipfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from .models import BatchItemMetadata
+from .uploads import PayloadTooLarge, UploadBuffer
+
+
+IMAGE_CONTENT_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png"}
+ARCHIVE_METADATA_NAME = "metadata.json"
+
+
+class BatchRequestError(ValueError):
+    """The batch request as a whole is malformed (bad archive, bad metadata document)."""
+
+
+@dataclass
+class BatchItem:
+    """One image of a batch upload and its processing state."""
+
+    index: int
+    filename: str
+    source: Optional[UploadBuffer] = None
+    content_type: str = "image/jpeg"
+    meta: BatchItemMetadata = field(default_factory=BatchItemMetadata)
+    # (HTTP status, detail) once the item has failed; failed items are skipped by later stages
+    error: Optional[Tuple[int, str]] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def fail(self, status_code: int, detail: str) -> None:
+        if self.error is None:
+            self.error = (status_code, detail)
+        self.release()
+
+    def release(self) -> None:
+        """Drop the spooled image once it is no longer needed."""
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+
+
+def _content_type_for(filename: str) -> Optional[str]:
+    return IMAGE_CONTENT_TYPES.get(posixpath.splitext(filename.lower())[1])
+
+
+async def item_from_upload(index: int, upload: Any, max_bytes: int, spool_threshold: int) -> BatchItem:
+    """Wrap one multipart image; an oversized image fails only itself (413)."""
+    filename = upload.filename or f"image-{index}"
+    item = BatchItem(
+        index=index,
+        filename=filename,
+        content_type=upload.content_type or _content_type_for(filename) or "image/jpeg",
+    )
+    try:
+        item.source = await UploadBuffer.from_upload(upload, max_bytes, spool_threshold)
+    except PayloadTooLarge as e:
+        item.fail(e.status_code, str(e.detail))
+    return item
+
+
+def items_from_zip(
+    archive_source: UploadBuffer, max_items: int, max_bytes: int, spool_threshold: int
+) -> Tuple[List[BatchItem], Optional[str]]:
+    """Extract images from a zip archive. Returns (items, embedded metadata.json text or None).
+
+    Entries that are not JPEG/PNG images (directories, macOS resource forks, dotfiles) are ignored.
+    Sizes are checked against both the declared and the actual uncompressed size, so a crafted
+    archive cannot inflate past `max_bytes` per image. Members are spooled like multipart uploads.
+    """
+    reader = archive_source.open()
+    try:
+        archive = zipfile.ZipFile(reader)
+    except zipfile.BadZipFile as e:
+        reader.close()
+        raise BatchRequestError(f"Invalid zip archive: {e}") from e
+
+    items: List[BatchItem] = []
+    embedded_metadata: Optional[str] = None
+    try:
+        with archive:
+            for info in archive.infolist():
+                name = info.filename
+                base = posixpath.basename(name)
+                if info.is_dir() or name.startswith("__MACOSX/") or base.startswith("."):
+                    continue
+                if base == ARCHIVE_METADATA_NAME:
+                    with archive.open(info) as fh:
+                        embedded_metadata = fh.read(max_bytes + 1).decode("utf-8", errors="replace")
+                    continue
+                content_type = _content_type_for(name)
+                if content_type is None:
+                    continue
+                if len(items) >= max_items:
+                    raise BatchRequestError(f"Too many images in archive (max {max_items})")
+
+                item = BatchItem(index=len(items), filename=name, content_type=content_type)
+                items.append(item)
+                if info.file_size > max_bytes:
+                    item.fail(413, "File too large")
+                    continue
+                try:
+                    with archive.open(info) as fh:
+                        item.source = UploadBuffer.from_stream(fh, max_bytes, spool_threshold)
+                except PayloadTooLarge as e:
+                    item.fail(e.status_code, str(e.detail))
+                except (zipfile.BadZipFile, OSError) as e:
+                    item.fail(400, f"Unreadable archive member: {e}")
+    except BaseException:
+        for item in items:
+            item.release()
+        raise
+    finally:
+        reader.close()
+    return items, embedded_metadata
+
+
+def apply_metadata(items: List[BatchItem], raw: Optional[str]) -> None:
+    """Attach per-image metadata from a JSON array.
+
+    Entries are matched by `filename` when the array names files (full archive path or base name),
+    otherwise by position. Invalid entries fail only their own image (422).
+    """
+    if not raw:
+        return
+    try:
+        entries = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise BatchRequestError(f"metadata is not valid JSON: {e.msg}") from e
+    if not isinstance(entries, list):
+        raise BatchRequestError("metadata must be a JSON array")
+
+    by_name = any(isinstance(e, dict) and e.get("filename") for e in entries)
+    if by_name:
+        index: Dict[str, BatchItem] = {}
+        for item in items:
+            index.setdefault(item.filename, item)
+            index.setdefault(posixpath.basename(item.filename), item)
+        pairs: List[Tuple[Optional[BatchItem], Any]] = [
+            (index.get(str(e.get("filename"))) if isinstance(e, dict) else None, e) for e in entries
+        ]
+    else:
+        pairs = list(zip(items, entries))
+
+    for item, entry in pairs:
+        if item is None:
+            continue
+        try:
+            item.meta = BatchItemMetadata.model_validate(entry)
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            item.fail(422, f"Invalid metadata: {errors}")
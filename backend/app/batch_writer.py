@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from google.api_core import exceptions as gexc
+from google.cloud.firestore_v1 import transforms
+from loguru import logger
+
+
+# Firestore batch limit is 500 operations
+MAX_BATCH_OPS = 500
+
+# Errors worth retrying with backoff; anything else (e.g. NotFound on update) fails the batch
+RETRYABLE_ERRORS = (
+    gexc.Aborted,
+    gexc.DeadlineExceeded,
+    gexc.InternalServerError,
+    gexc.ResourceExhausted,
+    gexc.ServiceUnavailable,
+    gexc.TooManyRequests,
+)
+
+# The subset raised before anything was applied. The others are ambiguous: the batch may have
+# committed, so resending it is only safe when applying it twice changes nothing.
+UNAPPLIED_ERRORS = (
+    gexc.Aborted,
+    gexc.ResourceExhausted,
+    gexc.TooManyRequests,
+)
+
+
+@dataclass
+class WriteOp:
+    """One document write: `set` (optionally merged), `create` (fails if the document exists),
+    `update` or `delete`."""
+
+    kind: str
+    ref: Any
+    data: Optional[Dict[str, Any]] = None
+    merge: bool = False
+
+    def apply(self, batch: Any) -> None:
+        if self.kind == "set":
+            batch.set(self.ref, self.data or {}, merge=self.merge)
+        elif self.kind == "create":
+            batch.create(self.ref, self.data or {})
+        elif self.kind == "update":
+            batch.update(self.ref, self.data or {})
+        elif self.kind == "delete":
+            batch.delete(self.ref)
+        else:
+            raise ValueError(f"Unknown write op: {self.kind}")
+
+    @property
+    def increments(self) -> bool:
+        """Whether the write holds `Increment` transforms (applying it twice counts twice)."""
+        return _has_increment(self.data)
+
+
+def _has_increment(value: Any) -> bool:
+    if isinstance(value, transforms.Increment):
+        return True
+    if isinstance(value, dict):
+        return any(_has_increment(v) for v in value.values())
+    return False
+
+
+def replay_safe(chunk: Sequence[WriteOp]) -> bool:
+    """Whether resending a batch that may already have committed can't apply it twice.
+
+    Writes without increments just land again. A `create` makes the whole batch fail on a replay
+    (its document now exists), so nothing in it, increments included, is applied a second time.
+    """
+    return any(op.kind == "create" for op in chunk) or not any(op.increments for op in chunk)
+
+
+class WriteRecorder:
+    """Batch-compatible writer that records operations instead of sending them.
+
+    Lets code written against a Firestore batch or transaction (e.g. aggregate hooks) contribute
+    operations to a `ParallelBatchWriter` job.
+    """
+
+    def __init__(self) -> None:
+        self.ops: List[WriteOp] = []
+
+    def set(self, ref: Any, data: Dict[str, Any], merge: bool = False) -> None:
+        self.ops.append(WriteOp("set", ref, data, merge))
+
+    def create(self, ref: Any, data: Dict[str, Any]) -> None:
+        self.ops.append(WriteOp("create", ref, data))
+
+    def update(self, ref: Any, data: Dict[str, Any]) -> None:
+        self.ops.append(WriteOp("update", ref, data))
+
+    def delete(self, ref: Any) -> None:
+        self.ops.append(WriteOp("delete", ref))
+
+
+@dataclass
+class WriteReport:
+    committed: int = 0
+    failed: int = 0
+    batches: int = 0
+    retries: int = 0
+    errors: List[str] = field(default_factory=list)
+    # Indices of groups whose batch failed (only populated by `commit_groups`)
+    failed_groups: List[int] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "committed": self.committed,
+            "failed": self.failed,
+            "batches": self.batches,
+            "retries": self.retries,
+            "errors": self.errors[:10],
+        }
+
+
+class ParallelBatchWriter:
+    """Commits write operations in 500-op batches across a thread pool, with retry and backoff.
+
+    Cost/operations:
+    - Batches are independent commits (not one atomic transaction); use for idempotent bulk work such
+      as cluster write-back, backfills and migrations. Each batch is retried on transient errors with
+      exponential backoff and full jitter; permanent errors fail only that batch.
+    - Batches with `Increment` transforms are only resent after errors that guarantee nothing was
+      applied, unless they also hold a `create` (see `replay_safe`). After an ambiguous failure
+      the caller can check whether the batch landed (e.g. whether its created documents exist).
+    - At most `max_workers * 2` batches are materialized at a time, so `ops` can be a lazy generator
+      over an arbitrarily large job.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        batch_size: int = MAX_BATCH_OPS,
+        max_workers: int = 8,
+        max_attempts: int = 5,
+        base_delay_s: float = 0.25,
+        max_delay_s: float = 16.0,
+    ) -> None:
+        self._client = client
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_OPS))
+        self.max_workers = max(1, max_workers)
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+
+    def _chunks(self, ops: Iterable[WriteOp]) -> Iterator[Tuple[List[WriteOp], List[int]]]:
+        it = iter(ops)
+        while True:
+            chunk = list(islice(it, self.batch_size))
+            if not chunk:
+                return
+            yield chunk, []
+
+    def _group_chunks(
+        self, groups: Iterable[Sequence[WriteOp]]
+    ) -> Iterator[Tuple[List[WriteOp], List[int]]]:
+        """Pack whole groups into batches; a group is never split across two commits."""
+        chunk: List[WriteOp] = []
+        members: List[int] = []
+        for index, group in enumerate(groups):
+            if len(group) > self.batch_size:
+                raise ValueError(f"Write group of {len(group)} ops exceeds batch size {self.batch_size}")
+            if len(chunk) + len(group) > self.batch_size:
+                yield chunk, members
+                chunk, members = [], []
+            chunk.extend(group)
+            members.append(index)
+        if chunk:
+            yield chunk, members
+
+    def _commit_chunk(self, chunk: List[WriteOp]) -> int:
+        """Commit one batch; returns the number of retries used. Raises on permanent failure."""
+        retryable = RETRYABLE_ERRORS if replay_safe(chunk) else UNAPPLIED_ERRORS
+        attempt = 0
+        while True:
+            batch = self._client.batch()
+            for op in chunk:
+                op.apply(batch)
+            try:
+                batch.commit()
+                return attempt
+            except retryable as e:
+                attempt += 1
+                if attempt >= self.max_attempts:
+                    raise
+                delay = random.uniform(0, min(self.max_delay_s, self.base_delay_s * (2 ** attempt)))
+                logger.warning(f"Batch commit failed ({e}); retry {attempt} in {delay:.2f}s")
+                time.sleep(delay)
+
+    def commit(self, ops: Iterable[WriteOp]) -> WriteReport:
+        return self._run(self._chunks(ops))
+
+    def commit_groups(
+        self,
+        groups: Iterable[Sequence[WriteOp]],
+        on_batch: Optional[Callable[[List[int], bool], None]] = None,
+    ) -> WriteReport:
+        """Commit groups of operations that must land together (e.g. a record and its aggregates).
+
+        Each group commits atomically within one batch; `report.failed_groups` lists the indices of
+        groups that did not commit. `on_batch(group_indices, committed)` is called on the calling
+        thread as each batch finishes, e.g. to checkpoint progress while `groups` is still being read.
+        """
+        report = self._run(self._group_chunks(groups), on_batch)
+        report.failed_groups.sort()
+        return report
+
+    def _run(
+        self,
+        chunks: Iterable[Tuple[List[WriteOp], List[int]]],
+        on_batch: Optional[Callable[[List[int], bool], None]] = None,
+    ) -> WriteReport:
+        report = WriteReport()
+        if self.max_workers == 1:
+            for chunk, members in chunks:
+                self._record(report, chunk, members, lambda c=chunk: self._commit_chunk(c), on_batch)
+            return report
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fs-writer") as pool:
+            in_flight: Dict[Future, Tuple[List[WriteOp], List[int]]] = {}
+            for chunk, members in chunks:
+                if len(in_flight) >= self.max_workers * 2:
+                    self._drain(report, in_flight, FIRST_COMPLETED, on_batch)
+                in_flight[pool.submit(self._commit_chunk, chunk)] = (chunk, members)
+            self._drain(report, in_flight, None, on_batch)
+        return report
+
+    def _drain(
+        self,
+        report: WriteReport,
+        in_flight: Dict[Future, Tuple[List[WriteOp], List[int]]],
+        return_when: Any,
+        on_batch: Optional[Callable[[List[int], bool], None]] = None,
+    ) -> None:
+        done: Set[Future]
+        if return_when is None:
+            done = set(in_flight)
+            wait(done)
+        else:
+            done, _ = wait(in_flight, return_when=return_when)
+        for fut in done:
+            chunk, members = in_flight.pop(fut)
+            self._record(report, chunk, members, fut.result, on_batch)
+
+    @staticmethod
+    def _record(
+        report: WriteReport,
+        chunk: List[WriteOp],
+        members: List[int],
+        result: Any,
+        on_batch: Optional[Callable[[List[int], bool], None]] = None,
+    ) -> None:
+        report.batches += 1
+        try:
+            report.retries += result()
+            report.committed += len(chunk)
+            committed = True
+        except Exception as e:
+            report.failed += len(chunk)
+            report.failed_groups.extend(members)
+            report.errors.append(str(e))
+            logger.error(f"Batch of {len(chunk)} writes failed: {e}")
+            committed = False
+        if on_batch is not None:
+            on_batch(members, committed)
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, TypeVar, Union
+
+from loguru import logger
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# A batch function receives the queued items in arrival order and returns one entry per item.
+# Returning an Exception instance for an entry fails only that caller; raising fails the batch.
+BatchFn = Callable[[List[T]], Sequence[Union[R, BaseException]]]
+
+
+@dataclass
+class BatchStats:
+    """Running counters for the micro-batcher (exposed via `/v1/health`)."""
+
+    batches: int = 0
+    items: int = 0
+    failed_batches: int = 0
+    queue_wait_ms_sum: float = 0.0
+    queue_wait_ms_max: float = 0.0
+    batch_ms_sum: float = 0.0
+    last_batch_size: int = 0
+    size_histogram: Dict[int, int] = field(default_factory=dict)
+
+    def snapshot(self, max_batch_size: int, queue_depth: int) -> Dict[str, Any]:
+        fill_ratio = self.items / (self.batches * max_batch_size) if self.batches else 0.0
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "failedBatches": self.failed_batches,
+            "avgBatchSize": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "batchFillRatio": round(fill_ratio, 3),
+            "avgQueueWaitMs": round(self.queue_wait_ms_sum / self.items, 2) if self.items else 0.0,
+            "maxQueueWaitMs": round(self.queue_wait_ms_max, 2),
+            "avgBatchMs": round(self.batch_ms_sum / self.batches, 2) if self.batches else 0.0,
+            "lastBatchSize": self.last_batch_size,
+            "batchSizeHistogram": {str(k): v for k, v in sorted(self.size_histogram.items())},
+            "queueDepth": queue_depth,
+            "maxBatchSize": max_batch_size,
+        }
+
+
+@dataclass
+class _Pending(Generic[T]):
+    item: T
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collects concurrent requests into a queue and runs them as one batched call.
+
+    Operations:
+    - A batch is dispatched when `max_batch_size` items are queued or `max_wait_ms` has elapsed
+      since the first item of the batch arrived, whichever happens first. Under light load a
+      request therefore waits at most `max_wait_ms`; under heavy load batches fill immediately.
+    - The batch function runs in `executor` (a dedicated inference thread) so the event loop stays
+      free for uploads, health probes and other requests. Batches are processed one at a time,
+      which matches a single CPU-bound model instance per container.
+    - The worker task is started lazily on first use, on the running event loop.
+    """
+
+    def __init__(
+        self,
+        batch_fn: BatchFn,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 15.0,
+        executor: Optional[Executor] = None,
+        name: str = "batcher",
+    ) -> None:
+        self._batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+        self._executor = executor
+        self._name = name
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.stats = BatchStats()
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run(self._queue))
+        assert self._queue is not None
+        return self._queue
+
+    async def submit(self, item: T) -> R:
+        """Queue one item and wait for its individual result."""
+        queue = self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait(_Pending(item=item, future=future, enqueued_at=time.perf_counter()))
+        return await future
+
+    async def close(self) -> None:
+        """Stop the worker; pending callers receive a cancellation."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._worker = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                pending = self._queue.get_nowait()
+                if not pending.future.done():
+                    pending.future.cancel()
+            self._queue = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        depth = self._queue.qsize() if self._queue is not None else 0
+        return self.stats.snapshot(self.max_batch_size, depth)
+
+    async def _collect(self, queue: asyncio.Queue) -> List[_Pending]:
+        first = await queue.get()
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            # Drain whatever is already queued without yielding to the timer
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect(queue)
+            # Callers that gave up (client disconnect) don't need a forward pass
+            batch = [p for p in batch if not p.future.done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for p in batch:
+                wait_ms = (started - p.enqueued_at) * 1000.0
+                self.stats.queue_wait_ms_sum += wait_ms
+                self.stats.queue_wait_ms_max = max(self.stats.queue_wait_ms_max, wait_ms)
+
+            try:
+                outputs = await loop.run_in_executor(
+                    self._executor, self._batch_fn, [p.item for p in batch]
+                )
+                if len(outputs) != len(batch):
+                    raise RuntimeError(
+                        f"{self._name}: batch function returned {len(outputs)} results for {len(batch)} items"
+                    )
+            except Exception as e:
+                self.stats.failed_batches += 1
+                logger.exception(f"{self._name}: batch of {len(batch)} failed: {e}")
+                for p in batch:
+                    if not p.future.done():
+                        p.future.set_exception(e)
+                continue
+            finally:
+                size = len(batch)
+                self.stats.batches += 1
+                self.stats.items += size
+                self.stats.last_batch_size = size
+                self.stats.batch_ms_sum += (time.perf_counter() - started) * 1000.0
+                self.stats.size_histogram[size] = self.stats.size_histogram.get(size, 0) + 1
+
+            for p, out in zip(batch, outputs):
+                if p.future.done():
+                    continue
+                if isinstance(out, BaseException):
+                    p.future.set_exception(out)
+                else:
+                    p.future.set_result(out)
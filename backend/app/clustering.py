@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import time
+from array import array
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .geo import geohash_encode
+
+if TYPE_CHECKING:
+    from sklearn.neighbors import BallTree
+
+# scikit-learn is imported on first use: it adds ~1 s to every cold start, and only the clustering
+# job and cluster assignment (after the first index load) need it
+
+
+EARTH_RADIUS_M = 6_371_008.8
+
+
+@dataclass
+class ClusterSummary:
+    """Centroid and extent of one cluster; persisted so other instances can assign new detections."""
+
+    cluster_id: str
+    lat: float
+    lng: float
+    size: int
+    radius_m: float
+    hotspot: bool
+
+
+@dataclass
+class ClusterPoints:
+    """Columnar view of the detections being clustered."""
+
+    ids: List[str]
+    lat: np.ndarray
+    lng: np.ndarray
+    previous: List[Optional[str]]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def points_from_stream(docs: Iterable[Any]) -> ClusterPoints:
+    """Build coordinate arrays directly from a Firestore query stream.
+
+    Expects snapshots projected to `metadata.location` and `cluster_id`; documents without a
+    location are skipped. Coordinates accumulate in typed arrays (8 bytes per value) rather than
+    per-detection dicts.
+    """
+    ids: List[str] = []
+    previous: List[Optional[str]] = []
+    lat = array("d")
+    lng = array("d")
+    for doc in docs:
+        data = doc.to_dict() or {}
+        loc = (data.get("metadata") or {}).get("location")
+        if not loc or loc.get("lat") is None or loc.get("lng") is None:
+            continue
+        ids.append(doc.id)
+        previous.append(data.get("cluster_id"))
+        lat.append(float(loc["lat"]))
+        lng.append(float(loc["lng"]))
+    return ClusterPoints(
+        ids=ids,
+        lat=np.frombuffer(lat, dtype=np.float64) if lat else np.empty(0),
+        lng=np.frombuffer(lng, dtype=np.float64) if lng else np.empty(0),
+        previous=previous,
+    )
+
+
+def haversine_m(lat1: np.ndarray, lng1: np.ndarray, lat2: Any, lng2: Any) -> np.ndarray:
+    """Vectorized great-circle distance in meters."""
+    lat1, lng1, lat2, lng2 = (np.radians(v) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class ClusterEngine:
+    """Haversine DBSCAN over a BallTree, with stable cluster IDs and incremental assignment.
+
+    Business:
+    - Groups potholes within `radius_m` of each other (true ground distance, valid at any latitude).
+      Clusters with `hotspot_size`+ potholes are flagged as hotspots.
+
+    Operations:
+    - `fit` is O(n log n) with a BallTree; coordinates stay in NumPy arrays end to end.
+    - Cluster IDs are stable across runs: each new cluster inherits the previous `cluster_id` held
+      by most of its members (greedy one-to-one matching). Genuinely new clusters get an ID derived
+      from the geohash of their centroid, so re-running on unchanged data is a no-op.
+    - `assign` places a newly ingested detection into an existing cluster (nearest centroid within
+      the cluster's extent plus `radius_m`) without re-running the fit. New clusters only form on
+      the next full run.
+    """
+
+    def __init__(self, radius_m: float = 50.0, min_samples: int = 2, hotspot_size: int = 5) -> None:
+        self.radius_m = radius_m
+        self.min_samples = min_samples
+        self.hotspot_size = hotspot_size
+        # (summaries, tree) swapped in one assignment, so `assign` never pairs a tree with the wrong
+        # summaries while a refresh is loading
+        self._index: Tuple[List[ClusterSummary], Optional[BallTree]] = ([], None)
+        self.loaded_at: Optional[float] = None
+
+    # Full fit -----------------------------------------------------------------
+
+    def fit(self, points: ClusterPoints) -> Tuple[List[Optional[str]], List[ClusterSummary]]:
+        """Cluster `points`. Returns (cluster_id or None per point, cluster summaries)."""
+        n = len(points)
+        if n < self.min_samples:
+            return [None] * n, []
+
+        from sklearn.cluster import DBSCAN
+
+        coords = np.radians(np.column_stack((points.lat, points.lng)))
+        labels = DBSCAN(
+            eps=self.radius_m / EARTH_RADIUS_M,
+            min_samples=self.min_samples,
+            metric="haversine",
+            algorithm="ball_tree",
+        ).fit(coords).labels_
+
+        n_clusters = int(labels.max()) + 1 if n else 0
+        if n_clusters == 0:
+            return [None] * n, []
+
+        # Per-cluster centroid and extent, vectorized over all clustered points
+        clustered = labels >= 0
+        lab = labels[clustered]
+        sizes = np.bincount(lab, minlength=n_clusters)
+        c_lat = np.bincount(lab, weights=points.lat[clustered], minlength=n_clusters) / sizes
+        c_lng = np.bincount(lab, weights=points.lng[clustered], minlength=n_clusters) / sizes
+        dist = haversine_m(points.lat[clustered], points.lng[clustered], c_lat[lab], c_lng[lab])
+        radius = np.zeros(n_clusters)
+        np.maximum.at(radius, lab, dist)
+
+        names = self._stable_names(labels, points.previous, c_lat, c_lng)
+
+        summaries = [
+            ClusterSummary(
+                cluster_id=names[k],
+                lat=float(c_lat[k]),
+                lng=float(c_lng[k]),
+                size=int(sizes[k]),
+                radius_m=round(float(radius[k]), 1),
+                hotspot=bool(sizes[k] >= self.hotspot_size),
+            )
+            for k in range(n_clusters)
+        ]
+        assignments = [names[k] if k >= 0 else None for k in labels.tolist()]
+        self.load(summaries)
+        return assignments, summaries
+
+    def _stable_names(
+        self,
+        labels: np.ndarray,
+        previous: Sequence[Optional[str]],
+        c_lat: np.ndarray,
+        c_lng: np.ndarray,
+    ) -> List[str]:
+        n_clusters = len(c_lat)
+        # Count (new label, previous id) co-occurrences and match greedily by overlap
+        prev = np.array([p or "" for p in previous], dtype=object)
+        mask = (labels >= 0) & (prev != "")
+        names: List[Optional[str]] = [None] * n_clusters
+        taken: set = set()
+        if mask.any():
+            prev_ids, prev_codes = np.unique(prev[mask].astype(str), return_inverse=True)
+            pair = labels[mask].astype(np.int64) * len(prev_ids) + prev_codes
+            pairs, counts = np.unique(pair, return_counts=True)
+            for idx in np.argsort(-counts, kind="stable"):
+                label, code = divmod(int(pairs[idx]), len(prev_ids))
+                prev_id = str(prev_ids[code])
+                if names[label] is None and prev_id not in taken:
+                    names[label] = prev_id
+                    taken.add(prev_id)
+
+        for k in range(n_clusters):
+            if names[k] is not None:
+                continue
+            base = f"cluster_{geohash_encode(float(c_lat[k]), float(c_lng[k]), 8)}"
+            name, suffix = base, 2
+            while name in taken:
+                name, suffix = f"{base}_{suffix}", suffix + 1
+            names[k] = name
+            taken.add(name)
+        return [str(n) for n in names]
+
+    # Incremental assignment ---------------------------------------------------
+
+    def load(self, summaries: Sequence[ClusterSummary]) -> None:
+        """Replace the centroid index used by `assign`."""
+        summaries = list(summaries)
+        tree: Optional[BallTree] = None
+        if summaries:
+            from sklearn.neighbors import BallTree
+
+            centroids = np.radians([[s.lat, s.lng] for s in summaries])
+            tree = BallTree(centroids, metric="haversine")
+        self._index = (summaries, tree)
+        self.loaded_at = time.monotonic()
+
+    def assign(self, lat: float, lng: float) -> Optional[str]:
+        """Existing cluster for a new detection at (lat, lng), or None."""
+        summaries, tree = self._index
+        if tree is None:
+            return None
+        dist, idx = tree.query(np.radians([[lat, lng]]), k=1)
+        summary = summaries[int(idx[0][0])]
+        if float(dist[0][0]) * EARTH_RADIUS_M <= summary.radius_m + self.radius_m:
+            return summary.cluster_id
+        return None
+
+    @property
+    def summaries(self) -> List[ClusterSummary]:
+        return list(self._index[0])
+
+
+def plan_writeback(
+    points: ClusterPoints, assignments: Sequence[Optional[str]]
+) -> List[Tuple[str, Optional[str]]]:
+    """Documents whose stored `cluster_id` differs from the new assignment.
+
+    Includes clears (a previously clustered point that is now noise maps to None). Unchanged
+    documents are skipped, so with stable IDs a daily run only writes what actually moved.
+    """
+    return [
+        (detection_id, new)
+        for detection_id, old, new in zip(points.ids, points.previous, assignments)
+        if (old or None) != new
+    ]
+
+
+def plan_summary_writeback(
+    stored: Dict[str, Dict[str, Any]], summaries: Sequence[ClusterSummary]
+) -> Tuple[List[ClusterSummary], List[str]]:
+    """(summaries to upsert, cluster IDs to delete) relative to the stored summary documents."""
+    upserts = []
+    for summary in summaries:
+        doc = summary_to_doc(summary)
+        old = stored.get(summary.cluster_id)
+        if old is None or any(old.get(k) != v for k, v in doc.items()):
+            upserts.append(summary)
+    current = {summary.cluster_id for summary in summaries}
+    return upserts, [cluster_id for cluster_id in stored if cluster_id not in current]
+
+
+def summary_to_doc(summary: ClusterSummary) -> Dict[str, Any]:
+    return asdict(summary)
+
+
+def summary_from_doc(data: Dict[str, Any]) -> ClusterSummary:
+    return ClusterSummary(
+        cluster_id=str(data["cluster_id"]),
+        lat=float(data["lat"]),
+        lng=float(data["lng"]),
+        size=int(data.get("size") or 0),
+        radius_m=float(data.get("radius_m") or 0.0),
+        hotspot=bool(data.get("hotspot")),
+    )
@@ -46,19 +46,175 @@ class Settings(BaseSettings):
     # ML
     YOLO_MODEL_PATH: str = Field(default="/app/models/pothole_yolov8n.pt")
     YOLO_CONFIDENCE_THRESHOLD: float = Field(default=0.35)
+    INFERENCE_BACKEND: str = Field(
+        default="ultralytics", description="Inference runtime: ultralytics (PyTorch), onnxruntime or openvino"
+    )
+    INFERENCE_MODEL_PATH: str = Field(
+        default="", description="Exported model path; defaults to the export next to YOLO_MODEL_PATH"
+    )
+    INFERENCE_PRECISION: str = Field(
+        default="fp32", description="fp32, or int8 for the quantized ONNX model (scripts/quantize_model.py)"
+    )
+    INFERENCE_INTRA_OP_THREADS: int = Field(default=0, ge=0, description="Threads per operator (0 = runtime default)")
+    INFERENCE_INTER_OP_THREADS: int = Field(default=0, ge=0, description="Threads across operators (0 = runtime default)")
+    INFERENCE_NMS_IOU: float = Field(default=0.7, gt=0.0, le=1.0, description="IoU threshold for non-maximum suppression")
+    INFERENCE_IMGSZ: int = Field(
+        default=640, ge=32, multiple_of=32, description="Square model input size; uploads are decoded near this size"
+    )
+
+    ENABLE_MODEL_WARMUP: bool = Field(
+        default=True, description="Run warm-up inferences after startup; readiness waits for them"
+    )
+    MODEL_WARMUP_RUNS: int = Field(default=1, ge=1, description="Warm-up passes per batch size (1 and the max batch)")
+
+    # Inference micro-batching (concurrent uploads share one forward pass)
+    ENABLE_INFERENCE_BATCHING: bool = Field(default=True, description="Batch concurrent inference requests")
+    INFERENCE_MAX_BATCH_SIZE: int = Field(default=8, ge=1, description="Maximum images per batched predict call")
+    INFERENCE_MAX_WAIT_MS: float = Field(
+        default=15.0, ge=0.0, description="Maximum time the first queued image waits for a batch to fill"
+    )
+
+    # Tiled inference over the road region of high-resolution dashcam frames
+    ENABLE_TILED_INFERENCE: bool = Field(
+        default=False, description="Run the model on overlapping tiles of the road ROI instead of the whole frame"
+    )
+    TILING_ROI: str = Field(
+        default="0.4,0.92", description="Default road ROI as top,bottom[,left,right] fractions of the frame"
+    )
+    TILING_ROI_PROFILES: str = Field(
+        default="", description="Per-device ROIs: deviceId=top,bottom[,left,right];deviceId=..."
+    )
+    TILING_HORIZON: bool = Field(
+        default=False, description="Estimate the ROI top from the frame's horizon for devices without a profile"
+    )
+    TILING_COLUMNS: int = Field(default=3, ge=1, description="Tiles across the ROI width")
+    TILING_OVERLAP: float = Field(default=0.2, ge=0.0, lt=0.9, description="Overlap between neighbouring tiles")
+    TILING_MAX_TILES: int = Field(default=8, ge=1, description="Maximum tiles (one predict batch) per frame")
+    TILING_MERGE_THRESHOLD: float = Field(
+        default=0.5, gt=0.0, le=1.0, description="Intersection over the smaller box above which cross-tile boxes merge"
+    )
+
+    # Write-behind persistence: single uploads are acknowledged once queued and committed in batches
+    ENABLE_WRITE_BEHIND: bool = Field(
+        default=False, description="Queue new detections and commit them in batches after the response"
+    )
+    WRITE_BEHIND_MAX_PENDING: int = Field(default=1000, ge=1, description="Queued records before uploads wait")
+    WRITE_BEHIND_BATCH_SIZE: int = Field(default=100, ge=1, description="Records per flush")
+    WRITE_BEHIND_MAX_DELAY_MS: float = Field(
+        default=100.0, ge=0.0, description="Longest a record waits for its batch to fill"
+    )
+    WRITE_BEHIND_MAX_ATTEMPTS: int = Field(default=5, ge=1, description="Flushes tried before a record is dropped")
+    WRITE_BEHIND_ENQUEUE_TIMEOUT_S: float = Field(
+        default=2.0, ge=0.0, description="Wait for room in a full queue before answering 503"
+    )
+    WRITE_BEHIND_SHUTDOWN_TIMEOUT_S: float = Field(
+        default=8.0, ge=0.0, description="Time allowed to flush the queue on shutdown (Cloud Run allows 10 s)"
+    )
+
+    # Bulk Firestore writes (cluster write-back, backfills)
+    FIRESTORE_WRITE_WORKERS: int = Field(default=8, ge=1, description="Concurrent batch commits for bulk writes")
+    FIRESTORE_WRITE_MAX_ATTEMPTS: int = Field(default=5, ge=1, description="Attempts per batch on transient errors")
 
     # API
     MAX_UPLOAD_SIZE_MB: int = Field(default=15)
-    
+    UPLOAD_SPOOL_THRESHOLD_MB: float = Field(
+        default=2.0, ge=0.0, description="Uploads larger than this are spooled to a temp file instead of memory"
+    )
+    BATCH_MAX_ITEMS: int = Field(default=200, ge=1, description="Maximum images per batch upload request")
+    BATCH_UPLOAD_CONCURRENCY: int = Field(
+        default=16, ge=1, description="Concurrent Cloud Storage uploads / geocoding lookups per batch request"
+    )
+
+    # Video uploads (POST /v1/detections/video): frames are sampled, not all run through the model
+    VIDEO_MAX_UPLOAD_MB: int = Field(
+        default=200, ge=1, description="Maximum clip size (spooled to /tmp, which is memory on Cloud Run)"
+    )
+    VIDEO_SAMPLE_DISTANCE_M: float = Field(default=5.0, gt=0, description="Distance travelled between sampled frames")
+    VIDEO_SCENE_CHANGE_THRESHOLD: float = Field(
+        default=0.15, ge=0.0, le=1.0, description="View change that samples a frame when there is no GPS (0 = off)"
+    )
+    VIDEO_SCENE_CHECK_INTERVAL_S: float = Field(default=0.5, ge=0.0, description="Seconds between scene-change checks")
+    VIDEO_MAX_SAMPLED_FRAMES: int = Field(default=600, ge=1, description="Frames sampled per clip at most")
+    VIDEO_JPEG_QUALITY: int = Field(default=90, ge=50, le=100, description="JPEG quality of stored frames")
+    VIDEO_STORE_CHUNK_FRAMES: int = Field(
+        default=32, ge=1, description="Frames with detections stored per chunk while a clip is still being sampled"
+    )
+
+    # Upload de-duplication (retries and near-identical frames return the existing record)
+    ENABLE_DEDUP: bool = Field(default=True, description="Skip inference/storage for repeated or near-identical uploads")
+    DEDUP_MAX_ENTRIES: int = Field(default=5000, ge=1, description="Recent uploads remembered per instance")
+    DEDUP_TTL_MINUTES: float = Field(default=60, gt=0, description="How long an upload can be matched")
+    DEDUP_MAX_HAMMING: int = Field(
+        default=6, ge=0, le=64, description="Max differing dHash bits for a near-duplicate (0 = exact matches only)"
+    )
+    DEDUP_RADIUS_M: float = Field(default=25.0, gt=0, description="Max distance between near-duplicate uploads")
+    DEDUP_SAME_DEVICE: bool = Field(default=True, description="Near-duplicates must come from the same deviceId")
+
+    # Repeat sightings (uploads near an open detection update it instead of creating a record)
+    ENABLE_SIGHTING_MERGE: bool = Field(default=True, description="Merge repeat sightings into open detections")
+    SIGHTING_MERGE_RADIUS_M: float = Field(default=10.0, gt=0, description="Max distance for a repeat sighting")
+    SIGHTING_MAX_RECENT: int = Field(default=10, ge=0, description="Sighting images kept per detection")
+
+    # Observability
+    ENABLE_METRICS: bool = Field(
+        default=True, description="Expose Prometheus metrics (per-stage latency, caches, batching) on /metrics"
+    )
+
     # Feature Flags (for zero-downtime deployment)
     ENABLE_CLUSTERING: bool = Field(default=True, description="Enable/disable DBSCAN clustering")
+    CLUSTER_RADIUS_M: float = Field(default=50.0, gt=0, description="Neighbourhood radius (meters) for clustering")
+    CLUSTER_MIN_SAMPLES: int = Field(default=2, ge=2, description="Minimum potholes per cluster")
+    CLUSTER_HOTSPOT_SIZE: int = Field(default=5, ge=2, description="Cluster size flagged as a hotspot")
+    CLUSTERS_COLLECTION: str = Field(default="clusters", description="Firestore collection for cluster summaries")
+    CLUSTER_INDEX_REFRESH_S: int = Field(
+        default=300, description="How often an instance reloads cluster summaries for incremental assignment"
+    )
     ENABLE_REVERSE_GEOCODING: bool = Field(default=True, description="Enable/disable reverse geocoding")
     ENABLE_PRIORITY_SCORING: bool = Field(default=True, description="Enable/disable priority scoring")
+    ENABLE_PRIORITY_INDEX: bool = Field(
+        default=True, description="Serve the priority queue from an in-memory index fed by a Firestore listener"
+    )
     ENABLE_ANALYTICS: bool = Field(default=True, description="Enable/disable analytics endpoints")
+    ENABLE_AREA_AGGREGATES: bool = Field(
+        default=True, description="Maintain per-area aggregate documents and serve by-area analytics from them"
+    )
+    AREA_STATS_COLLECTION: str = Field(default="area_stats", description="Firestore collection for area aggregates")
+    ENABLE_DAILY_ROLLUPS: bool = Field(
+        default=True, description="Maintain per-day rollup documents and serve statistics from them"
+    )
+    DAILY_STATS_COLLECTION: str = Field(default="daily_stats", description="Firestore collection for daily rollups")
+    AGGREGATE_SHARDS: int = Field(
+        default=8,
+        ge=1,
+        description="Counter documents per area aggregate and daily rollup (each sustains ~1 write/s)",
+    )
     
     # Google Maps API (for reverse geocoding)
     GOOGLE_MAPS_API_KEY: str = Field(default="", description="Google Maps API key for reverse geocoding")
 
+    # Reverse-geocoding cache (keyed on geohash cell)
+    ENABLE_GEOCODE_CACHE: bool = Field(default=True, description="Cache reverse geocoding results per geohash cell")
+    GEOCODE_CACHE_PRECISION: int = Field(
+        default=7, ge=5, le=9, description="Geohash precision of cache keys (7 ≈ 150 m street segment)"
+    )
+    GEOCODE_CACHE_MAX_ENTRIES: int = Field(default=50000, ge=1, description="In-process LRU tier size")
+    GEOCODE_CACHE_TTL_HOURS: float = Field(default=720, description="TTL for successful lookups")
+    GEOCODE_CACHE_NEGATIVE_TTL_MINUTES: float = Field(default=60, description="TTL for 'no result' lookups")
+    GEOCODE_CACHE_BACKEND: str = Field(
+        default="firestore", description="Persistent tier: firestore (production), sqlite or memory (none)"
+    )
+    GEOCODE_CACHE_COLLECTION: str = Field(default="geocode_cache", description="Firestore tier collection")
+    GEOCODE_CACHE_SQLITE_PATH: str = Field(
+        default="/tmp/roadsense-geocode-cache.sqlite3", description="SQLite tier file path"
+    )
+
+    # Response cache for analytics / priority-queue reads (per instance, cleared on every write)
+    ENABLE_RESPONSE_CACHE: bool = Field(default=True, description="Cache analytics and priority-queue responses")
+    RESPONSE_CACHE_TTL_S: float = Field(
+        default=30.0, gt=0, description="Entry lifetime; bounds staleness from writes on other instances"
+    )
+    RESPONSE_CACHE_MAX_ENTRIES: int = Field(default=256, ge=1, description="Distinct parameter sets kept")
+
     @property
     def allowed_origins_list(self) -> list[str]:
         return [o.strip() for o in self.ALLOWED_ORIGINS.split(",") if o.strip()]
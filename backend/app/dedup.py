@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set, Tuple
+
+from loguru import logger
+from PIL import Image
+
+from .geo import distance_m
+from .uploads import CHUNK_SIZE, ImageSource, open_source
+
+
+# dHash grid: 9x8 grayscale pixels -> 64 horizontal-gradient bits
+_DHASH_SIZE = 8
+
+
+@dataclass(frozen=True)
+class ImageFingerprint:
+    """Exact (SHA-256 of the bytes) and perceptual (64-bit dHash) identity of an upload."""
+
+    sha256: str
+    dhash: Optional[int]
+
+
+@dataclass
+class DedupEntry:
+    record_id: str
+    fingerprint: ImageFingerprint
+    device_id: Optional[str]
+    lat: Optional[float]
+    lng: Optional[float]
+    payload: Optional[Dict[str, Any]]
+    expires_at: float
+
+
+def image_fingerprint(source: ImageSource) -> ImageFingerprint:
+    """Hash an upload. Blocking (hashes the file and decodes a thumbnail); run in a worker thread.
+
+    The dHash is computed from a tiny grayscale decode (`draft` lets libjpeg scale by 1/8), so it
+    costs a few milliseconds even for 12 MP frames. Undecodable images get no dHash; they fail in
+    inference anyway.
+    """
+    digest = hashlib.sha256()
+    with open_source(source) as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    dhash: Optional[int] = None
+    try:
+        with open_source(source) as fh, Image.open(fh) as im:
+            im.draft("L", (_DHASH_SIZE * 8, _DHASH_SIZE * 8))
+            pixels = list(
+                im.convert("L").resize((_DHASH_SIZE + 1, _DHASH_SIZE), Image.BILINEAR).getdata()
+            )
+        dhash = 0
+        for row in range(_DHASH_SIZE):
+            offset = row * (_DHASH_SIZE + 1)
+            for col in range(_DHASH_SIZE):
+                dhash = (dhash << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    except Exception as e:
+        logger.debug(f"Perceptual hash skipped: {e}")
+    return ImageFingerprint(sha256=digest.hexdigest(), dhash=dhash)
+
+
+class DedupCache:
+    """Bounded LRU of recently stored uploads, used to skip redundant inference and storage.
+
+    Business:
+    - Mobile clients retry uploads on flaky connections, and dashcams stopped at a light send
+      near-identical frames. Each repeat would otherwise create another record for the same pothole.
+
+    Cost:
+    - A hit skips inference, the Cloud Storage upload, geocoding and the Firestore write; the
+      existing record is returned instead.
+
+    Matching:
+    - Exact: same SHA-256 within the TTL, whatever the metadata (a retry of the same bytes).
+    - Near: dHash within `max_distance` bits, and the upload is plausibly the same scene: within
+      `radius_m` of the cached record when both carry a location, and from the same `deviceId` when
+      `same_device` is set. Without locations, only same-device uploads can match.
+    - Near matches scan the cache newest first (popcount per entry); keep `max_entries` in the
+      low thousands.
+
+    Per instance and in memory: a retry routed to another Cloud Run instance is not deduplicated.
+    Thread-safe.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        ttl_seconds: float = 3600,
+        max_distance: int = 6,
+        radius_m: float = 25.0,
+        same_device: bool = True,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self.radius_m = radius_m
+        self.same_device = same_device
+        # Keyed by SHA-256; several uploads can resolve to one record (merged sightings)
+        self._entries: "OrderedDict[str, DedupEntry]" = OrderedDict()
+        self._by_record: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {"exactHits": 0, "nearHits": 0, "misses": 0, "evictions": 0}
+
+    def match(
+        self,
+        fingerprint: ImageFingerprint,
+        device_id: Optional[str] = None,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+    ) -> Optional[Tuple[str, DedupEntry]]:
+        """Return `("exact" | "near", entry)` for a previously stored upload, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(fingerprint.sha256)
+            if entry is not None:
+                if entry.expires_at > now:
+                    self._entries.move_to_end(fingerprint.sha256)
+                    self._counters["exactHits"] += 1
+                    return "exact", entry
+                self._drop(fingerprint.sha256)
+
+            if fingerprint.dhash is not None and self.max_distance > 0:
+                for entry in reversed(self._entries.values()):
+                    if entry.expires_at <= now or entry.fingerprint.dhash is None:
+                        continue
+                    if (entry.fingerprint.dhash ^ fingerprint.dhash).bit_count() > self.max_distance:
+                        continue
+                    if self._same_scene(entry, device_id, lat, lng):
+                        self._entries.move_to_end(entry.fingerprint.sha256)
+                        self._counters["nearHits"] += 1
+                        return "near", entry
+
+            self._counters["misses"] += 1
+        return None
+
+    def _same_scene(
+        self, entry: DedupEntry, device_id: Optional[str], lat: Optional[float], lng: Optional[float]
+    ) -> bool:
+        same_device = bool(device_id) and entry.device_id == device_id
+        if self.same_device and not same_device:
+            return False
+        if None in (lat, lng, entry.lat, entry.lng):
+            return same_device
+        return distance_m(lat, lng, entry.lat, entry.lng) <= self.radius_m  # type: ignore[arg-type]
+
+    def remember(
+        self,
+        fingerprint: ImageFingerprint,
+        record_id: str,
+        payload: Optional[Dict[str, Any]] = None,
+        device_id: Optional[str] = None,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+    ) -> None:
+        entry = DedupEntry(
+            record_id=record_id,
+            fingerprint=fingerprint,
+            device_id=device_id,
+            lat=lat,
+            lng=lng,
+            payload=payload,
+            expires_at=time.time() + self.ttl_seconds,
+        )
+        sha = fingerprint.sha256
+        with self._lock:
+            self._drop(sha)
+            self._entries[sha] = entry
+            self._by_record.setdefault(record_id, set()).add(sha)
+            if payload is not None:
+                # Earlier uploads of the same record now return its latest state
+                for other in self._by_record[record_id]:
+                    self._entries[other].payload = payload
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def forget(self, record_id: str) -> None:
+        """Drop a record (deleted or updated) so new uploads of the same image are stored again."""
+        with self._lock:
+            for sha in list(self._by_record.get(record_id, ())):
+                self._drop(sha)
+
+    def _drop(self, sha: str) -> None:
+        entry = self._entries.pop(sha, None)
+        if entry is None:
+            return
+        shas = self._by_record.get(entry.record_id)
+        if shas is not None:
+            shas.discard(sha)
+            if not shas:
+                del self._by_record[entry.record_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        hits = counters["exactHits"] + counters["nearHits"]
+        lookups = hits + counters["misses"]
+        return {
+            **counters,
+            "entries": size,
+            "hitRatio": round(hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,120 @@
+"""Small geospatial helpers shared by caching, clustering and de-duplication.
+
+Geohash cell sizes (approximate, at the equator) for reference:
+- precision 6: 1.2 km x 0.6 km
+- precision 7: 153 m x 153 m (a city block / street segment)
+- precision 8: 38 m x 19 m
+- precision 9: 4.8 m x 4.8 m
+"""
+from __future__ import annotations
+
+import math
+from typing import List, Tuple
+
+# Mean Earth radius (IUGG)
+EARTH_RADIUS_M = 6_371_008.8
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat: float, lng: float, precision: int = 7) -> str:
+    """Encode a coordinate as a geohash string of `precision` characters."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # geohash interleaves bits starting with longitude
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                bits = (bits << 1) | 1
+                lng_lo = mid
+            else:
+                bits <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_lo = mid
+            else:
+                bits <<= 1
+                lat_hi = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle (haversine) distance in meters between two coordinates."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, a)))
+
+
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """(lat_lo, lat_hi, lng_lo, lng_hi) of a geohash cell."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    even = True
+    for ch in geohash:
+        bits = _BASE32.index(ch)
+        for shift in range(4, -1, -1):
+            bit = (bits >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                if bit:
+                    lng_lo = mid
+                else:
+                    lng_hi = mid
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                if bit:
+                    lat_lo = mid
+                else:
+                    lat_hi = mid
+            even = not even
+    return lat_lo, lat_hi, lng_lo, lng_hi
+
+
+def geohash_neighbors(geohash: str) -> List[str]:
+    """The cell itself and its (up to) 8 neighbours, deduplicated near the poles."""
+    lat_lo, lat_hi, lng_lo, lng_hi = geohash_bounds(geohash)
+    height, width = lat_hi - lat_lo, lng_hi - lng_lo
+    lat_c, lng_c = (lat_lo + lat_hi) / 2, (lng_lo + lng_hi) / 2
+    cells: List[str] = []
+    for dlat in (0, -1, 1):
+        lat = lat_c + dlat * height
+        if not -90.0 <= lat <= 90.0:
+            continue
+        for dlng in (0, -1, 1):
+            lng = (lng_c + dlng * width + 180.0) % 360.0 - 180.0
+            cell = geohash_encode(lat, lng, len(geohash))
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def geohash_precision_for_radius(radius_m: float, lat: float = 0.0) -> int:
+    """Longest geohash whose cells are at least `radius_m` across at latitude `lat`.
+
+    Every point within `radius_m` of a coordinate then lies in its cell or one of the 8 neighbours,
+    so a radius search is 9 prefix range queries.
+    """
+    meters_per_degree = math.pi * EARTH_RADIUS_M / 180.0
+    for precision in range(12, 0, -1):
+        lat_bits = (5 * precision) // 2
+        lng_bits = 5 * precision - lat_bits
+        height = 180.0 / (1 << lat_bits) * meters_per_degree
+        width = 360.0 / (1 << lng_bits) * meters_per_degree * math.cos(math.radians(lat))
+        if min(height, width) >= radius_m:
+            return precision
+    return 1
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Protocol, Tuple
+
+from loguru import logger
+
+from .geo import geohash_encode
+
+
+GeocodeValue = Dict[str, Optional[str]]
+# (value, expires_at epoch seconds); value None is a cached "no result" (negative entry)
+CacheEntry = Tuple[Optional[GeocodeValue], float]
+
+
+class GeocodeStore(Protocol):
+    """Persistent tier: survives container recycling and is shared across instances."""
+
+    def get(self, key: str) -> Optional[CacheEntry]: ...
+
+    def put(self, key: str, value: Optional[GeocodeValue], expires_at: float) -> None: ...
+
+
+class FirestoreGeocodeStore:
+    """Stores cache entries as small documents keyed by geohash.
+
+    Operations:
+    - Enable a Firestore TTL policy on `expiresAt` for the collection so expired entries are purged
+      automatically; reads also ignore expired entries.
+    """
+
+    def __init__(self, client: Any, collection: str) -> None:
+        self._collection = client.collection(collection)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        snap = self._collection.document(key).get()
+        if not snap.exists:
+            return None
+        data = snap.to_dict() or {}
+        expires_at = data.get("expiresAt")
+        if not isinstance(expires_at, datetime):
+            return None
+        return data.get("value"), expires_at.timestamp()
+
+    def put(self, key: str, value: Optional[GeocodeValue], expires_at: float) -> None:
+        self._collection.document(key).set(
+            {
+                "value": value,
+                "negative": value is None,
+                "expiresAt": datetime.fromtimestamp(expires_at, tz=timezone.utc),
+            }
+        )
+
+
+class SQLiteGeocodeStore:
+    """Local SQLite file tier for single-host deployments and local development.
+
+    Note: on Cloud Run the filesystem is in-memory and per-instance; prefer the Firestore tier there.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode_cache ("
+                " key TEXT PRIMARY KEY, value TEXT, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM geocode_cache WHERE expires_at < ?", (time.time(),))
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM geocode_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value = json.loads(row[0]) if row[0] is not None else None
+        return value, float(row[1])
+
+    def put(self, key: str, value: Optional[GeocodeValue], expires_at: float) -> None:
+        encoded = json.dumps(value) if value is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, encoded, expires_at),
+            )
+
+
+class GeocodeCache:
+    """Two-tier reverse-geocoding cache keyed on a geohash cell.
+
+    Business:
+    - Vehicles cover the same streets daily, so most detections fall in an already-geocoded cell.
+      At precision 7 (~150 m cells) a hit returns the street/area of a previous nearby detection.
+
+    Cost:
+    - Every hit avoids one billable Geocoding API call and a few hundred ms of ingest latency.
+    - "No result" responses are cached for a shorter TTL (negative caching) so rural or
+      unaddressable cells don't trigger a paid lookup on every upload. API errors are never cached.
+
+    Thread-safe: lookups run in worker threads (see `_reverse_geocode_async`).
+    """
+
+    def __init__(
+        self,
+        precision: int = 7,
+        max_entries: int = 50_000,
+        ttl_seconds: float = 30 * 24 * 3600,
+        negative_ttl_seconds: float = 3600,
+        store: Optional[GeocodeStore] = None,
+    ) -> None:
+        self.precision = precision
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._store = store
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {
+            "memoryHits": 0,
+            "persistentHits": 0,
+            "negativeHits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "storeErrors": 0,
+        }
+
+    def key_for(self, lat: float, lng: float) -> str:
+        return geohash_encode(lat, lng, self.precision)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _remember(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _lookup(self, key: str) -> Tuple[bool, Optional[GeocodeValue]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self._counters["memoryHits"] += 1
+                    if entry[0] is None:
+                        self._counters["negativeHits"] += 1
+                    return True, entry[0]
+                del self._entries[key]
+
+        if self._store is not None:
+            try:
+                entry = self._store.get(key)
+            except Exception as e:
+                self._count("storeErrors")
+                logger.warning(f"Geocode cache store read failed: {e}")
+                entry = None
+            if entry is not None and entry[1] > now:
+                self._remember(key, entry)
+                self._count("persistentHits")
+                if entry[0] is None:
+                    self._count("negativeHits")
+                return True, entry[0]
+
+        return False, None
+
+    def get_or_fetch(
+        self, lat: float, lng: float, fetch: Callable[[], Optional[GeocodeValue]]
+    ) -> Optional[GeocodeValue]:
+        """Return the cached value for the cell containing (lat, lng), calling `fetch` on a miss.
+
+        `fetch` returns None for "no result" (cached negatively) and raises on API errors
+        (propagated, not cached).
+        """
+        key = self.key_for(lat, lng)
+        hit, value = self._lookup(key)
+        if hit:
+            return dict(value) if value is not None else None
+
+        self._count("misses")
+        value = fetch()
+        ttl = self.ttl_seconds if value is not None else self.negative_ttl_seconds
+        entry: CacheEntry = (value, time.time() + ttl)
+        self._remember(key, entry)
+        if self._store is not None:
+            try:
+                self._store.put(key, value, entry[1])
+            except Exception as e:
+                self._count("storeErrors")
+                logger.warning(f"Geocode cache store write failed: {e}")
+        return dict(value) if value is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        hits = counters["memoryHits"] + counters["persistentHits"]
+        lookups = hits + counters["misses"]
+        return {
+            **counters,
+            "entries": size,
+            "hitRatio": round(hits / lookups, 3) if lookups else 0.0,
+            "precision": self.precision,
+            "persistentTier": type(self._store).__name__ if self._store is not None else None,
+        }
@@ -1,35 +1,79 @@
 from __future__ import annotations
 
+import asyncio
 import io
 import json
 import os
+import threading
+import time
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from collections import defaultdict
 
-from fastapi import Depends, FastAPI, File, HTTPException, UploadFile, Query
+from fastapi import Depends, FastAPI, File, Form, HTTPException, Request, UploadFile, Query
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from loguru import logger
 from starlette import status
 
 from google.cloud import storage
 from google.cloud import firestore
-from ultralytics import YOLO
-from PIL import Image
-import googlemaps
-from sklearn.cluster import DBSCAN
 import numpy as np
+from PIL import Image
 
+from .aggregates import (
+    AreaAggregates,
+    DailyRollups,
+    compute_area_stats,
+    created_date,
+    stream_projection,
+)
 from .auth import api_key_auth
+from .batch_upload import BatchItem, BatchRequestError, apply_metadata, item_from_upload, items_from_zip
+from .batch_writer import ParallelBatchWriter, WriteOp, WriteRecorder
+from .backends import InferenceBackend, load_backend, resolve_model_path
+from .batching import MicroBatcher
+from .clustering import (
+    ClusterEngine,
+    plan_summary_writeback,
+    plan_writeback,
+    points_from_stream,
+    summary_from_doc,
+    summary_to_doc,
+)
 from .config import StoragePaths, get_settings
+from .dedup import DedupCache, DedupEntry, ImageFingerprint, image_fingerprint
+from .geocache import FirestoreGeocodeStore, GeocodeCache, GeocodeStore, SQLiteGeocodeStore
+from .metrics import MetricsMiddleware, render as render_metrics, stage, stats_collector, timed
 from .models import (
+    BatchItemMetadata,
     BoundingBox,
     DetectionMetadata,
     DetectionRecord,
     DetectionResult,
 )
+from .preprocess import PAD_VALUE, Letterbox, LetterboxBuffers, letterbox_into
+from .priority import (
+    OPEN_STATUSES,
+    PriorityIndex,
+    age_bonus,
+    queue_item,
+    refreshed_priority,
+    severity_level,
+    stale_age_queries,
+)
+from .response_cache import CachedResponse, ResponseCache
+from .sightings import group_nearby, merge_updates, nearest_open_detection, record_geohash
+from .tiling import RoadROI, TilePlanner, parse_roi_profiles
+from .uploads import BodySizeLimitMiddleware, ImageSource, UploadBuffer, open_source
+from .video import FrameSampler, GpsTrack, SamplingStats, VideoRequestError, take as take_frames
+from .write_behind import WriteBehindFull, WriteBehindQueue
+
+if TYPE_CHECKING:
+    import googlemaps
 
 
 app = FastAPI(
@@ -41,8 +85,42 @@ app = FastAPI(
     ),
 )
 
-# CORS
 settings = get_settings()
+
+
+def _max_upload_bytes() -> int:
+    return settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+
+
+def _max_batch_bytes() -> int:
+    return _max_upload_bytes() * settings.BATCH_MAX_ITEMS
+
+
+def _max_video_bytes() -> int:
+    return settings.VIDEO_MAX_UPLOAD_MB * 1024 * 1024
+
+
+def _spool_threshold_bytes() -> int:
+    return int(settings.UPLOAD_SPOOL_THRESHOLD_MB * 1024 * 1024)
+
+
+# Request bodies are capped before they are buffered; allow a little room for multipart framing
+# and form fields on top of the image limit
+_MULTIPART_OVERHEAD_BYTES = 64 * 1024
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    default_limit=_max_upload_bytes() + _MULTIPART_OVERHEAD_BYTES,
+    path_limits={
+        "/v1/detections/batch": _max_batch_bytes() + _MULTIPART_OVERHEAD_BYTES,
+        "/v1/detections/video": _max_video_bytes() + _MULTIPART_OVERHEAD_BYTES,
+    },
+)
+
+# Request latency per route template (wraps the size limit so 413 rejections are counted too)
+if settings.ENABLE_METRICS:
+    app.add_middleware(MetricsMiddleware)
+
+# CORS (added last so it wraps every response, including 413 rejections)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.allowed_origins_list,
@@ -54,9 +132,87 @@ app.add_middleware(
 # Global clients (Cloud Run containers are recycled; creating once per container is efficient)
 _storage_client: Optional[storage.Client] = None
 _firestore_client: Optional[firestore.Client] = None
-_yolo_model: Optional[YOLO] = None
+_inference_backend: Optional[InferenceBackend] = None
 _storage_paths = StoragePaths()
-_gmaps_client: Optional[googlemaps.Client] = None
+_gmaps_client: Optional["googlemaps.Client"] = None
+_geocode_cache: Optional[GeocodeCache] = None
+_area_aggregates: Optional[AreaAggregates] = None
+_daily_rollups: Optional[DailyRollups] = None
+_priority_index = PriorityIndex()
+_dedup_cache: Optional[DedupCache] = (
+    DedupCache(
+        max_entries=settings.DEDUP_MAX_ENTRIES,
+        ttl_seconds=settings.DEDUP_TTL_MINUTES * 60,
+        max_distance=settings.DEDUP_MAX_HAMMING,
+        radius_m=settings.DEDUP_RADIUS_M,
+        same_device=settings.DEDUP_SAME_DEVICE,
+    )
+    if settings.ENABLE_DEDUP
+    else None
+)
+_response_cache: Optional[ResponseCache] = (
+    ResponseCache(ttl_seconds=settings.RESPONSE_CACHE_TTL_S, max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES)
+    if settings.ENABLE_RESPONSE_CACHE
+    else None
+)
+_cluster_engine = ClusterEngine(
+    radius_m=settings.CLUSTER_RADIUS_M,
+    min_samples=settings.CLUSTER_MIN_SAMPLES,
+    hotspot_size=settings.CLUSTER_HOTSPOT_SIZE,
+)
+_cluster_refresh_lock = threading.Lock()
+_cluster_refresh_attempted_at: Optional[float] = None
+
+# A single inference thread: the model is CPU-bound and already multi-threaded internally, so
+# concurrent uploads are coalesced into batches instead of competing for cores.
+_inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+_letterbox_buffers = LetterboxBuffers(settings.INFERENCE_IMGSZ)
+_frame_sampler = FrameSampler(
+    distance_m=settings.VIDEO_SAMPLE_DISTANCE_M,
+    scene_threshold=settings.VIDEO_SCENE_CHANGE_THRESHOLD,
+    scene_check_s=settings.VIDEO_SCENE_CHECK_INTERVAL_S,
+    max_frames=settings.VIDEO_MAX_SAMPLED_FRAMES,
+    jpeg_quality=settings.VIDEO_JPEG_QUALITY,
+)
+_tile_planner = TilePlanner(
+    settings.INFERENCE_IMGSZ,
+    RoadROI.parse(settings.TILING_ROI),
+    parse_roi_profiles(settings.TILING_ROI_PROFILES),
+    columns=settings.TILING_COLUMNS,
+    overlap=settings.TILING_OVERLAP,
+    max_tiles=settings.TILING_MAX_TILES,
+    horizon=settings.TILING_HORIZON,
+)
+_warmup_future: Optional["Future[None]"] = None
+_startup_timings: Dict[str, float] = {}
+_inference_batcher: MicroBatcher[ImageSource, DetectionResult] = MicroBatcher(
+    lambda images: _infer_batch(images),
+    max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=settings.INFERENCE_MAX_WAIT_MS,
+    executor=_inference_executor,
+    name="inference",
+)
+_write_behind: Optional[WriteBehindQueue[DetectionRecord]] = (
+    WriteBehindQueue(
+        lambda records: _persist_records(records),
+        max_pending=settings.WRITE_BEHIND_MAX_PENDING,
+        batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+        max_delay_ms=settings.WRITE_BEHIND_MAX_DELAY_MS,
+        max_attempts=settings.WRITE_BEHIND_MAX_ATTEMPTS,
+        enqueue_timeout_s=settings.WRITE_BEHIND_ENQUEUE_TIMEOUT_S,
+        on_flushed=lambda records: _invalidate_read_caches(),
+        on_dropped=lambda records: _forget_unwritten(records),
+        name="write-behind",
+    )
+    if settings.ENABLE_WRITE_BEHIND
+    else None
+)
+
+# Component counters (cache hits, batch fill) are exported on /metrics when scraped
+stats_collector.add_cache("geocode", lambda: _geocode_cache)
+stats_collector.add_cache("dedup", lambda: _dedup_cache)
+stats_collector.add_cache("response", lambda: _response_cache)
+stats_collector.add_batcher("inference", lambda: _inference_batcher)
 
 
 @app.on_event("startup")
@@ -65,57 +221,205 @@ def on_startup() -> None:
 
     Cost/operations:
     - Storage/Firestore clients reuse TCP connections and are thread-safe in Cloud Run.
-    - YOLO model is loaded once per container to avoid repeated cold start costs.
+    - The detection model is loaded once per container (runtime per `INFERENCE_BACKEND`) to avoid
+      repeated cold start costs.
+    - Client setup and the model load are independent and run in parallel; stages that need the
+      Firestore client (including the cluster index read) start as soon as it is ready, overlapping
+      the model load. A per-stage timing breakdown is logged. A warm-up inference then runs on the inference thread in the background
+      (`/v1/health/ready` reports it), so the first real upload doesn't pay runtime initialization.
 
     Compliance:
     - Only minimal metadata is stored; images retained per policy with TTL via `expiresAt`.
     """
-    global _storage_client, _firestore_client, _yolo_model
-
     logger.remove()
     logger.add(lambda msg: print(msg, flush=True), level=settings.LOG_LEVEL)
 
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup") as pool:
+        stages = {
+            "gcpClients": pool.submit(_timed, _init_gcp_clients),
+            "mapsClient": pool.submit(_timed, _init_maps_client),
+            "modelLoad": pool.submit(_timed, _load_model),
+        }
+        _startup_timings["gcpClients"] = stages.pop("gcpClients").result()
+
+        # These need the Firestore client
+        stages["clusterIndex"] = pool.submit(_timed, _preload_cluster_index)
+        _startup_timings["priorityIndex"] = _timed(_attach_priority_index)
+        _startup_timings["geocodeCache"] = _timed(_init_geocode_cache)
+        for name, future in stages.items():
+            _startup_timings[name] = future.result()
+    _startup_timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info("Startup timings (ms): " + ", ".join(f"{k}={v}" for k, v in _startup_timings.items()))
+
+    _start_warmup()
+
+
+def _timed(fn: Any) -> float:
+    """Run a startup stage; returns its duration in ms. Stages log their own failures."""
+    start = time.perf_counter()
+    fn()
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def _init_gcp_clients() -> None:
+    global _storage_client, _firestore_client, _area_aggregates, _daily_rollups
     try:
         _storage_client = storage.Client(project=settings.GCP_PROJECT_ID or None)
         _firestore_client = firestore.Client(project=settings.GCP_PROJECT_ID or None)
+        if settings.ENABLE_AREA_AGGREGATES:
+            _area_aggregates = AreaAggregates(
+                _firestore_client, settings.AREA_STATS_COLLECTION, shards=settings.AGGREGATE_SHARDS
+            )
+        if settings.ENABLE_DAILY_ROLLUPS:
+            _daily_rollups = DailyRollups(
+                _firestore_client, settings.DAILY_STATS_COLLECTION, shards=settings.AGGREGATE_SHARDS
+            )
     except Exception as e:
         logger.error(f"GCP client initialization failed: {e}")
         # Do not raise: health endpoint should still work to report misconfig
-    
-    # Initialize Google Maps client for reverse geocoding
+
+
+def _init_maps_client() -> None:
+    """Google Maps client for reverse geocoding (imported only when geocoding is enabled)."""
+    global _gmaps_client
     if settings.ENABLE_REVERSE_GEOCODING and settings.GOOGLE_MAPS_API_KEY:
         try:
-            global _gmaps_client
+            import googlemaps
+
             _gmaps_client = googlemaps.Client(key=settings.GOOGLE_MAPS_API_KEY)
             logger.info("Google Maps client initialized for reverse geocoding")
         except Exception as e:
             logger.error(f"Google Maps client initialization failed: {e}")
 
-    # Model load
+
+def _attach_priority_index() -> None:
+    if settings.ENABLE_PRIORITY_INDEX and _firestore_client:
+        try:
+            _priority_index.attach(
+                _firestore_client.collection(settings.FIRESTORE_COLLECTION).where(
+                    "status", "in", list(OPEN_STATUSES)
+                )
+            )
+        except Exception as e:
+            logger.error(f"Priority index listener failed to start: {e}")
+
+
+def _preload_cluster_index() -> None:
+    """Load the cluster index up front so the first upload doesn't pay for the read."""
+    if settings.ENABLE_CLUSTERING and _firestore_client:
+        _refresh_cluster_index()
+
+
+def _init_geocode_cache() -> None:
+    global _geocode_cache
+    if settings.ENABLE_REVERSE_GEOCODING and settings.ENABLE_GEOCODE_CACHE:
+        _geocode_cache = _build_geocode_cache()
+
+
+def _load_model() -> None:
+    global _inference_backend
     try:
-        model_path = settings.YOLO_MODEL_PATH
+        model_path = resolve_model_path(
+            settings.INFERENCE_BACKEND,
+            settings.YOLO_MODEL_PATH,
+            settings.INFERENCE_MODEL_PATH,
+            settings.INFERENCE_PRECISION,
+        )
         if not os.path.exists(model_path):
             logger.error(
-                f"YOLO weights not found at {model_path}. Upload model to container filesystem."
+                f"Model not found at {model_path}. Upload model to container filesystem."
             )
         else:
-            _yolo_model = YOLO(model_path)
+            _inference_backend = load_backend(
+                settings.INFERENCE_BACKEND,
+                model_path,
+                imgsz=settings.INFERENCE_IMGSZ,
+                intra_op_threads=settings.INFERENCE_INTRA_OP_THREADS,
+                inter_op_threads=settings.INFERENCE_INTER_OP_THREADS,
+            )
             # Validation: ensure model exposes class names and appears to be pothole-capable
-            model_names = getattr(_yolo_model.model, 'names', None) or getattr(_yolo_model, 'names', None)
-            num_classes = len(model_names) if isinstance(model_names, (list, dict)) else 'unknown'
-            logger.info(f"YOLO model loaded from {model_path}; classes={num_classes}")
-            try:
-                names_list = list(model_names.values()) if isinstance(model_names, dict) else list(model_names or [])
-                if not names_list:
-                    logger.warning("Model has no class names metadata; ensure correct weights are provided.")
-                else:
-                    logger.info(f"Model class names: {names_list}")
-                    if not any('pothole' in str(n).lower() for n in names_list):
-                        logger.warning("'pothole' class not found in model names; verify correct pothole weights.")
-            except Exception:
-                logger.warning("Could not introspect model class names for validation.")
+            names_list = _inference_backend.class_names
+            logger.info(f"Model loaded from {model_path}; classes={len(names_list) or 'unknown'}")
+            if not names_list:
+                logger.warning("Model has no class names metadata; ensure correct weights are provided.")
+            else:
+                logger.info(f"Model class names: {names_list}")
+                if not any('pothole' in str(n).lower() for n in names_list):
+                    logger.warning("'pothole' class not found in model names; verify correct pothole weights.")
     except Exception as e:
-        logger.exception(f"Failed to load YOLO model: {e}")
+        logger.exception(f"Failed to load model: {e}")
+
+
+def _start_warmup() -> None:
+    """Queue the warm-up inference on the inference thread without blocking startup.
+
+    Uploads that arrive meanwhile queue behind it on the same thread, exactly as they would behind
+    a real batch.
+    """
+    global _warmup_future
+    if not settings.ENABLE_MODEL_WARMUP or not _inference_backend:
+        return
+    _warmup_future = _inference_executor.submit(_warmup)
+
+
+def _warmup() -> None:
+    """Run the full decode -> predict -> post-process path on a synthetic image.
+
+    The first call into a runtime pays one-off costs (thread pools, memory arenas, kernel selection,
+    lazy imports in the decode path); doing it here keeps them out of the first real request.
+    """
+    image = io.BytesIO()
+    Image.new("RGB", (settings.INFERENCE_IMGSZ, settings.INFERENCE_IMGSZ), (PAD_VALUE,) * 3).save(image, "JPEG")
+    sizes = [1] + ([settings.INFERENCE_MAX_BATCH_SIZE] if settings.INFERENCE_MAX_BATCH_SIZE > 1 else [])
+    start = time.perf_counter()
+    try:
+        for size in sizes:
+            for _ in range(settings.MODEL_WARMUP_RUNS):
+                _infer_batch([image.getvalue()] * size)
+        if settings.ENABLE_TILED_INFERENCE:
+            for _ in range(settings.MODEL_WARMUP_RUNS):
+                _infer_tiled(image.getvalue())
+    except Exception as e:
+        logger.warning(f"Model warm-up failed: {e}")
+    _startup_timings["warmup"] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info(f"Model warm-up finished in {_startup_timings['warmup']} ms (batch sizes {sizes})")
+
+
+def _build_geocode_cache() -> GeocodeCache:
+    store: Optional[GeocodeStore] = None
+    backend = settings.GEOCODE_CACHE_BACKEND.lower()
+    try:
+        if backend == "firestore" and _firestore_client:
+            store = FirestoreGeocodeStore(_firestore_client, settings.GEOCODE_CACHE_COLLECTION)
+        elif backend == "sqlite":
+            store = SQLiteGeocodeStore(settings.GEOCODE_CACHE_SQLITE_PATH)
+    except Exception as e:
+        logger.error(f"Geocode cache persistent tier '{backend}' unavailable, using memory only: {e}")
+
+    cache = GeocodeCache(
+        precision=settings.GEOCODE_CACHE_PRECISION,
+        max_entries=settings.GEOCODE_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.GEOCODE_CACHE_TTL_HOURS * 3600,
+        negative_ttl_seconds=settings.GEOCODE_CACHE_NEGATIVE_TTL_MINUTES * 60,
+        store=store,
+    )
+    logger.info(
+        f"Geocode cache enabled (precision={cache.precision}, tier={type(store).__name__ if store else 'memory'})"
+    )
+    return cache
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    # Queued detections are flushed first, while the Firestore client is still usable
+    if _write_behind is not None:
+        await _write_behind.close(settings.WRITE_BEHIND_SHUTDOWN_TIMEOUT_S)
+    _priority_index.detach()
+    if _warmup_future is not None:
+        _warmup_future.cancel()
+    await _inference_batcher.close()
+    _inference_executor.shutdown(wait=False)
 
 
 @app.get("/v1/health")
@@ -126,7 +430,16 @@ def health() -> Dict[str, Any]:
         "env": settings.ENV,
         "gcpProject": settings.GCP_PROJECT_ID or None,
         "storageBucket": settings.GCS_BUCKET or None,
-        "modelPresent": bool(_yolo_model),
+        "modelPresent": bool(_inference_backend),
+        "inferenceBackend": _inference_backend.name if _inference_backend else None,
+        "inferenceBatching": (
+            _inference_batcher.snapshot() if settings.ENABLE_INFERENCE_BATCHING else None
+        ),
+        "geocodeCache": _geocode_cache.stats() if _geocode_cache else None,
+        "dedupCache": _dedup_cache.stats() if _dedup_cache else None,
+        "writeBehind": _write_behind.snapshot() if _write_behind is not None else None,
+        "responseCache": _response_cache.stats() if _response_cache else None,
+        "startupMs": _startup_timings,
     }
 
 
@@ -142,7 +455,8 @@ def health_ready() -> Dict[str, Any]:
     checks = {
         "storage": bool(_storage_client),
         "firestore": bool(_firestore_client),
-        "model": bool(_yolo_model),
+        "model": bool(_inference_backend),
+        "warmup": _warmup_done(),
         "gmaps": bool(_gmaps_client) if settings.ENABLE_REVERSE_GEOCODING else True,
     }
     
@@ -155,6 +469,27 @@ def health_ready() -> Dict[str, Any]:
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Prometheus scrape endpoint: per-stage latency histograms, request latency, cache and batch counters.
+
+    Operations:
+    - Unauthenticated like the health probes; it exposes timings and counts, never record data.
+      Restrict it at the ingress (or set `ENABLE_METRICS=false`) if the service is public.
+    - Values are per instance; aggregate across Cloud Run instances in the monitoring backend.
+    """
+    if not settings.ENABLE_METRICS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
+def _warmup_done() -> bool:
+    if not settings.ENABLE_MODEL_WARMUP or not _inference_backend:
+        return True
+    return _warmup_future is not None and _warmup_future.done()
+
+
 def _ensure_gcp() -> None:
     if not _storage_client or not _firestore_client:
         raise HTTPException(
@@ -173,72 +508,217 @@ def _now_utc() -> datetime:
     return datetime.now(tz=timezone.utc)
 
 
-def _infer_potholes(img_bytes: bytes) -> DetectionResult:
-    if not _yolo_model:
+def _require_model() -> None:
+    if not _inference_backend:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Model not loaded. Deploy container with YOLO weights.",
+            detail="Model not loaded. Deploy container with model weights.",
+        )
+
+
+def _preprocess_image(source: ImageSource, out: np.ndarray) -> Letterbox:
+    # Reduced-resolution decode straight into the model input; spooled uploads are read from their buffer
+    with open_source(source) as fh:
+        return letterbox_into(fh, out)
+
+
+def _to_detection_result(detections: np.ndarray, millis: int, geometry: Letterbox) -> DetectionResult:
+    """Convert one backend output (`x1, y1, x2, y2, conf, cls` rows) into the API response model.
+
+    Boxes are reported in original-image pixel coordinates.
+    """
+    boxes: List[BoundingBox] = []
+    for x1, y1, x2, y2, conf, cls in detections.tolist():
+        # Top-left box for downstream consumers, with the letterbox undone
+        x, y, w, h = geometry.to_original(x1, y1, x2 - x1, y2 - y1)
+        boxes.append(
+            BoundingBox(
+                x=float(x),
+                y=float(y),
+                width=float(w),
+                height=float(h),
+                confidence=min(max(float(conf), 0.0), 1.0),
+                class_name=str(cls),
+            )
         )
 
+    return DetectionResult(
+        boundingBoxes=boxes,
+        numDetections=len(boxes),
+        modelVersion=_inference_backend.model_version if _inference_backend else "unknown",
+        inferenceMs=millis,
+    )
+
+
+def _infer_batch(images: List[ImageSource]) -> List[Any]:
+    """Run one batched forward pass over several uploads. Runs only on the inference thread.
+
+    Returns one entry per input: a `DetectionResult`, or an `HTTPException` for inputs that could
+    not be decoded or post-processed (so one bad upload does not fail the whole batch).
+    """
+    _require_model()
+    assert _inference_backend
+
+    start = _now_utc()
+    outputs: List[Any] = [None] * len(images)
+    buffers = _letterbox_buffers.get(len(images))
+    decoded: List[np.ndarray] = []
+    geometries: List[Letterbox] = []
+    decoded_idx: List[int] = []
+    for i, source in enumerate(images):
+        try:
+            out = buffers[len(decoded)]
+            with stage("decode"):
+                geometries.append(_preprocess_image(source, out))
+            decoded.append(out)
+            decoded_idx.append(i)
+        except Exception as e:
+            logger.warning(f"Image decode failed: {e}")
+            outputs[i] = HTTPException(status_code=500, detail="Inference error")
+
+    if decoded:
+        try:
+            with stage("predict"):
+                results = _inference_backend.predict(
+                    decoded,
+                    conf=settings.YOLO_CONFIDENCE_THRESHOLD,
+                    iou=settings.INFERENCE_NMS_IOU,
+                )
+        except Exception as e:
+            logger.exception(f"Inference failed: {e}")
+            raise HTTPException(status_code=500, detail="Inference error")
+
+        millis = int((_now_utc() - start).total_seconds() * 1000)
+        for i, r, geometry in zip(decoded_idx, results, geometries):
+            try:
+                with stage("postprocess"):
+                    outputs[i] = _to_detection_result(r, millis, geometry)
+            except Exception as e:
+                logger.exception(f"Post-processing error: {e}")
+                outputs[i] = HTTPException(status_code=500, detail="Post-processing error")
+
+    return outputs
+
+
+def _infer_potholes(source: ImageSource) -> DetectionResult:
+    result = _infer_batch([source])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def _infer_tiled(source: ImageSource, device_id: Optional[str] = None) -> DetectionResult:
+    """Run one frame as a batch of road-ROI tiles (see `TilePlanner`). Runs only on the inference thread.
+
+    Boxes from all tiles are merged across tile seams and reported in original-image pixels.
+    """
+    _require_model()
+    assert _inference_backend
+
     start = _now_utc()
     try:
-        # Use PIL to ensure consistent RGB
-        with Image.open(io.BytesIO(img_bytes)) as im:
-            im = im.convert("RGB")
-            results = _yolo_model.predict(
-                source=im,
-                verbose=False,
+        with stage("decode"):
+            with open_source(source) as fh:
+                frame, tiles = _tile_planner.prepare(fh, device_id, _letterbox_buffers)
+    except Exception as e:
+        logger.warning(f"Image decode failed: {e}")
+        raise HTTPException(status_code=500, detail="Inference error")
+
+    try:
+        with stage("predict"):
+            results = _inference_backend.predict(
+                tiles,
                 conf=settings.YOLO_CONFIDENCE_THRESHOLD,
-                imgsz=640,
-                device="cpu",
+                iou=settings.INFERENCE_NMS_IOU,
             )
     except Exception as e:
         logger.exception(f"Inference failed: {e}")
         raise HTTPException(status_code=500, detail="Inference error")
 
     millis = int((_now_utc() - start).total_seconds() * 1000)
-
-    boxes: List[BoundingBox] = []
     try:
-        for r in results:
-            if r.boxes is None:
-                continue
-            for b in r.boxes:
-                xywh = b.xywh[0].tolist()  # [x_center, y_center, w, h]
-                conf = float(b.conf[0].item()) if hasattr(b, "conf") else 0.0
-                # Convert center-based to top-left for downstream consumers
-                x, y, w, h = xywh
-                boxes.append(
-                    BoundingBox(
-                        x=float(x - w / 2),
-                        y=float(y - h / 2),
-                        width=float(w),
-                        height=float(h),
-                        confidence=conf,
-                        class_name=str(b.cls[0].item()) if hasattr(b, "cls") else "pothole",
-                    )
-                )
+        with stage("postprocess"):
+            detections = _tile_planner.merge(frame, results, settings.TILING_MERGE_THRESHOLD)
+            return _to_detection_result(detections, millis, frame.geometry)
     except Exception as e:
         logger.exception(f"Post-processing error: {e}")
         raise HTTPException(status_code=500, detail="Post-processing error")
 
-    return DetectionResult(
-        boundingBoxes=boxes,
-        numDetections=len(boxes),
-        modelVersion=str(_yolo_model.model.args.get("name", "yolov8")) if _yolo_model else "unknown",
-        inferenceMs=millis,
-    )
+
+async def _infer_potholes_async(source: ImageSource, device_id: Optional[str] = None) -> DetectionResult:
+    """Inference entry point for request handlers; goes through the micro-batcher when enabled.
+
+    Tiled frames skip the micro-batcher: their tiles already make up a full batch.
+    """
+    if settings.ENABLE_TILED_INFERENCE:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_inference_executor, _infer_tiled, source, device_id)
+    if not settings.ENABLE_INFERENCE_BATCHING:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_inference_executor, _infer_potholes, source)
+    _require_model()
+    return await _inference_batcher.submit(source)
+
+
+async def _infer_many(images: List[ImageSource], device_ids: Optional[List[Optional[str]]] = None) -> List[Any]:
+    """Inference for bulk uploads: full-size batches straight on the inference thread.
+
+    Batches are queued one at a time, so interactive uploads waiting on the same thread interleave
+    with a long bulk job instead of queueing behind all of it. With tiled inference each frame is
+    its own batch. Returns a `DetectionResult` or an exception per image.
+    """
+    loop = asyncio.get_running_loop()
+    outputs: List[Any] = []
+    if settings.ENABLE_TILED_INFERENCE:
+        for source, device_id in zip(images, device_ids or [None] * len(images)):
+            try:
+                outputs.append(await loop.run_in_executor(_inference_executor, _infer_tiled, source, device_id))
+            except Exception as e:
+                outputs.append(e)
+        return outputs
+
+    size = settings.INFERENCE_MAX_BATCH_SIZE
+    for start in range(0, len(images), size):
+        chunk = images[start:start + size]
+        try:
+            outputs.extend(await loop.run_in_executor(_inference_executor, _infer_batch, chunk))
+        except Exception as e:
+            outputs.extend([e] * len(chunk))
+    return outputs
 
 
-def _upload_to_gcs(object_name: str, data: bytes, content_type: str) -> str:
+def _upload_to_gcs(object_name: str, data: ImageSource, content_type: str) -> str:
     assert _storage_client
     bucket = _storage_client.bucket(settings.GCS_BUCKET)
     blob = bucket.blob(object_name)
-    blob.upload_from_string(data, content_type=content_type)
+    if isinstance(data, UploadBuffer):
+        # Streams from the spooled buffer; the image is never materialized as one bytes object
+        with data.open() as fh:
+            blob.upload_from_file(fh, size=data.size, content_type=content_type)
+    else:
+        blob.upload_from_string(data, content_type=content_type)
     # Signed URLs are optional; prefer private buckets with server-side access
     return f"gs://{settings.GCS_BUCKET}/{object_name}"
 
 
+def _delete_gcs_object(storage_url: str) -> None:
+    """Best-effort delete of a `gs://bucket/object` image to minimize storage costs."""
+    if not storage_url.startswith("gs://"):
+        return
+    parts = storage_url.replace("gs://", "").split("/", 1)
+    if len(parts) != 2:
+        return
+    bucket_name, object_name = parts[0], parts[1]
+    try:
+        client = _storage_client
+        assert client
+        bucket = client.bucket(bucket_name)
+        blob = bucket.blob(object_name)
+        blob.delete()
+    except Exception as e:
+        logger.warning(f"Blob delete failed: {e}")
+
+
 def _persist_record(record: DetectionRecord) -> None:
     assert _firestore_client
     doc_ref = (
@@ -247,25 +727,154 @@ def _persist_record(record: DetectionRecord) -> None:
     # Convert to Firestore-friendly dict
     payload = json.loads(record.model_dump_json())
     # Firestore uses RFC3339 timestamps; client lib handles datetime conversion
-    doc_ref.set(payload)
+    aggregators = _aggregators()
+    if not aggregators:
+        doc_ref.set(payload)
+        return
 
+    # Record and its aggregate increments commit atomically
+    batch = _firestore_client.batch()
+    batch.set(doc_ref, payload)
+    for aggregator in aggregators:
+        aggregator.on_create(batch, payload)
+    batch.commit()
 
-def _calculate_severity(num_detections: int, max_confidence: float) -> str:
-    """Calculate severity level based on detection count and confidence.
-    
-    - Low: 1 pothole with confidence <0.7
-    - Medium: 2 potholes OR confidence 0.7-0.9
-    - High: 3+ potholes OR confidence >0.9
+
+def _persist_records(records: List[DetectionRecord]) -> List[bool]:
+    """Persist many records with batched, parallel writes. Returns a committed flag per record.
+
+    Each record is grouped with its aggregate increments so the two always commit together; groups
+    are packed into 500-operation batches by the bulk writer.
+
+    Records are written with `create`, so resending a batch that already committed (a retry after
+    a timeout, or a write-behind re-flush) fails instead of applying the increments twice. For
+    failed groups the record is looked up: if it exists, its batch did commit, aggregates included.
+    """
+    assert _firestore_client
+    collection = _firestore_client.collection(settings.FIRESTORE_COLLECTION)
+    aggregators = _aggregators()
+    groups = []
+    for record in records:
+        payload = json.loads(record.model_dump_json())
+        recorder = WriteRecorder()
+        recorder.create(collection.document(record.id), payload)
+        for aggregator in aggregators:
+            aggregator.on_create(recorder, payload)
+        groups.append(recorder.ops)
+
+    report = _bulk_writer().commit_groups(groups)
+    failed = set(report.failed_groups)
+    if failed:
+        index_of = {records[i].id: i for i in failed}
+        try:
+            refs = [collection.document(records[i].id) for i in sorted(failed)]
+            for snap in _firestore_client.get_all(refs, field_paths=["id"]):
+                if snap.exists:
+                    failed.discard(index_of[snap.id])
+        except Exception as e:
+            # Left as failed: a retry can't double count (the create fails if the record landed)
+            logger.warning(f"Could not check {len(failed)} failed record writes: {e}")
+    return [i not in failed for i in range(len(records))]
+
+
+async def _store_sighting_async(record: DetectionRecord, merge_target: Optional[str]) -> Tuple[Dict[str, Any], bool]:
+    """`_store_sighting` for request handlers; new detections go through the write-behind queue.
+
+    With `ENABLE_WRITE_BEHIND` a new detection is acknowledged once queued (its image is already
+    in Cloud Storage) and committed with the next batch. Merges stay synchronous transactions. A
+    repeat sighting that arrives before the first one is flushed is stored as its own detection.
+    """
+    if _write_behind is None or merge_target is not None:
+        return await asyncio.to_thread(_store_sighting, record, merge_target)
+    try:
+        await _write_behind.put(record.id, record)
+    except WriteBehindFull as e:
+        logger.warning(f"Rejecting upload {record.id}: {e}")
+        await asyncio.to_thread(_delete_gcs_object, record.storagePath)
+        raise HTTPException(
+            status_code=503, detail="Ingestion backlog, retry later", headers={"Retry-After": "5"}
+        )
+    return json.loads(record.model_dump_json()), False
+
+
+async def _await_pending_write(detection_id: str) -> None:
+    """Let a queued write land before a transaction reads the document."""
+    if _write_behind is not None:
+        await _write_behind.wait_flushed(detection_id)
+
+
+def _forget_unwritten(records: List[DetectionRecord]) -> None:
+    """Undo the in-memory effects of detections the write-behind queue gave up on."""
+    loop = asyncio.get_running_loop()
+    for record in records:
+        logger.error(f"Detection {record.id} was never written; removing its image {record.storagePath}")
+        _priority_index.remove(record.id)
+        if _dedup_cache is not None:
+            _dedup_cache.forget(record.id)
+        loop.run_in_executor(None, _delete_gcs_object, record.storagePath)
+
+
+def _aggregators() -> List[Any]:
+    """Incrementally maintained analytics documents that must follow every detection write."""
+    return [a for a in (_area_aggregates, _daily_rollups) if a is not None]
+
+
+def _iso_key(dt: datetime) -> str:
+    """Prefix of the ISO-8601 string stored in `createdAt`, usable for range filters.
+
+    Records store timestamps as ISO strings (UTC), which sort chronologically, so
+    `createdAt >= _iso_key(cutoff)` selects everything created at or after `cutoff`.
     """
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _delete_record(detection_id: str) -> Optional[Dict[str, Any]]:
+    """Delete a detection document, keeping aggregates in step. Returns the deleted data."""
+    assert _firestore_client
+    doc_ref = _firestore_client.collection(settings.FIRESTORE_COLLECTION).document(detection_id)
+
+    @firestore.transactional
+    def _txn(transaction: firestore.Transaction) -> Optional[Dict[str, Any]]:
+        doc = doc_ref.get(transaction=transaction)
+        if not doc.exists:
+            return None
+        data = doc.to_dict() or {}
+        transaction.delete(doc_ref)
+        for aggregator in _aggregators():
+            aggregator.on_delete(transaction, data)
+        return data
+
+    return _txn(_firestore_client.transaction())
+
+
+def _update_record_status(detection_id: str, new_status: str) -> Optional[Dict[str, Any]]:
+    """Update a detection's status, keeping aggregates in step. Returns the updated data, or None if not found."""
+    assert _firestore_client
+    doc_ref = _firestore_client.collection(settings.FIRESTORE_COLLECTION).document(detection_id)
+
+    @firestore.transactional
+    def _txn(transaction: firestore.Transaction) -> Optional[Dict[str, Any]]:
+        doc = doc_ref.get(transaction=transaction)
+        if not doc.exists:
+            return None
+        data = doc.to_dict() or {}
+        transaction.update(doc_ref, {
+            "status": new_status,
+            "updatedAt": _now_utc(),
+        })
+        for aggregator in _aggregators():
+            aggregator.on_status_change(transaction, data, new_status)
+        return {**data, "status": new_status}
+
+    return _txn(_firestore_client.transaction())
+
+
+def _calculate_severity(num_detections: int, max_confidence: float) -> str:
+    """Calculate severity level based on detection count and confidence (see `severity_level`)."""
     if not settings.ENABLE_PRIORITY_SCORING:
         return "low"
     
-    if num_detections >= 3 or max_confidence > 0.9:
-        return "high"
-    elif num_detections == 2 or (0.7 <= max_confidence <= 0.9):
-        return "medium"
-    else:
-        return "low"
+    return severity_level(num_detections, max_confidence)
 
 
 def _calculate_priority_score(
@@ -279,7 +888,7 @@ def _calculate_priority_score(
     - Base score from severity (low=25, medium=50, high=75)
     - Add points for road type (residential=0, arterial=15, highway=25)
     - Add points for detection count (5 points per pothole)
-    - Add points for age (5 points per day unrepaired)
+    - Add points for age (5 points per full day unrepaired; kept current by the refresh job)
     """
     if not settings.ENABLE_PRIORITY_SCORING:
         return 0
@@ -296,145 +905,142 @@ def _calculate_priority_score(
     score += min(num_detections * 5, 20)  # Cap at 20 points
     
     # Age bonus (5 points per day, capped at 20)
-    score += min(int(age_days * 5), 20)
+    score += age_bonus(age_days)
     
     # Ensure 0-100 range
     return min(max(score, 0), 100)
 
 
+def _empty_geocode() -> Dict[str, Optional[str]]:
+    return {"street_name": None, "area": None, "road_type": "residential"}
+
+
+async def _reverse_geocode_async(
+    lat: Optional[float], lng: Optional[float]
+) -> Dict[str, Optional[str]]:
+    """Run the blocking Maps client call off the event loop."""
+    if lat is None or lng is None:
+        return _empty_geocode()
+    return await asyncio.to_thread(_reverse_geocode, lat, lng)
+
+
 def _reverse_geocode(lat: float, lng: float) -> Dict[str, Optional[str]]:
     """Convert lat/lng to address components using Google Maps Geocoding API.
     
     Returns dict with: street_name, area (neighborhood), road_type
+    Lookups go through the geohash-keyed cache when enabled.
     """
     if not settings.ENABLE_REVERSE_GEOCODING or not _gmaps_client:
-        return {"street_name": None, "area": None, "road_type": "residential"}
+        return _empty_geocode()
     
     try:
-        results = _gmaps_client.reverse_geocode((lat, lng))
-        
-        if not results:
-            return {"street_name": None, "area": None, "road_type": "residential"}
-        
-        result = results[0]
-        components = {c["types"][0]: c["long_name"] for c in result.get("address_components", [])}
-        
-        # Extract street name
-        street_name = components.get("route", None)
-        
-        # Extract neighborhood/area (try multiple component types)
-        area = (
-            components.get("neighborhood") or
-            components.get("sublocality") or
-            components.get("locality") or
-            None
-        )
-        
-        # Infer road type from address components (simplified heuristic)
-        road_type = "residential"
-        if street_name:
-            street_lower = street_name.lower()
-            if any(x in street_lower for x in ["highway", "hwy", "freeway"]):
-                road_type = "highway"
-            elif any(x in street_lower for x in ["avenue", "boulevard", "blvd", "parkway"]):
-                road_type = "arterial"
-        
-        return {
-            "street_name": street_name,
-            "area": area,
-            "road_type": road_type
-        }
+        if _geocode_cache is not None:
+            data = _geocode_cache.get_or_fetch(lat, lng, lambda: _fetch_reverse_geocode(lat, lng))
+        else:
+            data = _fetch_reverse_geocode(lat, lng)
     except Exception as e:
         logger.warning(f"Reverse geocoding failed: {e}")
-        return {"street_name": None, "area": None, "road_type": "residential"}
+        return _empty_geocode()
+
+    return data if data is not None else _empty_geocode()
 
 
-def _cluster_potholes(detections: List[Dict[str, Any]]) -> Dict[str, str]:
-    """Use DBSCAN to cluster nearby potholes (within 50 meters).
+def _fetch_reverse_geocode(lat: float, lng: float) -> Optional[Dict[str, Optional[str]]]:
+    """Single Geocoding API round trip. Returns None when Maps has no result; raises on API errors."""
+    assert _gmaps_client
+    results = _gmaps_client.reverse_geocode((lat, lng))
     
-    Returns dict mapping detection_id -> cluster_id.
-    Clusters with 5+ potholes are marked as hotspots.
-    """
-    if not settings.ENABLE_CLUSTERING or len(detections) < 2:
-        return {}
-    
-    # Extract coordinates
-    coords = []
-    detection_ids = []
-    for det in detections:
-        loc = det.get("metadata", {}).get("location")
-        if loc and "lat" in loc and "lng" in loc:
-            coords.append([loc["lat"], loc["lng"]])
-            detection_ids.append(det["id"])
-    
-    if len(coords) < 2:
-        return {}
-    
-    # Convert to numpy array
-    coords_array = np.array(coords)
-    
-    # DBSCAN clustering (eps in radians for haversine distance)
-    # 50 meters ≈ 0.00045 in lat/lng degrees (approximate)
-    # Using euclidean for simplicity; for production use haversine
-    try:
-        clustering = DBSCAN(eps=0.0005, min_samples=2, metric='euclidean').fit(coords_array)
-        
-        # Build cluster mapping
-        cluster_map = {}
-        for idx, label in enumerate(clustering.labels_):
-            if label != -1:  # -1 means noise (not in any cluster)
-                cluster_id = f"cluster_{label}"
-                detection_id = detection_ids[idx]
-                cluster_map[detection_id] = cluster_id
-        
-        return cluster_map
-    except Exception as e:
-        logger.warning(f"Clustering failed: {e}")
-        return {}
+    if not results:
+        return None
+    
+    result = results[0]
+    components = {c["types"][0]: c["long_name"] for c in result.get("address_components", [])}
+    
+    # Extract street name
+    street_name = components.get("route", None)
+    
+    # Extract neighborhood/area (try multiple component types)
+    area = (
+        components.get("neighborhood") or
+        components.get("sublocality") or
+        components.get("locality") or
+        None
+    )
+    
+    # Infer road type from address components (simplified heuristic)
+    road_type = "residential"
+    if street_name:
+        street_lower = street_name.lower()
+        if any(x in street_lower for x in ["highway", "hwy", "freeway"]):
+            road_type = "highway"
+        elif any(x in street_lower for x in ["avenue", "boulevard", "blvd", "parkway"]):
+            road_type = "arterial"
+    
+    return {
+        "street_name": street_name,
+        "area": area,
+        "road_type": road_type
+    }
 
 
-@app.post("/v1/detections", dependencies=[Depends(api_key_auth)])
-async def create_detection(
-    image: UploadFile = File(..., description="Image file (JPEG/PNG). Maximum 15 MB)."),
-    deviceId: Optional[str] = None,
-    lat: Optional[float] = None,
-    lng: Optional[float] = None,
-    alt: Optional[float] = None,
-    capturedAt: Optional[str] = None,
-):
-    """Create a detection from an uploaded image.
+def _load_cluster_index() -> None:
+    """Load persisted cluster summaries so new detections can join existing clusters."""
+    assert _firestore_client
+    docs = _firestore_client.collection(settings.CLUSTERS_COLLECTION).stream()
+    _cluster_engine.load([summary_from_doc(d.to_dict() or {}) for d in docs])
 
-    Business:
-    - Stores the original image in Cloud Storage and detection metadata in Firestore for auditing.
-    - Returns model outputs for client-side visualization.
 
-    Cost:
-    - One Cloud Storage write per upload; one Firestore document write; negligible egress (no signed URL by default).
-    - YOLO inference runs on CPU in Cloud Run; size accordingly (e.g., 2 vCPU/4 GiB for batch processing).
+def _cluster_index_due() -> bool:
+    last = max((t for t in (_cluster_engine.loaded_at, _cluster_refresh_attempted_at) if t is not None), default=None)
+    return last is None or time.monotonic() - last > settings.CLUSTER_INDEX_REFRESH_S
 
-    Compliance:
-    - `expiresAt` is persisted for TTL-based deletion in Firestore.
-    - Only geospatial and device metadata is stored; no PII is collected by default.
-    """
-    _ensure_gcp()
 
-    # File size guard (best-effort; Cloud Run also enforces request limits)
-    contents = await image.read()
-    max_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
-    if len(contents) > max_bytes:
-        raise HTTPException(status_code=413, detail="File too large")
+def _refresh_cluster_index() -> None:
+    """Reload the cluster index once it is older than CLUSTER_INDEX_REFRESH_S.
 
-    # Inference
-    result = _infer_potholes(contents)
+    Single-flight: one caller reloads while the others keep assigning against the current index.
+    Failed attempts count as attempts, so a Firestore outage is retried once per interval rather
+    than on every upload.
+    """
+    global _cluster_refresh_attempted_at
+    if not _cluster_index_due() or not _cluster_refresh_lock.acquire(blocking=False):
+        return
+    try:
+        if not _cluster_index_due():  # another caller refreshed while we checked
+            return
+        _cluster_refresh_attempted_at = time.monotonic()
+        _load_cluster_index()
+    except Exception as e:
+        logger.warning(f"Cluster index refresh failed: {e}")
+    finally:
+        _cluster_refresh_lock.release()
 
-    # Build identifiers and storage paths
-    uid = str(uuid.uuid4())
-    date_str = _now_utc().strftime("%Y-%m-%d")
-    ext = ".jpg" if image.content_type == "image/jpeg" else ".png"
 
-    storage_path = _storage_paths.image_object(date_str, uid, ext)
-    gs_path = _upload_to_gcs(storage_path, contents, image.content_type or "image/jpeg")
+def _assign_cluster(lat: Optional[float], lng: Optional[float]) -> Optional[str]:
+    """Incremental clustering: existing cluster for a new detection, without re-running the fit."""
+    if not settings.ENABLE_CLUSTERING or lat is None or lng is None:
+        return None
+    _refresh_cluster_index()
+    try:
+        return _cluster_engine.assign(lat, lng)
+    except Exception as e:
+        logger.warning(f"Cluster assignment failed: {e}")
+        return None
 
+
+def _build_record(
+    uid: str,
+    result: DetectionResult,
+    gs_path: str,
+    geocode_data: Dict[str, Optional[str]],
+    cluster_id: Optional[str],
+    deviceId: Optional[str] = None,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    alt: Optional[float] = None,
+    capturedAt: Optional[str] = None,
+) -> DetectionRecord:
+    """Assemble a detection record (severity, priority, urgency) from the joined pipeline stages."""
     # Metadata
     dt_captured: Optional[datetime] = None
     if capturedAt:
@@ -444,14 +1050,10 @@ async def create_detection(
             pass
 
     # Calculate severity and priority
+    created_at = _now_utc()
     max_conf = max([b.confidence for b in result.boundingBoxes], default=0.0)
     severity = _calculate_severity(result.numDetections, max_conf)
     
-    # Reverse geocoding
-    geocode_data = {"street_name": None, "area": None, "road_type": "residential"}
-    if lat is not None and lng is not None:
-        geocode_data = _reverse_geocode(lat, lng)
-    
     # Calculate priority score
     priority_score = _calculate_priority_score(
         severity=severity,
@@ -467,10 +1069,10 @@ async def create_detection(
     elif severity == "medium":
         repair_urgency = "urgent"
 
-    record = DetectionRecord(
+    return DetectionRecord(
         id=uid,
-        createdAt=_now_utc(),
-        expiresAt=_now_utc() + timedelta(days=settings.DATA_RETENTION_DAYS),
+        createdAt=created_at,
+        expiresAt=created_at + timedelta(days=settings.DATA_RETENTION_DAYS),
         metadata=DetectionMetadata(
             deviceId=deviceId,
             capturedAt=dt_captured,
@@ -492,14 +1094,668 @@ async def create_detection(
         street_name=geocode_data.get("street_name"),
         status="reported",
         repair_urgency=repair_urgency,
+        priority_base=priority_score,
+        age_bucket=0,
+        cluster_id=cluster_id,
         road_type=geocode_data.get("road_type", "residential"),
+        # Empty uploads are kept for auditing but are never a merge target
+        geohash=record_geohash(lat, lng) if result.numDetections else None,
+        lastSeenAt=created_at,
+        bestConfidence=max_conf if result.numDetections else None,
     )
 
-    # Persist
-    _persist_record(record)
+
+@app.post("/v1/detections", dependencies=[Depends(api_key_auth)])
+async def create_detection(
+    image: UploadFile = File(..., description="Image file (JPEG/PNG). Maximum 15 MB)."),
+    deviceId: Optional[str] = None,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    alt: Optional[float] = None,
+    capturedAt: Optional[str] = None,
+):
+    """Create a detection from an uploaded image.
+
+    Business:
+    - Stores the original image in Cloud Storage and detection metadata in Firestore for auditing.
+    - Returns model outputs for client-side visualization.
+
+    Cost:
+    - One Cloud Storage write per upload; one Firestore document write; negligible egress (no signed URL by default).
+    - YOLO inference runs on CPU in Cloud Run; size accordingly (e.g., 2 vCPU/4 GiB for batch processing).
+    - Retries and near-identical frames (`ENABLE_DEDUP`) return the stored record with 200 and an
+      `X-Duplicate-Of` header instead of creating another one; no inference, upload or write is done.
+
+    Latency:
+    - Inference, the Cloud Storage upload and reverse geocoding run concurrently; Firestore
+      persistence happens once they have joined. No blocking call runs on the event loop, so
+      health probes and other requests stay responsive while an upload is in flight.
+
+    Compliance:
+    - `expiresAt` is persisted for TTL-based deletion in Firestore.
+    - Only geospatial and device metadata is stored; no PII is collected by default.
+    """
+    _ensure_gcp()
+
+    # Size limit checked on the parser's spooled file (the request body is already capped by
+    # BodySizeLimitMiddleware); large images are read from that file instead of RAM
+    upload = await UploadBuffer.from_upload(image, _max_upload_bytes(), _spool_threshold_bytes())
+    try:
+        return await _create_detection(upload, image.content_type, deviceId, lat, lng, alt, capturedAt)
+    finally:
+        upload.close()
+
+
+async def _create_detection(
+    upload: UploadBuffer,
+    content_type: Optional[str],
+    deviceId: Optional[str],
+    lat: Optional[float],
+    lng: Optional[float],
+    alt: Optional[float],
+    capturedAt: Optional[str],
+) -> JSONResponse:
+
+    # Retries and near-identical frames resolve to the record already stored for them
+    fingerprint: Optional[ImageFingerprint] = None
+    if _dedup_cache is not None:
+        fingerprint = await timed("fingerprint", asyncio.to_thread(image_fingerprint, upload))
+        duplicate = _dedup_cache.match(fingerprint, deviceId, lat, lng)
+        if duplicate is not None:
+            return _duplicate_response(*duplicate)
+
+    # Build identifiers and storage paths
+    uid = str(uuid.uuid4())
+    date_str = _now_utc().strftime("%Y-%m-%d")
+    ext = ".jpg" if content_type == "image/jpeg" else ".png"
+    storage_path = _storage_paths.image_object(date_str, uid, ext)
+
+    # Inference, image upload and reverse geocoding are independent: run them concurrently so
+    # request latency tracks the slowest stage instead of their sum. Inference runs on the
+    # dedicated inference thread; blocking client calls run in the default thread pool.
+    result, gs_path, geocode_data, cluster_id, merge_target = await asyncio.gather(
+        timed("inference", _infer_potholes_async(upload, deviceId)),
+        timed("storage_upload", asyncio.to_thread(_upload_to_gcs, storage_path, upload, content_type or "image/jpeg")),
+        timed("reverse_geocode", _reverse_geocode_async(lat, lng)),
+        timed("cluster_assign", asyncio.to_thread(_assign_cluster, lat, lng)),
+        timed("sighting_lookup", asyncio.to_thread(_find_merge_target, lat, lng)),
+        return_exceptions=True,
+    )
+    if isinstance(result, BaseException):
+        # Don't leave an orphaned image behind for a request that failed
+        if isinstance(gs_path, str):
+            await asyncio.to_thread(_delete_gcs_object, gs_path)
+        raise result
+    if isinstance(gs_path, BaseException):
+        logger.error(f"Image upload failed: {gs_path}")
+        raise HTTPException(status_code=500, detail="Image upload failed")
+    if isinstance(geocode_data, BaseException):
+        logger.warning(f"Reverse geocoding failed: {geocode_data}")
+        geocode_data = _empty_geocode()
+    if isinstance(cluster_id, BaseException):
+        cluster_id = None
+    if isinstance(merge_target, BaseException) or not result.numDetections:
+        merge_target = None
+
+    record = _build_record(
+        uid, result, gs_path, geocode_data, cluster_id,
+        deviceId=deviceId, lat=lat, lng=lng, alt=alt, capturedAt=capturedAt,
+    )
+
+    # Persist once all stages have joined: a repeat sighting updates the open detection it belongs to
+    payload, merged = await timed("persist", _store_sighting_async(record, merge_target))
+    _invalidate_read_caches()
+    _priority_index.upsert(payload["id"], payload)
+    content = _merged_response(record, payload) if merged else payload
+    if _dedup_cache is not None and fingerprint is not None:
+        _dedup_cache.remember(fingerprint, payload["id"], content, deviceId, lat, lng)
 
     # Response payload excludes raw image data
-    return JSONResponse(status_code=201, content=json.loads(record.model_dump_json()))
+    if merged:
+        return JSONResponse(status_code=200, content=content, headers={"X-Merged-Into": payload["id"]})
+    return JSONResponse(status_code=201, content=content)
+
+
+def _merged_response(record: DetectionRecord, stored: Dict[str, Any]) -> Dict[str, Any]:
+    """Response for an upload merged into `stored`: this upload's own image and detection result,
+    plus the detection it joined and its sighting count."""
+    own = json.loads(record.model_dump_json(include={"createdAt", "metadata", "storagePath", "detection"}))
+    return {
+        **own,
+        "id": stored["id"],
+        "sightingId": record.id,
+        "mergedInto": stored["id"],
+        "sightings": stored.get("sightings"),
+    }
+
+
+def _find_merge_target(lat: Optional[float], lng: Optional[float]) -> Optional[str]:
+    """ID of the open detection a sighting at (lat, lng) belongs to, if any. Blocking."""
+    if not settings.ENABLE_SIGHTING_MERGE or lat is None or lng is None:
+        return None
+    assert _firestore_client
+    try:
+        nearest = nearest_open_detection(
+            _firestore_client.collection(settings.FIRESTORE_COLLECTION), lat, lng, settings.SIGHTING_MERGE_RADIUS_M
+        )
+    except Exception as e:
+        logger.warning(f"Sighting lookup failed: {e}")
+        return None
+    return nearest[0] if nearest else None
+
+
+def _merge_sighting(detection_id: str, record: DetectionRecord) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+    """Attach `record` as a sighting of an open detection, keeping aggregates in step.
+
+    Returns the updated detection and the images of sightings that fell off its recent list, or
+    None if the detection no longer exists or was closed since it was looked up.
+    """
+    assert _firestore_client
+    doc_ref = _firestore_client.collection(settings.FIRESTORE_COLLECTION).document(detection_id)
+    sighting = json.loads(record.model_dump_json())
+
+    @firestore.transactional
+    def _txn(transaction: firestore.Transaction) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+        doc = doc_ref.get(transaction=transaction)
+        if not doc.exists:
+            return None
+        data = doc.to_dict() or {}
+        if data.get("status", "reported") not in OPEN_STATUSES:
+            return None
+        updates, dropped = merge_updates(data, sighting, settings.SIGHTING_MAX_RECENT)
+        transaction.update(doc_ref, {**updates, "updatedAt": _now_utc()})
+        after = {**data, **updates}
+        for aggregator in _aggregators():
+            aggregator.on_update(transaction, data, after)
+        return after, dropped
+
+    return _txn(_firestore_client.transaction())
+
+
+def _store_sighting(record: DetectionRecord, merge_target: Optional[str]) -> Tuple[Dict[str, Any], bool]:
+    """Merge `record` into `merge_target`, or insert it as a new detection. Blocking.
+
+    Returns the stored detection (JSON form) and whether the upload was merged.
+    """
+    if merge_target is not None:
+        merged = _merge_sighting(merge_target, record)
+        if merged is not None:
+            data, dropped = merged
+            for path in dropped:
+                _delete_gcs_object(path)
+            logger.info(f"Sighting {record.id} merged into detection {merge_target}")
+            return jsonable_encoder({**data, "id": merge_target}), True
+    _persist_record(record)
+    return json.loads(record.model_dump_json()), False
+
+
+def _duplicate_response(match: str, entry: DedupEntry) -> JSONResponse:
+    """200 with the record already stored for this image (201 is reserved for new records)."""
+    logger.info(f"Duplicate upload ({match}) of detection {entry.record_id}")
+    headers = {"X-Duplicate-Of": entry.record_id, "X-Duplicate-Match": match}
+    return JSONResponse(status_code=200, content=entry.payload or {"id": entry.record_id}, headers=headers)
+
+
+@app.post("/v1/detections/batch", dependencies=[Depends(api_key_auth)])
+async def create_detections_batch(
+    images: Optional[List[UploadFile]] = File(None, description="Image files (JPEG/PNG), each up to 15 MB."),
+    archive: Optional[UploadFile] = File(None, description="Zip archive of images (alternative to `images`)."),
+    metadata: Optional[str] = Form(
+        None,
+        description=(
+            "JSON array of per-image metadata ({filename, deviceId, lat, lng, alt, capturedAt}), matched by"
+            " filename or by position. A zip archive may carry it as `metadata.json` instead."
+        ),
+    ),
+):
+    """Create detections for many images in one request (end-of-shift offloads, backfills).
+
+    Business:
+    - Same records as `POST /v1/detections`, one per image. Returns a result per image; one bad image
+      does not fail the others (201 when every image was stored, 207 Multi-Status otherwise).
+    - Duplicates of a stored record or of an earlier image in the batch are reported with status 200
+      and `duplicateOf` instead of being stored again.
+
+    Cost:
+    - One auth check and one request instead of hundreds. Firestore writes are batched (up to 500
+      operations per commit) and committed in parallel; each record still commits atomically with
+      its aggregate increments.
+
+    Throughput:
+    - Inference runs full-size batches on the inference thread, one batch at a time so interactive
+      uploads interleave with a bulk job. Cloud Storage uploads and geocoding run concurrently
+      (`BATCH_UPLOAD_CONCURRENCY`) alongside inference.
+
+    Compliance:
+    - Images whose detection could not be stored are deleted from Cloud Storage.
+    """
+    _ensure_gcp()
+    _require_model()
+
+    max_bytes = _max_upload_bytes()
+    spool_threshold = _spool_threshold_bytes()
+    if bool(images) == bool(archive):
+        raise HTTPException(status_code=400, detail="Provide either `images` or `archive`")
+
+    items: List[BatchItem] = []
+    try:
+        if archive is not None:
+            with await UploadBuffer.from_upload(
+                archive, _max_batch_bytes(), spool_threshold, detail="Archive too large"
+            ) as archive_buffer:
+                items, embedded_metadata = await asyncio.to_thread(
+                    items_from_zip, archive_buffer, settings.BATCH_MAX_ITEMS, max_bytes, spool_threshold
+                )
+            apply_metadata(items, metadata or embedded_metadata)
+        else:
+            assert images is not None
+            if len(images) > settings.BATCH_MAX_ITEMS:
+                raise BatchRequestError(f"Too many images (max {settings.BATCH_MAX_ITEMS})")
+            for i, f in enumerate(images):
+                items.append(await item_from_upload(i, f, max_bytes, spool_threshold))
+            apply_metadata(items, metadata)
+        if not items:
+            raise BatchRequestError("No JPEG/PNG images in request")
+        return await _create_detections_batch(items)
+    except BatchRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        for item in items:
+            item.release()
+
+
+async def _create_detections_batch(
+    items: List[BatchItem],
+    inferred: Optional[Dict[int, DetectionResult]] = None,
+    extra: Optional[Dict[str, Any]] = None,
+) -> JSONResponse:
+    """Store a batch of images and build the batch response; `extra` is added to its body."""
+    results, counts = await _store_batch(items, inferred)
+    return JSONResponse(
+        status_code=201 if counts["failed"] == 0 else 207,
+        content={"results": results, **counts, **(extra or {})},
+    )
+
+
+async def _store_batch(
+    items: List[BatchItem],
+    inferred: Optional[Dict[int, DetectionResult]] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Store a batch of images. Returns a result per item and the created/merged/duplicates/failed
+    counts. `inferred` holds results already computed per item index (video frames are run through
+    the model before it is known which are worth storing)."""
+
+    by_index = {item.index: item for item in items}
+    pending = [item for item in items if item.ok]
+    date_str = _now_utc().strftime("%Y-%m-%d")
+    uids = {item.index: str(uuid.uuid4()) for item in pending}
+
+    # Duplicates of stored records, or of an earlier image in this batch, are not processed again
+    fingerprints: Dict[int, ImageFingerprint] = {}
+    duplicates: Dict[int, Tuple[str, str]] = {}  # index -> (match, existing record id)
+    duplicate_of: Dict[int, Tuple[str, int]] = {}  # index -> (match, leading item index)
+    if _dedup_cache is not None and pending:
+        computed = await asyncio.to_thread(lambda: [image_fingerprint(item.source) for item in pending])
+        in_batch = DedupCache(
+            max_entries=len(pending),
+            ttl_seconds=_dedup_cache.ttl_seconds,
+            max_distance=_dedup_cache.max_distance,
+            radius_m=_dedup_cache.radius_m,
+            same_device=_dedup_cache.same_device,
+        )
+        leaders = {uids[item.index]: item.index for item in pending}
+        unique: List[BatchItem] = []
+        for item, fingerprint in zip(pending, computed):
+            meta = item.meta
+            stored = _dedup_cache.match(fingerprint, meta.deviceId, meta.lat, meta.lng)
+            earlier = None if stored else in_batch.match(fingerprint, meta.deviceId, meta.lat, meta.lng)
+            if stored is not None:
+                duplicates[item.index] = (stored[0], stored[1].record_id)
+                item.release()
+            elif earlier is not None:
+                duplicate_of[item.index] = (earlier[0], leaders[earlier[1].record_id])
+                item.release()
+            else:
+                fingerprints[item.index] = fingerprint
+                in_batch.remember(fingerprint, uids[item.index], None, meta.deviceId, meta.lat, meta.lng)
+                unique.append(item)
+        pending = unique
+    upload_slots = asyncio.Semaphore(settings.BATCH_UPLOAD_CONCURRENCY)
+    geocode_slots = asyncio.Semaphore(settings.BATCH_UPLOAD_CONCURRENCY)
+
+    async def _upload(item: BatchItem) -> str:
+        ext = ".jpg" if item.content_type == "image/jpeg" else ".png"
+        object_name = _storage_paths.image_object(date_str, uids[item.index], ext)
+        async with upload_slots:
+            return await timed(
+                "storage_upload", asyncio.to_thread(_upload_to_gcs, object_name, item.source, item.content_type)
+            )
+
+    async def _geocode(item: BatchItem) -> Dict[str, Optional[str]]:
+        async with geocode_slots:
+            return await timed("reverse_geocode", _reverse_geocode_async(item.meta.lat, item.meta.lng))
+
+    # Inference, uploads, geocoding and cluster assignment are independent stages
+    results, gs_paths, geocodes, cluster_ids = await asyncio.gather(
+        _infer_many([item.source for item in pending], [item.meta.deviceId for item in pending])
+        if inferred is None
+        else asyncio.sleep(0, result=[inferred[item.index] for item in pending]),
+        asyncio.gather(*(_upload(item) for item in pending), return_exceptions=True),
+        asyncio.gather(*(_geocode(item) for item in pending), return_exceptions=True),
+        asyncio.to_thread(lambda: [_assign_cluster(item.meta.lat, item.meta.lng) for item in pending]),
+    )
+
+    records: List[DetectionRecord] = []
+    owners: List[BatchItem] = []
+    orphaned: List[str] = []
+    for item, result, gs_path, geocode_data, cluster_id in zip(pending, results, gs_paths, geocodes, cluster_ids):
+        item.release()  # drop spooled images early; large batches hold hundreds of them
+        if isinstance(gs_path, BaseException):
+            logger.error(f"Image upload failed for {item.filename}: {gs_path}")
+            item.fail(500, "Image upload failed")
+            continue
+        if isinstance(result, BaseException):
+            orphaned.append(gs_path)
+            item.fail(getattr(result, "status_code", 500), str(getattr(result, "detail", "Inference error")))
+            continue
+        if isinstance(geocode_data, BaseException):
+            logger.warning(f"Reverse geocoding failed: {geocode_data}")
+            geocode_data = _empty_geocode()
+        meta = item.meta
+        records.append(
+            _build_record(
+                uids[item.index], result, gs_path, geocode_data, cluster_id,
+                deviceId=meta.deviceId, lat=meta.lat, lng=meta.lng, alt=meta.alt, capturedAt=meta.capturedAt,
+            )
+        )
+        owners.append(item)
+
+    # Repeat sightings of an open detection, or of an earlier image in this batch, are merged into it
+    targets, followers = await _plan_batch_merges(records)
+    inserts = [i for i in range(len(records)) if i not in targets and i not in followers]
+    committed = (
+        await timed("batch_persist", asyncio.to_thread(_persist_records, [records[i] for i in inserts]))
+        if inserts
+        else []
+    )
+
+    stored: Dict[int, Dict[str, Any]] = {}  # item index -> stored detection
+    merged: Dict[int, str] = {}  # item index -> detection the sighting was merged into
+    for i, ok in zip(inserts, committed):
+        if ok:
+            stored[owners[i].index] = json.loads(records[i].model_dump_json())
+        else:
+            orphaned.append(records[i].storagePath)
+            owners[i].fail(500, "Failed to store detection")
+    for i, leader in followers.items():
+        if owners[leader].index in stored:
+            targets[i] = records[leader].id
+    by_target: Dict[Optional[str], List[int]] = defaultdict(list)
+    for i in range(len(records)):
+        if i in targets or i in followers:
+            by_target[targets.get(i)].append(i)
+
+    # Sightings of one detection merge in order (each is a transaction on the same document);
+    # different detections merge concurrently. Without a target they are inserted individually.
+    async def _store_group(target: Optional[str], group: List[int]) -> None:
+        for i in group:
+            try:
+                payload, was_merged = await asyncio.to_thread(_store_sighting, records[i], target)
+            except Exception as e:
+                logger.error(f"Storing sighting {records[i].id} failed: {e}")
+                orphaned.append(records[i].storagePath)
+                owners[i].fail(500, "Failed to store detection")
+                continue
+            stored[owners[i].index] = payload
+            if was_merged:
+                merged[owners[i].index] = payload["id"]
+
+    await asyncio.gather(*(_store_group(target, group) for target, group in by_target.items()))
+    if stored:
+        _invalidate_read_caches()
+
+    created: Dict[int, Dict[str, Any]] = {}
+    for item in owners:
+        payload = stored.get(item.index)
+        if payload is None:
+            continue
+        _priority_index.upsert(payload["id"], payload)
+        if _dedup_cache is not None:
+            meta = item.meta
+            _dedup_cache.remember(fingerprints[item.index], payload["id"], payload, meta.deviceId, meta.lat, meta.lng)
+        if item.index not in merged:
+            created[item.index] = payload
+
+    if orphaned:
+        await asyncio.gather(*(asyncio.to_thread(_delete_gcs_object, path) for path in orphaned))
+
+    # Batch-internal duplicates share their leading image's outcome
+    for index, (match, leader) in duplicate_of.items():
+        if leader in stored:
+            duplicates[index] = (match, stored[leader]["id"])
+        else:
+            code, detail = by_index[leader].error or (500, "Not processed")
+            by_index[index].fail(code, detail)
+
+    response: List[Dict[str, Any]] = []
+    for item in items:
+        record = created.get(item.index)
+        if item.index in duplicates:
+            match, record_id = duplicates[item.index]
+            response.append({
+                "index": item.index,
+                "filename": item.filename,
+                "status": 200,
+                "id": record_id,
+                "duplicateOf": record_id,
+                "duplicateMatch": match,
+            })
+        elif item.index in merged:
+            response.append({
+                "index": item.index,
+                "filename": item.filename,
+                "status": 200,
+                "id": merged[item.index],
+                "mergedInto": merged[item.index],
+            })
+        elif record is not None:
+            response.append({
+                "index": item.index,
+                "filename": item.filename,
+                "status": 201,
+                "id": record["id"],
+                "storagePath": record["storagePath"],
+                "numDetections": record["detection"]["numDetections"],
+                "severity": record.get("severity"),
+                "priority_score": record.get("priority_score"),
+                "area": record.get("area"),
+                "cluster_id": record.get("cluster_id"),
+            })
+        else:
+            code, detail = item.error or (500, "Not processed")
+            response.append({"index": item.index, "filename": item.filename, "status": code, "error": detail})
+
+    failed = len(items) - len(created) - len(merged) - len(duplicates)
+    logger.info(
+        f"Batch upload: {len(created)} created, {len(merged)} merged, {len(duplicates)} duplicates, {failed} failed"
+    )
+    counts = {"created": len(created), "merged": len(merged), "duplicates": len(duplicates), "failed": failed}
+    return response, counts
+
+
+@app.post("/v1/detections/video", dependencies=[Depends(api_key_auth)])
+async def create_detections_video(
+    video: UploadFile = File(..., description="Video clip (MP4/MOV/MKV/WebM), up to VIDEO_MAX_UPLOAD_MB."),
+    track: Optional[str] = Form(
+        None, description="JSON array of GPS fixes ({t, lat, lng, alt}); `t` is seconds from the start of the clip."
+    ),
+    deviceId: Optional[str] = None,
+    startedAt: Optional[str] = None,
+):
+    """Create detections from a dashcam clip, storing only sampled frames that contain potholes.
+
+    Business:
+    - Vehicles upload what they record instead of extracting and uploading every frame. Each
+      stored frame becomes a detection exactly like a `POST /v1/detections/batch` image, located
+      from the GPS track and timestamped `startedAt + t`; repeat sightings merge as usual.
+
+    Cost:
+    - Frames are sampled by distance travelled (`VIDEO_SAMPLE_DISTANCE_M`), or by scene change
+      where there is no GPS fix, so a clip costs a few inferences per block instead of 30 per
+      second. Frames without detections are never uploaded or stored.
+
+    Latency/memory:
+    - The clip is spooled to a temp file and decoded frame by frame while the previous sampled
+      frames run through the model; sampled frames are inferred in full-size batches.
+
+    Returns 201 when every frame with detections was stored, 207 otherwise, and 200 when no frame
+    had any; `video` summarizes the sampling.
+    """
+    _ensure_gcp()
+    _require_model()
+
+    try:
+        gps = GpsTrack.parse(track)
+        started = datetime.fromisoformat(startedAt) if startedAt else None
+    except VideoRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="startedAt must be an ISO-8601 timestamp")
+
+    # Always on disk: the decoder reads the clip from a file
+    clip = await UploadBuffer.from_upload(video, _max_video_bytes(), 0, detail="Video too large")
+    try:
+        if clip.path is None:
+            raise HTTPException(status_code=400, detail="Empty video")
+        return await _create_detections_video(clip.path, gps, deviceId, started)
+    except VideoRequestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        clip.close()
+
+
+async def _create_detections_video(
+    path: str, gps: GpsTrack, deviceId: Optional[str], started: Optional[datetime]
+) -> JSONResponse:
+    stats = SamplingStats()
+    frames = _frame_sampler.frames(path, gps, stats)
+    chunk_size = settings.INFERENCE_MAX_BATCH_SIZE
+    store_size = settings.VIDEO_STORE_CHUNK_FRAMES
+    items: List[BatchItem] = []
+    inferred: Dict[int, DetectionResult] = {}
+    results: List[Dict[str, Any]] = []
+    counts = {"created": 0, "merged": 0, "duplicates": 0, "failed": 0}
+    with_detections = 0
+    failed_frames = 0
+    storing: Optional["asyncio.Future[None]"] = None
+
+    async def _store(chunk_items: List[BatchItem], chunk_inferred: Dict[int, DetectionResult]) -> None:
+        try:
+            chunk_results, chunk_counts = await _store_batch(chunk_items, inferred=chunk_inferred)
+        finally:
+            for item in chunk_items:
+                item.release()
+        results.extend(chunk_results)
+        for key, value in chunk_counts.items():
+            counts[key] += value
+
+    async def _flush() -> None:
+        # Frames with detections are stored in chunks as they come, one chunk in flight while the
+        # clip keeps being sampled, so at most two chunks of frames are held per request
+        nonlocal items, inferred, storing
+        if storing is not None:
+            await storing
+        storing = asyncio.ensure_future(_store(items, inferred)) if items else None
+        items, inferred = [], {}
+
+    # Decode the next chunk while the current one is in inference
+    next_chunk = asyncio.ensure_future(timed("video_sample", asyncio.to_thread(take_frames, frames, chunk_size)))
+    try:
+        while True:
+            chunk = await next_chunk
+            if not chunk:
+                break
+            next_chunk = asyncio.ensure_future(
+                timed("video_sample", asyncio.to_thread(take_frames, frames, chunk_size))
+            )
+            inference = await timed("inference", _infer_many([f.jpeg for f in chunk], [deviceId] * len(chunk)))
+            for frame, result in zip(chunk, inference):
+                if isinstance(result, BaseException):
+                    failed_frames += 1
+                    continue
+                if not result.numDetections:
+                    continue
+                captured = started + timedelta(seconds=frame.t) if started else None
+                item = BatchItem(
+                    index=with_detections,
+                    filename=f"frame-{frame.index:06d}.jpg",
+                    source=UploadBuffer.from_stream(io.BytesIO(frame.jpeg), len(frame.jpeg), _spool_threshold_bytes()),
+                    meta=BatchItemMetadata(
+                        deviceId=deviceId,
+                        lat=frame.lat,
+                        lng=frame.lng,
+                        alt=frame.alt,
+                        capturedAt=captured.isoformat() if captured else None,
+                    ),
+                )
+                with_detections += 1
+                items.append(item)
+                inferred[item.index] = result
+                if len(items) >= store_size:
+                    await _flush()
+        await _flush()
+        if storing is not None:
+            await storing
+    except BaseException:
+        for item in items:
+            item.release()
+        if storing is not None and not storing.done():
+            await asyncio.wait([storing])
+        raise
+    finally:
+        if not next_chunk.done():
+            await asyncio.wait([next_chunk])
+        await asyncio.to_thread(frames.close)
+
+    summary = {**stats.snapshot(), "framesWithDetections": with_detections, "framesFailed": failed_frames}
+    logger.info(
+        f"Video upload: {stats.frames_decoded} frames decoded, {stats.frames_sampled} sampled, "
+        f"{with_detections} with detections"
+    )
+    if not with_detections:
+        return JSONResponse(status_code=200, content={"results": [], **counts, "video": summary})
+    results.sort(key=lambda r: r["index"])
+    return JSONResponse(
+        status_code=201 if counts["failed"] == 0 else 207,
+        content={"results": results, **counts, "video": summary},
+    )
+
+
+async def _plan_batch_merges(records: List[DetectionRecord]) -> Tuple[Dict[int, str], Dict[int, int]]:
+    """Which batch records are repeat sightings: of a stored open detection (record index -> detection
+    ID), or of an earlier record in the batch with no stored match (record index -> leader index)."""
+    if not settings.ENABLE_SIGHTING_MERGE:
+        return {}, {}
+    located = [
+        i for i, r in enumerate(records)
+        if r.detection.numDetections and r.metadata.location is not None
+    ]
+    lookup_slots = asyncio.Semaphore(settings.BATCH_UPLOAD_CONCURRENCY)
+
+    async def _lookup(i: int) -> Optional[str]:
+        location = records[i].metadata.location
+        assert location is not None
+        async with lookup_slots:
+            return await asyncio.to_thread(_find_merge_target, location.lat, location.lng)
+
+    found = await asyncio.gather(*(_lookup(i) for i in located))
+    targets = {i: target for i, target in zip(located, found) if target}
+    points = []
+    for i in located:
+        location = records[i].metadata.location
+        if i not in targets and location is not None:
+            points.append((i, location.lat, location.lng))
+    return targets, group_nearby(points, settings.SIGHTING_MERGE_RADIUS_M)
 
 
 @app.delete("/v1/detections/{detection_id}", dependencies=[Depends(api_key_auth)])
@@ -508,46 +1764,47 @@ async def delete_detection(detection_id: str):
     _ensure_gcp()
     assert _firestore_client
 
-    doc_ref = _firestore_client.collection(settings.FIRESTORE_COLLECTION).document(
-        detection_id
-    )
-    doc = doc_ref.get()
-    if not doc.exists:
+    await _await_pending_write(detection_id)
+    data = await asyncio.to_thread(_delete_record, detection_id)
+    if data is None:
         raise HTTPException(status_code=404, detail="Not found")
+    _invalidate_read_caches()
+    _priority_index.remove(detection_id)
+    if _dedup_cache is not None:
+        _dedup_cache.forget(detection_id)
 
-    data = doc.to_dict() or {}
-    doc_ref.delete()
-
-    # Optionally delete the image blob to minimize storage costs
-    storage_path: Optional[str] = None
-    storage_url = data.get("storagePath")
-    if isinstance(storage_url, str) and storage_url.startswith("gs://"):
-        parts = storage_url.replace("gs://", "").split("/", 1)
-        if len(parts) == 2:
-            bucket_name, object_name = parts[0], parts[1]
-            try:
-                client = _storage_client
-                assert client
-                bucket = client.bucket(bucket_name)
-                blob = bucket.blob(object_name)
-                blob.delete()
-            except Exception as e:
-                logger.warning(f"Blob delete failed: {e}")
+    # Optionally delete the image blobs (first upload and merged sightings) to minimize storage costs
+    storage_urls = [data.get("storagePath")] + [s.get("storagePath") for s in data.get("recentSightings") or []]
+    paths = {url for url in storage_urls if isinstance(url, str)}
+    await asyncio.gather(*(asyncio.to_thread(_delete_gcs_object, path) for path in paths))
 
     return {"status": "deleted", "id": detection_id}
 
 
 @app.get("/v1/detections/priority-queue")
 async def get_priority_queue(
+    request: Request,
     status: Optional[str] = Query(None, description="Filter by status (reported/verified/scheduled/repaired)"),
     limit: int = Query(100, ge=1, le=500, description="Maximum number of results"),
 ):
     """Get all potholes sorted by priority score (highest first).
     
     Returns unrepaired potholes with location, severity, priority_score, area, and street_name.
+    Open statuses are served from the in-memory priority index when it is loaded. Responses are
+    cached briefly and carry an ETag (see `_cached_json`).
     """
     _ensure_gcp()
+    return await _cached_json(
+        request, "priority-queue", {"status": status, "limit": limit}, lambda: _priority_queue(status, limit)
+    )
+
+
+async def _priority_queue(status: Optional[str], limit: int) -> Dict[str, Any]:
     assert _firestore_client
+
+    if _priority_index.ready and (status is None or status in OPEN_STATUSES):
+        results = _priority_index.top(limit, status)
+        return {"queue": results, "count": len(results)}
     
     try:
         # Query Firestore
@@ -557,31 +1814,19 @@ async def get_priority_queue(
         if status:
             query = query.where("status", "==", status)
         else:
-            query = query.where("status", "in", ["reported", "verified", "scheduled"])
+            query = query.where("status", "in", list(OPEN_STATUSES))
         
         # Order by priority_score descending
         query = query.order_by("priority_score", direction=firestore.Query.DESCENDING)
         query = query.limit(limit)
         
-        docs = query.stream()
+        docs = await asyncio.to_thread(lambda: list(query.stream()))
         
         results = []
         for doc in docs:
             data = doc.to_dict()
             if data:
-                results.append({
-                    "id": doc.id,
-                    "location": data.get("metadata", {}).get("location"),
-                    "severity": data.get("severity"),
-                    "priority_score": data.get("priority_score"),
-                    "area": data.get("area"),
-                    "street_name": data.get("street_name"),
-                    "status": data.get("status"),
-                    "repair_urgency": data.get("repair_urgency"),
-                    "numDetections": data.get("detection", {}).get("numDetections", 0),
-                    "createdAt": data.get("createdAt"),
-                    "cluster_id": data.get("cluster_id"),
-                })
+                results.append(queue_item(doc.id, data))
         
         return {"queue": results, "count": len(results)}
     except Exception as e:
@@ -589,8 +1834,30 @@ async def get_priority_queue(
         raise HTTPException(status_code=500, detail="Query failed")
 
 
+@app.get("/v1/detections/{detection_id}", dependencies=[Depends(api_key_auth)])
+async def get_detection(detection_id: str):
+    """Fetch one detection by ID.
+
+    With `ENABLE_WRITE_BEHIND`, a detection that was accepted but not yet committed is returned
+    from the queue, marked with an `X-Write-Pending: true` header.
+    """
+    _ensure_gcp()
+    assert _firestore_client
+
+    if _write_behind is not None:
+        pending = _write_behind.get(detection_id)
+        if pending is not None:
+            return JSONResponse(content=json.loads(pending.model_dump_json()), headers={"X-Write-Pending": "true"})
+
+    doc_ref = _firestore_client.collection(settings.FIRESTORE_COLLECTION).document(detection_id)
+    doc = await asyncio.to_thread(doc_ref.get)
+    if not doc.exists:
+        raise HTTPException(status_code=404, detail="Not found")
+    return jsonable_encoder({**(doc.to_dict() or {}), "id": detection_id})
+
+
 @app.get("/v1/analytics/by-area")
-async def get_area_analytics():
+async def get_area_analytics(request: Request):
     """Get analytics grouped by area/neighborhood.
     
     Returns:
@@ -598,56 +1865,37 @@ async def get_area_analytics():
     - Average severity per area
     - Hotspot areas (>10 potholes)
     - Priority areas for repair
+
+    Cached briefly per instance and invalidated by writes; send `If-None-Match` to get 304.
     """
     if not settings.ENABLE_ANALYTICS:
         raise HTTPException(status_code=503, detail="Analytics disabled")
     
     _ensure_gcp()
+    return await _cached_json(request, "by-area", {}, _area_analytics)
+
+
+async def _area_analytics() -> Dict[str, Any]:
     assert _firestore_client
-    
+
     try:
-        # Fetch all detections
-        docs = _firestore_client.collection(settings.FIRESTORE_COLLECTION).stream()
-        
-        # Group by area
-        area_stats = defaultdict(lambda: {
-            "count": 0,
-            "high": 0,
-            "medium": 0,
-            "low": 0,
-            "repaired": 0,
-            "pending": 0,
-            "avg_priority": 0,
-            "priority_sum": 0,
-        })
-        
-        for doc in docs:
-            data = doc.to_dict()
-            if not data:
-                continue
-            
-            area = data.get("area") or "Unknown"
-            severity = data.get("severity", "low")
-            status = data.get("status", "reported")
-            priority = data.get("priority_score", 0)
-            
-            stats = area_stats[area]
-            stats["count"] += 1
-            stats[severity] += 1
-            stats["priority_sum"] += priority
-            
-            if status == "repaired":
-                stats["repaired"] += 1
-            else:
-                stats["pending"] += 1
+        area_rows = await asyncio.to_thread(_area_aggregates.read_all) if _area_aggregates is not None else []
+        if area_rows:
+            # O(areas): one small aggregate document per area
+            area_stats = {row.pop("area"): row for row in area_rows}
+        else:
+            # Fallback (aggregates disabled, or not built yet): full (projected) collection scan
+            detections = _firestore_client.collection(settings.FIRESTORE_COLLECTION)
+            area_stats = await asyncio.to_thread(
+                lambda: compute_area_stats(stream_projection(detections, page_size=1000))
+            )
         
         # Calculate averages and identify hotspots
         results = []
         hotspots = []
         
         for area, stats in area_stats.items():
-            if stats["count"] > 0:
-                stats["avg_priority"] = stats["priority_sum"] / stats["count"]
+            stats["avg_priority"] = stats["priority_sum"] / stats["count"] if stats["count"] > 0 else 0
             
             area_data = {
                 "area": area,
@@ -690,6 +1938,7 @@ async def get_area_analytics():
 
 @app.get("/v1/analytics/statistics")
 async def get_statistics(
+    request: Request,
     days: int = Query(30, ge=1, le=365, description="Number of days to analyze")
 ):
     """Get overall statistics for dashboard analytics.
@@ -700,69 +1949,47 @@ async def get_statistics(
     - Detections over time
     - Average repair time
     - Top hotspot areas
+
+    Cached briefly per instance and invalidated by writes; send `If-None-Match` to get 304.
     """
     if not settings.ENABLE_ANALYTICS:
         raise HTTPException(status_code=503, detail="Analytics disabled")
     
     _ensure_gcp()
+    return await _cached_json(request, "statistics", {"days": days}, lambda: _statistics(days))
+
+
+async def _statistics(days: int) -> Dict[str, Any]:
     assert _firestore_client
-    
+
     try:
         # Fetch detections from the last N days
         cutoff_date = _now_utc() - timedelta(days=days)
         
-        docs = _firestore_client.collection(settings.FIRESTORE_COLLECTION).stream()
+        daily: List[Dict[str, Any]] = []
+        if _daily_rollups is not None:
+            # ~days small rollup documents (day granularity: the whole cutoff day is included)
+            daily = await asyncio.to_thread(
+                _daily_rollups.read_range, cutoff_date.date(), _now_utc().date()
+            )
+        if not daily:
+            # Rollups disabled, not built yet, or a window without detections (a cheap range scan)
+            daily = await asyncio.to_thread(_scan_daily_counts, cutoff_date)
         
-        total_count = 0
-        repaired_count = 0
-        pending_count = 0
-        detections_by_date = defaultdict(int)
-        repair_times = []
+        total_count = sum(d["count"] for d in daily)
+        repaired_count = sum(d["repaired"] for d in daily)
+        pending_count = total_count - repaired_count
         area_counts = defaultdict(int)
-        
-        for doc in docs:
-            data = doc.to_dict()
-            if not data:
-                continue
-            
-            created_at = data.get("createdAt")
-            if isinstance(created_at, str):
-                try:
-                    created_at = datetime.fromisoformat(created_at)
-                except:
-                    continue
-            
-            # Skip old data
-            if created_at and created_at < cutoff_date:
-                continue
-            
-            total_count += 1
-            
-            status = data.get("status", "reported")
-            if status == "repaired":
-                repaired_count += 1
-            else:
-                pending_count += 1
-            
-            # Track by date
-            if created_at:
-                date_key = created_at.strftime("%Y-%m-%d")
-                detections_by_date[date_key] += 1
-            
-            # Calculate repair time if repaired
-            # Note: We'd need a repairedAt field for accurate calculation
-            # For now, just track counts
-            
-            # Track area counts
-            area = data.get("area", "Unknown")
-            area_counts[area] += 1
+        for d in daily:
+            for area, count in d["areas"].items():
+                area_counts[area] += count
         
         # Top 5 hotspot areas
         top_areas = sorted(area_counts.items(), key=lambda x: x[1], reverse=True)[:5]
         hotspot_areas = [{"area": area, "count": count} for area, count in top_areas]
         
         # Detections timeline
-        timeline = [{"date": date, "count": count} for date, count in sorted(detections_by_date.items())]
+        timeline = [{"date": d["date"], "count": d["count"]} for d in daily]
         
         # Cost savings estimate (placeholder calculation)
         # Assume proactive repair saves $500 per pothole vs reactive
@@ -784,6 +2011,55 @@ async def get_statistics(
         raise HTTPException(status_code=500, detail="Query failed")
 
 
+async def _cached_json(
+    request: Request, namespace: str, params: Dict[str, Any], compute: Callable[[], Awaitable[Any]]
+) -> Response:
+    """Serve a read endpoint through the response cache, with ETag / If-None-Match revalidation.
+
+    `Cache-Control: no-cache` lets browsers keep the body but revalidate every load; an unchanged
+    answer then costs a 304 with no body.
+    """
+    if _response_cache is not None:
+        cached = await _response_cache.get_or_compute(ResponseCache.key(namespace, params), compute)
+    else:
+        cached = CachedResponse.from_payload(await compute())
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if cached.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+def _invalidate_read_caches() -> None:
+    """Called after every detection write so cached analytics never outlive it on this instance."""
+    if _response_cache is not None:
+        _response_cache.invalidate()
+
+
+def _scan_daily_counts(cutoff: datetime) -> List[Dict[str, Any]]:
+    """Per-day counts computed from the detections themselves (used when rollups are disabled).
+
+    The date range is pushed down to Firestore and only `createdAt`, `status` and `area` are read,
+    in pages, so the cost is proportional to the window rather than the whole collection.
+    """
+    assert _firestore_client
+    query = _firestore_client.collection(settings.FIRESTORE_COLLECTION).where(
+        "createdAt", ">=", _iso_key(cutoff)
+    )
+    by_day: Dict[str, Dict[str, Any]] = {}
+    for data in stream_projection(
+        query, page_size=1000, fields=["createdAt", "status", "area"], order_by="createdAt"
+    ):
+        day = created_date(data.get("createdAt"))
+        if day is None:
+            continue
+        row = by_day.setdefault(day, {"date": day, "count": 0, "repaired": 0, "areas": defaultdict(int)})
+        row["count"] += 1
+        if data.get("status", "reported") == "repaired":
+            row["repaired"] += 1
+        row["areas"][data.get("area") or "Unknown"] += 1
+    return [by_day[day] for day in sorted(by_day)]
+
+
 @app.post("/v1/detections/{detection_id}/update-status", dependencies=[Depends(api_key_auth)])
 async def update_detection_status(
     detection_id: str,
@@ -798,17 +2074,16 @@ async def update_detection_status(
         raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {valid_statuses}")
     
     try:
-        doc_ref = _firestore_client.collection(settings.FIRESTORE_COLLECTION).document(detection_id)
-        doc = doc_ref.get()
-        
-        if not doc.exists:
+        # Update status (and the aggregates' repaired/pending counters)
+        await _await_pending_write(detection_id)
+        updated = await asyncio.to_thread(_update_record_status, detection_id, status)
+        if updated is None:
             raise HTTPException(status_code=404, detail="Detection not found")
-        
-        # Update status
-        doc_ref.update({
-            "status": status,
-            "updatedAt": _now_utc(),
-        })
+        _invalidate_read_caches()
+        _priority_index.upsert(detection_id, updated)
+        if _dedup_cache is not None:
+            # Cached payloads carry the old status; a re-upload after a repair is a new report
+            _dedup_cache.forget(detection_id)
         
         return {"id": detection_id, "status": status, "updated": True}
     except HTTPException:
@@ -823,6 +2098,8 @@ async def run_clustering():
     """Run DBSCAN clustering on all detections to identify hotspots.
     
     This endpoint can be called periodically (e.g., daily) to update cluster assignments.
+    Uses haversine distance (`CLUSTER_RADIUS_M`); cluster IDs are stable across runs. Between
+    runs, new detections join existing clusters at ingest time (see `_assign_cluster`).
     """
     if not settings.ENABLE_CLUSTERING:
         raise HTTPException(status_code=503, detail="Clustering disabled")
@@ -831,51 +2108,142 @@ async def run_clustering():
     assert _firestore_client
     
     try:
-        # Fetch all unrepaired detections
-        docs = _firestore_client.collection(settings.FIRESTORE_COLLECTION)\
-            .where("status", "in", ["reported", "verified", "scheduled"])\
-            .stream()
-        
-        detections = []
-        for doc in docs:
-            data = doc.to_dict()
-            if data:
-                detections.append({"id": doc.id, **data})
-        
-        # Run clustering
-        cluster_map = _cluster_potholes(detections)
-        
-        # Update Firestore with cluster assignments
-        batch = _firestore_client.batch()
-        update_count = 0
-        
-        for detection_id, cluster_id in cluster_map.items():
-            doc_ref = _firestore_client.collection(settings.FIRESTORE_COLLECTION).document(detection_id)
-            batch.update(doc_ref, {"cluster_id": cluster_id})
-            update_count += 1
-            
-            # Firestore batch limit is 500 operations
-            if update_count % 500 == 0:
-                batch.commit()
-                batch = _firestore_client.batch()
-        
-        # Commit remaining updates
-        if update_count % 500 != 0:
-            batch.commit()
-        
-        # Count clusters
-        unique_clusters = len(set(cluster_map.values()))
-        
-        return {
-            "clustered_detections": len(cluster_map),
-            "total_clusters": unique_clusters,
-            "unclustered": len(detections) - len(cluster_map),
-        }
+        result = await asyncio.to_thread(_run_clustering_job)
+        _invalidate_read_caches()
+        return result
     except Exception as e:
         logger.exception(f"Clustering failed: {e}")
         raise HTTPException(status_code=500, detail="Clustering failed")
 
 
+def _bulk_writer() -> ParallelBatchWriter:
+    assert _firestore_client
+    return ParallelBatchWriter(
+        _firestore_client,
+        max_workers=settings.FIRESTORE_WRITE_WORKERS,
+        max_attempts=settings.FIRESTORE_WRITE_MAX_ATTEMPTS,
+    )
+
+
+def _run_clustering_job() -> Dict[str, Any]:
+    assert _firestore_client
+    detections = _firestore_client.collection(settings.FIRESTORE_COLLECTION)
+
+    # Fetch all unrepaired detections (location and current cluster only)
+    docs = detections\
+        .where("status", "in", list(OPEN_STATUSES))\
+        .select(["metadata.location", "cluster_id"])\
+        .stream()
+    points = points_from_stream(docs)
+
+    # Run clustering
+    assignments, summaries = _cluster_engine.fit(points)
+    clustered = sum(1 for cluster_id in assignments if cluster_id is not None)
+
+    # Write back only documents whose cluster_id changed (including clears for new noise points)
+    changes = plan_writeback(points, assignments)
+    updated_at = _now_utc()
+    ops = [
+        WriteOp("update", detections.document(detection_id), {"cluster_id": cluster_id, "updatedAt": updated_at})
+        for detection_id, cluster_id in changes
+    ]
+    report = _bulk_writer().commit_groups([op] for op in ops)
+    write_failures = report.failed
+    if report.failed_groups:
+        write_failures = _retry_cluster_writeback([ops[i] for i in report.failed_groups])
+
+    # Persist cluster summaries for incremental assignment on every instance (changed ones only)
+    clusters = _firestore_client.collection(settings.CLUSTERS_COLLECTION)
+    stored = {doc.id: doc.to_dict() or {} for doc in clusters.stream()}
+    upserts, removed = plan_summary_writeback(stored, summaries)
+    summary_report = _bulk_writer().commit(
+        [WriteOp("set", clusters.document(summary.cluster_id), summary_to_doc(summary)) for summary in upserts]
+        + [WriteOp("delete", clusters.document(cluster_id)) for cluster_id in removed]
+    )
+
+    return {
+        "clustered_detections": clustered,
+        "total_clusters": len(summaries),
+        "hotspots": sum(1 for summary in summaries if summary.hotspot),
+        "unclustered": len(points) - clustered,
+        "updated": sum(1 for _, cluster_id in changes if cluster_id is not None),
+        "cleared": sum(1 for _, cluster_id in changes if cluster_id is None),
+        "unchanged": len(points) - len(changes),
+        "write_failures": write_failures + summary_report.failed,
+    }
+
+
+def _retry_cluster_writeback(ops: List[WriteOp]) -> int:
+    """Re-commit cluster assignments from failed batches, minus detections deleted meanwhile.
+
+    An update of a detection deleted while the job ran fails its whole batch with NotFound (not
+    retryable), which would drop every other assignment in it. Returns the writes still failing.
+    """
+    assert _firestore_client
+    try:
+        snaps = _firestore_client.get_all([op.ref for op in ops], field_paths=["status"])
+        existing = {snap.id for snap in snaps if snap.exists}
+    except Exception as e:
+        logger.warning(f"Could not check {len(ops)} failed cluster writes: {e}")
+        return len(ops)
+    retry = [op for op in ops if op.ref.id in existing]
+    if len(retry) < len(ops):
+        logger.info(f"Cluster write-back: {len(ops) - len(retry)} detections deleted during the run")
+    return _bulk_writer().commit(retry).failed if retry else 0
+
+
+@app.post("/v1/analytics/refresh-priorities", dependencies=[Depends(api_key_auth)])
+async def refresh_priorities():
+    """Recompute the age bonus for detections whose age crossed a day boundary.
+
+    Schedule hourly (e.g., Cloud Scheduler). Only documents that moved into a new age bucket are
+    read and written; detections older than the bonus cap are never touched again.
+    """
+    if not settings.ENABLE_PRIORITY_SCORING:
+        raise HTTPException(status_code=503, detail="Priority scoring disabled")
+    
+    _ensure_gcp()
+    
+    try:
+        result = await asyncio.to_thread(_refresh_priorities_job)
+        _invalidate_read_caches()
+        return result
+    except Exception as e:
+        logger.exception(f"Priority refresh failed: {e}")
+        raise HTTPException(status_code=500, detail="Priority refresh failed")
+
+
+def _refresh_priorities_job() -> Dict[str, Any]:
+    assert _firestore_client
+    detections = _firestore_client.collection(settings.FIRESTORE_COLLECTION)
+    now = _now_utc()
+
+    scanned = 0
+    aggregators = _aggregators()
+    groups: List[List[WriteOp]] = []
+    for _, query in stale_age_queries(detections, now, _iso_key):
+        for doc in query.stream():
+            scanned += 1
+            data = doc.to_dict() or {}
+            updates = refreshed_priority(data, now)
+            if updates is None:
+                continue
+            # The new score and its area aggregate delta (`priority_sum`) commit together
+            recorder = WriteRecorder()
+            recorder.update(doc.reference, {**updates, "updatedAt": now})
+            for aggregator in aggregators:
+                aggregator.on_update(recorder, data, {**data, **updates})
+            groups.append(recorder.ops)
+
+    # Listeners (including this instance's priority index) pick the new scores up as change events
+    report = _bulk_writer().commit_groups(groups)
+    return {
+        "scanned": scanned,
+        "updated": len(groups) - len(report.failed_groups),
+        "write_failures": len(report.failed_groups),
+    }
+
+
 # Root route (optional)
 @app.get("/")
 def root():
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple, TypeVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+
+T = TypeVar("T")
+
+# 1 ms .. 30 s: covers a cache hit up to a cold geocoding call or a slow batch commit
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = Histogram(
+    "roadsense_stage_duration_seconds",
+    "Duration of one pipeline stage (decode, inference, upload, geocoding, persist, ...)",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+STAGE_ERRORS = Counter("roadsense_stage_errors_total", "Pipeline stages that raised", ["stage"])
+STAGE_IN_FLIGHT = Gauge("roadsense_stage_in_flight", "Pipeline stages currently running", ["stage"])
+
+REQUEST_SECONDS = Histogram(
+    "roadsense_http_request_duration_seconds",
+    "HTTP request duration by route template",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge("roadsense_http_requests_in_flight", "HTTP requests currently being served")
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block as pipeline stage `name` (works in worker threads and on the event loop)."""
+    in_flight = STAGE_IN_FLIGHT.labels(name)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.labels(name).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(name).observe(time.perf_counter() - start)
+        in_flight.dec()
+
+
+async def timed(name: str, awaitable: Awaitable[T]) -> T:
+    """Await `awaitable` as pipeline stage `name` (for stages joined with `asyncio.gather`)."""
+    with stage(name):
+        return await awaitable
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Record a stage measured elsewhere (e.g. queue wait computed by the micro-batcher)."""
+    STAGE_SECONDS.labels(name).observe(seconds)
+
+
+class StatsCollector(Collector):
+    """Exports the counters components already keep (`stats()` / `snapshot()`) at scrape time.
+
+    Caches and the micro-batcher count hits and batches themselves; reading them on scrape keeps
+    the hot path free of extra metric updates. Sources are callables so components created at
+    startup (or disabled) are looked up when scraped.
+    """
+
+    def __init__(self) -> None:
+        self._caches: Dict[str, Callable[[], Optional[Any]]] = {}
+        self._batchers: Dict[str, Callable[[], Optional[Any]]] = {}
+
+    def add_cache(self, name: str, source: Callable[[], Optional[Any]]) -> None:
+        self._caches[name] = source
+
+    def add_batcher(self, name: str, source: Callable[[], Optional[Any]]) -> None:
+        self._batchers[name] = source
+
+    def collect(self) -> Iterator[Any]:
+        lookups = CounterMetricFamily(
+            "roadsense_cache_lookups", "Cache lookups by result", labels=["cache", "result"]
+        )
+        evictions = CounterMetricFamily("roadsense_cache_evictions", "Cache LRU evictions", labels=["cache"])
+        entries = GaugeMetricFamily("roadsense_cache_entries", "Entries held in memory", labels=["cache"])
+        for name, source in self._caches.items():
+            cache = source()
+            if cache is None:
+                continue
+            stats = cache.stats()
+            for key, value in stats.items():
+                if key.endswith("Hits") or key == "misses":
+                    lookups.add_metric([name, key], float(value))
+            evictions.add_metric([name], float(stats.get("evictions", 0)))
+            entries.add_metric([name], float(stats.get("entries", 0)))
+        yield lookups
+        yield evictions
+        yield entries
+
+        batches = CounterMetricFamily("roadsense_batcher_batches", "Batches dispatched", labels=["batcher"])
+        items = CounterMetricFamily("roadsense_batcher_items", "Items dispatched in batches", labels=["batcher"])
+        failed = CounterMetricFamily("roadsense_batcher_failed_batches", "Batches that raised", labels=["batcher"])
+        waited = CounterMetricFamily(
+            "roadsense_batcher_queue_wait_seconds", "Total time items waited for a batch", labels=["batcher"]
+        )
+        depth = GaugeMetricFamily("roadsense_batcher_queue_depth", "Items waiting for a batch", labels=["batcher"])
+        for name, source in self._batchers.items():
+            batcher = source()
+            if batcher is None:
+                continue
+            snapshot = batcher.snapshot()
+            batches.add_metric([name], float(snapshot["batches"]))
+            items.add_metric([name], float(snapshot["items"]))
+            failed.add_metric([name], float(snapshot["failedBatches"]))
+            waited.add_metric([name], batcher.stats.queue_wait_ms_sum / 1000.0)
+            depth.add_metric([name], float(snapshot["queueDepth"]))
+        yield batches
+        yield items
+        yield failed
+        yield waited
+        yield depth
+
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+
+def render() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with its content type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """Request duration per route template and in-flight requests, as pure ASGI (no body buffering).
+
+    Requests that match no route are labelled `unmatched` so scanners probing random paths can't
+    blow up label cardinality.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def tracking_send(message: Dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, tracking_send)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            REQUEST_SECONDS.labels(
+                scope.get("method", ""), getattr(route, "path", "unmatched"), str(status_code)
+            ).observe(time.perf_counter() - start)
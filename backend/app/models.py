@@ -38,6 +38,26 @@ class DetectionRequest(BaseModel):
         return self
 
 
+class BatchItemMetadata(BaseModel):
+    """Per-image metadata for batch uploads (matched to images by `filename`, or by position)."""
+
+    filename: Optional[str] = Field(default=None, description="Image file name (or path within the zip archive)")
+    deviceId: Optional[str] = Field(default=None, description="Client-supplied device identifier")
+    lat: Optional[float] = Field(default=None, ge=-90.0, le=90.0)
+    lng: Optional[float] = Field(default=None, ge=-180.0, le=180.0)
+    alt: Optional[float] = Field(default=None)
+    capturedAt: Optional[str] = Field(default=None, description="ISO-8601 capture time")
+
+
+class TrackPoint(BaseModel):
+    """One GPS fix recorded alongside a video clip."""
+
+    t: float = Field(..., ge=0.0, description="Seconds from the start of the clip")
+    lat: float = Field(..., ge=-90.0, le=90.0)
+    lng: float = Field(..., ge=-180.0, le=180.0)
+    alt: Optional[float] = Field(default=None)
+
+
 class DetectionResult(BaseModel):
     boundingBoxes: List[BoundingBox]
     numDetections: int
@@ -45,6 +65,18 @@ class DetectionResult(BaseModel):
     inferenceMs: int
 
 
+class Sighting(BaseModel):
+    """A later upload of an already-recorded pothole, merged into its record."""
+
+    id: str = Field(..., description="Upload identifier (also the image object name)")
+    seenAt: datetime
+    storagePath: str
+    deviceId: Optional[str] = None
+    capturedAt: Optional[datetime] = None
+    confidence: float = Field(default=0.0, ge=0.0, le=1.0, description="Best box confidence in this upload")
+    numDetections: int = 0
+
+
 class DetectionRecord(BaseModel):
     id: str
     createdAt: datetime
@@ -55,9 +87,17 @@ class DetectionRecord(BaseModel):
     # Priority and area analysis fields
     severity: Optional[str] = Field(default=None, description="low/medium/high based on detection count and confidence")
     priority_score: Optional[int] = Field(default=None, ge=0, le=100, description="Calculated ranking score 0-100")
+    priority_base: Optional[int] = Field(default=None, ge=0, le=100, description="Priority score before the age bonus")
+    age_bucket: Optional[int] = Field(default=0, ge=0, description="Whole days of age already included in priority_score")
     area: Optional[str] = Field(default=None, description="Neighborhood/ward name from reverse geocoding")
     street_name: Optional[str] = Field(default=None, description="Street name from reverse geocoding")
     status: str = Field(default="reported", description="reported/verified/scheduled/repaired")
     repair_urgency: Optional[str] = Field(default=None, description="routine/urgent/emergency")
     cluster_id: Optional[str] = Field(default=None, description="Cluster identifier for grouped potholes")
     road_type: Optional[str] = Field(default="residential", description="residential/arterial/highway")
+    # Repeat sightings (uploads within the merge radius of this open detection)
+    geohash: Optional[str] = Field(default=None, description="Geohash of the location, for radius lookups")
+    sightings: int = Field(default=1, ge=1, description="Uploads merged into this record, including the first")
+    lastSeenAt: Optional[datetime] = Field(default=None, description="Time of the latest sighting")
+    bestConfidence: Optional[float] = Field(default=None, ge=0.0, le=1.0, description="Best confidence over all sightings")
+    recentSightings: List[Sighting] = Field(default_factory=list, description="Latest merged sightings (bounded)")
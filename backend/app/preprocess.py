@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import BinaryIO, List, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+
+# Letterbox padding value used by YOLO training pipelines
+PAD_VALUE = 114
+
+# EXIF orientations that rotate the image by 90/270 degrees (width and height swap)
+_TRANSPOSING_ORIENTATIONS = {5, 6, 7, 8}
+_EXIF_ORIENTATION_TAG = 0x0112
+
+
+@dataclass
+class Letterbox:
+    """Where the original (EXIF-oriented) image sits inside a square model input."""
+
+    orig_width: int
+    orig_height: int
+    scale_x: float
+    scale_y: float
+    pad_x: int
+    pad_y: int
+
+    def to_original(self, x: float, y: float, w: float, h: float) -> Tuple[float, float, float, float]:
+        """Map a top-left `x, y, w, h` box from model-input pixels back to original-image pixels."""
+        x0 = min(max((x - self.pad_x) / self.scale_x, 0.0), float(self.orig_width))
+        y0 = min(max((y - self.pad_y) / self.scale_y, 0.0), float(self.orig_height))
+        x1 = min(max((x + w - self.pad_x) / self.scale_x, 0.0), float(self.orig_width))
+        y1 = min(max((y + h - self.pad_y) / self.scale_y, 0.0), float(self.orig_height))
+        return x0, y0, x1 - x0, y1 - y0
+
+
+class LetterboxBuffers:
+    """Preallocated `imgsz x imgsz x 3` uint8 input arrays, reused across inference batches.
+
+    Not thread-safe: owned by the single inference thread. Arrays are only valid until the next
+    `get` call, which is fine because the model copies its inputs into a tensor during `predict`.
+    """
+
+    def __init__(self, imgsz: int) -> None:
+        self.imgsz = imgsz
+        self._arrays: List[np.ndarray] = []
+
+    def get(self, n: int) -> List[np.ndarray]:
+        while len(self._arrays) < n:
+            self._arrays.append(np.empty((self.imgsz, self.imgsz, 3), dtype=np.uint8))
+        return self._arrays[:n]
+
+
+def letterbox_into(fh: BinaryIO, out: np.ndarray) -> Letterbox:
+    """Decode an image straight into a preallocated square BGR array, preserving aspect ratio.
+
+    Operations:
+    - JPEGs are decoded with `Image.draft`, which lets libjpeg scale by 1/2, 1/4 or 1/8 in the DCT
+      domain; a 12 MP frame is decoded at roughly the model input size instead of full resolution
+      (several-fold less CPU and ~1/16th of the pixel memory). Other formats decode normally.
+    - EXIF orientation is applied, so boxes line up with the image as viewed on a phone.
+    - The result is written as BGR (the channel order ultralytics expects for NumPy inputs) into
+      `out`, centered and padded with the YOLO letterbox gray.
+    """
+    imgsz = out.shape[0]
+    with Image.open(fh) as im:
+        stored_w, stored_h = im.size
+        orig_w, orig_h = oriented_size(im)
+
+        # Ask libjpeg for the smallest DCT scale that still covers the model input
+        ratio = imgsz / max(stored_w, stored_h)
+        if ratio < 1.0:
+            im.draft("RGB", (max(1, int(stored_w * ratio + 0.5)), max(1, int(stored_h * ratio + 0.5))))
+
+        return letterbox_image(to_rgb(im), out, orig_w, orig_h)
+
+
+def oriented_size(im: Image.Image) -> Tuple[int, int]:
+    """Width and height of `im` as viewed, i.e. after its EXIF orientation is applied."""
+    stored_w, stored_h = im.size
+    if im.getexif().get(_EXIF_ORIENTATION_TAG, 1) in _TRANSPOSING_ORIENTATIONS:
+        return stored_h, stored_w
+    return stored_w, stored_h
+
+
+def to_rgb(im: Image.Image) -> Image.Image:
+    """`im` with its EXIF orientation applied, in RGB (decodes it, honouring any `draft` request)."""
+    img = ImageOps.exif_transpose(im) if im.getexif().get(_EXIF_ORIENTATION_TAG, 1) != 1 else im
+    return img if img.mode == "RGB" else img.convert("RGB")
+
+
+def letterbox_image(img: Image.Image, out: np.ndarray, orig_w: int, orig_h: int) -> Letterbox:
+    """Resize an RGB image into the square BGR array `out`, centered on the letterbox gray.
+
+    `orig_w x orig_h` is the size the returned geometry maps boxes back to; it differs from
+    `img.size` when the image was decoded at reduced resolution.
+    """
+    imgsz = out.shape[0]
+    scale = min(imgsz / orig_w, imgsz / orig_h)
+    new_w = max(1, min(imgsz, int(round(orig_w * scale))))
+    new_h = max(1, min(imgsz, int(round(orig_h * scale))))
+    if img.size != (new_w, new_h):
+        img = img.resize((new_w, new_h), Image.BILINEAR, reducing_gap=2.0)
+
+    pad_x = (imgsz - new_w) // 2
+    pad_y = (imgsz - new_h) // 2
+    out.fill(PAD_VALUE)
+    out[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = np.asarray(img)[..., ::-1]
+
+    return Letterbox(
+        orig_width=orig_w,
+        orig_height=orig_h,
+        scale_x=new_w / orig_w,
+        scale_y=new_h / orig_h,
+        pad_x=pad_x,
+        pad_y=pad_y,
+    )
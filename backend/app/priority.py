@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import bisect
+import heapq
+import threading
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+
+OPEN_STATUSES = ("reported", "verified", "scheduled")
+
+# Age bonus: 5 points per full day unrepaired, capped at 20 points (reached after 4 days)
+AGE_POINTS_PER_DAY = 5
+AGE_BONUS_CAP = 20
+MAX_AGE_BUCKET = AGE_BONUS_CAP // AGE_POINTS_PER_DAY
+
+
+def severity_level(num_detections: int, max_confidence: float) -> str:
+    """Severity from detection count and best confidence.
+
+    - Low: 1 pothole with confidence <0.7
+    - Medium: 2 potholes OR confidence 0.7-0.9
+    - High: 3+ potholes OR confidence >0.9
+    """
+    if num_detections >= 3 or max_confidence > 0.9:
+        return "high"
+    elif num_detections == 2 or (0.7 <= max_confidence <= 0.9):
+        return "medium"
+    else:
+        return "low"
+
+
+def age_bucket(age_days: float) -> int:
+    """Whole days of age that count towards the bonus (0..MAX_AGE_BUCKET)."""
+    return max(0, min(int(age_days), MAX_AGE_BUCKET))
+
+
+def age_bonus(age_days: float) -> int:
+    return age_bucket(age_days) * AGE_POINTS_PER_DAY
+
+
+def parse_created_at(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    return None
+
+
+def queue_item(doc_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Priority-queue response entry for a detection document."""
+    return {
+        "id": doc_id,
+        "location": (data.get("metadata") or {}).get("location"),
+        "severity": data.get("severity"),
+        "priority_score": data.get("priority_score"),
+        "area": data.get("area"),
+        "street_name": data.get("street_name"),
+        "status": data.get("status"),
+        "repair_urgency": data.get("repair_urgency"),
+        "numDetections": (data.get("detection") or {}).get("numDetections", 0),
+        "createdAt": data.get("createdAt"),
+        "cluster_id": data.get("cluster_id"),
+    }
+
+
+def stale_age_queries(collection: Any, now: datetime, iso_key: Any) -> Iterator[Tuple[int, Any]]:
+    """One query per age bucket selecting documents whose age has crossed into the next bucket.
+
+    A document in bucket `b` needs a refresh once it is at least `b + 1` days old. Documents at the
+    cap never match, so after four days a detection is never touched again by the refresh job.
+    Requires a composite index on (`age_bucket` ASC, `createdAt` ASC).
+    """
+    for bucket in range(MAX_AGE_BUCKET):
+        threshold = iso_key(now - timedelta(days=bucket + 1))
+        query = (
+            collection.where("age_bucket", "==", bucket)
+            .where("createdAt", "<=", threshold)
+            # Plus what the area aggregates need to move the score's contribution along with it
+            .select(["createdAt", "priority_base", "age_bucket", "priority_score", "severity", "status", "area"])
+        )
+        yield bucket, query
+
+
+def refreshed_priority(data: Dict[str, Any], now: datetime) -> Optional[Dict[str, Any]]:
+    """Fields to update for a document whose age bucket may have changed, or None if unchanged."""
+    created = parse_created_at(data.get("createdAt"))
+    base = data.get("priority_base")
+    if created is None or base is None:
+        return None
+    bucket = age_bucket((now - created).total_seconds() / 86400)
+    if bucket == data.get("age_bucket"):
+        return None
+    return {
+        "age_bucket": bucket,
+        "priority_score": min(max(int(base) + bucket * AGE_POINTS_PER_DAY, 0), 100),
+    }
+
+
+_SortKey = Tuple[int, str, str]
+
+
+class PriorityIndex:
+    """In-memory ranking of open detections, kept current from Firestore change events.
+
+    Operations:
+    - One sorted list per open status, keyed by (-priority_score, createdAt, id). A queue read walks
+      the head of one list (or a 3-way merge) and returns after `limit` items: O(limit), no query.
+    - Fed by a Firestore snapshot listener on open detections (`attach`); writes made by this
+      instance are also applied directly so responses reflect them immediately.
+    - Until the first snapshot arrives `ready` is False and callers fall back to a Firestore query.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[_SortKey, str, Dict[str, Any]]] = {}
+        self._sorted: Dict[str, List[_SortKey]] = {s: [] for s in OPEN_STATUSES}
+        self._watch: Any = None
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove_locked(self, doc_id: str) -> None:
+        entry = self._entries.pop(doc_id, None)
+        if entry is None:
+            return
+        key, status, _ = entry
+        keys = self._sorted[status]
+        i = bisect.bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+
+    def upsert(self, doc_id: str, data: Dict[str, Any]) -> None:
+        status = data.get("status", "reported")
+        with self._lock:
+            self._remove_locked(doc_id)
+            if status not in self._sorted:
+                return  # repaired (or unknown) detections leave the queue
+            created = data.get("createdAt")
+            key = (-int(data.get("priority_score") or 0), str(created or ""), doc_id)
+            self._entries[doc_id] = (key, status, queue_item(doc_id, data))
+            bisect.insort(self._sorted[status], key)
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def top(self, limit: int, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            if status is not None:
+                keys: Any = iter(self._sorted.get(status, []))
+            else:
+                keys = heapq.merge(*self._sorted.values())
+            return [dict(self._entries[key[2]][2]) for key in islice(keys, limit)]
+
+    # Change feed ---------------------------------------------------------------
+
+    def attach(self, query: Any) -> None:
+        """Start a snapshot listener on `query` (open detections)."""
+        self._watch = query.on_snapshot(self._on_snapshot)
+
+    def detach(self) -> None:
+        if self._watch is not None:
+            try:
+                self._watch.unsubscribe()
+            except Exception:
+                pass
+            self._watch = None
+
+    def _on_snapshot(self, docs: Any, changes: Any, read_time: Any) -> None:
+        try:
+            if not self.ready:
+                for doc in docs:
+                    self.upsert(doc.id, doc.to_dict() or {})
+                self.ready = True
+                logger.info(f"Priority index loaded: {len(self)} open detections")
+                return
+            for change in changes:
+                kind = getattr(change.type, "name", str(change.type))
+                if kind == "REMOVED":
+                    self.remove(change.document.id)
+                else:
+                    self.upsert(change.document.id, change.document.to_dict() or {})
+        except Exception as e:
+            logger.exception(f"Priority index update failed: {e}")
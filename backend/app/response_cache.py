@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A serialized JSON body and its strong ETag."""
+
+    body: bytes
+    etag: str
+
+    @classmethod
+    def from_payload(cls, payload: Any) -> "CachedResponse":
+        body = json.dumps(jsonable_encoder(payload), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        return cls(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """True if an `If-None-Match` header names this body (so the client copy is current)."""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags
+
+
+class ResponseCache:
+    """Short-lived cache of read-endpoint responses (analytics, priority queue), keyed on parameters.
+
+    Business:
+    - The dashboard reloads analytics pages often; between writes the answer doesn't change, so
+      repeated loads are served from memory and revalidations with a matching ETag get 304.
+
+    Cost/latency:
+    - Concurrent misses for the same key share one computation (single flight), so a burst of
+      dashboard loads costs one set of Firestore reads.
+
+    Freshness:
+    - Every write on this instance calls `invalidate()`, which drops all entries; a computation
+      that was in flight when a write happened is returned to its waiters but not stored, and
+      requests after the write start a new one.
+    - Writes on other Cloud Run instances are not seen here: entries also expire after
+      `ttl_seconds`, which bounds staleness across instances.
+
+    Runs on the event loop only (not thread-safe).
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 256) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[CachedResponse, float]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Task[CachedResponse]"] = {}
+        self._generation = 0
+        self._counters: Dict[str, int] = {
+            "cacheHits": 0, "coalescedHits": 0, "misses": 0, "invalidations": 0, "evictions": 0,
+        }
+
+    @staticmethod
+    def key(namespace: str, params: Dict[str, Any]) -> str:
+        return namespace + "?" + "&".join(f"{k}={params[k]}" for k in sorted(params) if params[k] is not None)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> CachedResponse:
+        """The cached response for `key`, computing (once, however many callers wait) on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._counters["cacheHits"] += 1
+                return entry[0]
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._counters["coalescedHits"] += 1
+        else:
+            self._counters["misses"] += 1
+            # A task rather than the first caller's coroutine: if that client disconnects, the
+            # computation still completes for everyone else waiting on it
+            task = asyncio.ensure_future(self._fill(key, compute, self._generation))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _fill(self, key: str, compute: Callable[[], Awaitable[Any]], generation: int) -> CachedResponse:
+        try:
+            response = CachedResponse.from_payload(await compute())
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+        if generation == self._generation:
+            self._entries[key] = (response, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+        return response
+
+    def invalidate(self) -> None:
+        """Drop every entry after a write; in-flight computations won't be stored."""
+        self._generation += 1
+        self._entries.clear()
+        self._inflight.clear()
+        self._counters["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self._counters["cacheHits"] + self._counters["coalescedHits"]
+        lookups = hits + self._counters["misses"]
+        return {
+            **self._counters,
+            "entries": len(self._entries),
+            "hitRatio": round(hits / lookups, 3) if lookups else 0.0,
+            "ttlSeconds": self.ttl_seconds,
+        }
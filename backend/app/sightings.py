@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .geo import distance_m, geohash_encode, geohash_neighbors, geohash_precision_for_radius
+from .priority import AGE_POINTS_PER_DAY, OPEN_STATUSES
+
+
+# Geohash stored on each record (~5 m cells); radius lookups query a shorter prefix of it
+RECORD_GEOHASH_PRECISION = 9
+
+_SEVERITY_RANK = {"low": 0, "medium": 1, "high": 2}
+
+# Fields read from candidate documents during a radius lookup
+_LOOKUP_FIELDS = ["geohash", "metadata.location"]
+
+
+def record_geohash(lat: Optional[float], lng: Optional[float]) -> Optional[str]:
+    if lat is None or lng is None:
+        return None
+    return geohash_encode(lat, lng, RECORD_GEOHASH_PRECISION)
+
+
+def nearest_open_detection(
+    collection: Any, lat: float, lng: float, radius_m: float, limit_per_cell: int = 50
+) -> Optional[Tuple[str, float]]:
+    """Closest open detection within `radius_m` of (lat, lng): `(document id, distance in m)`.
+
+    Cost:
+    - Nine prefix range queries (the cell sized to the radius and its neighbours) restricted to open
+      statuses, reading two fields of the few documents in them. No scan, so the lookup stays
+      constant as the collection grows, and repaired detections piling up in a cell can't fill
+      `limit_per_cell` and hide an open one.
+
+    Operations:
+    - Requires a composite index on the collection: `status` ASC, `geohash` ASC.
+    """
+    precision = geohash_precision_for_radius(radius_m, lat)
+    best: Optional[Tuple[str, float]] = None
+    for cell in geohash_neighbors(geohash_encode(lat, lng, precision)):
+        query = (
+            collection.where("status", "in", list(OPEN_STATUSES))
+            .where("geohash", ">=", cell)
+            .where("geohash", "<", cell + "~")
+            .select(_LOOKUP_FIELDS)
+            .limit(limit_per_cell)
+        )
+        for doc in query.stream():
+            data = doc.to_dict() or {}
+            location = (data.get("metadata") or {}).get("location") or {}
+            if location.get("lat") is None or location.get("lng") is None:
+                continue
+            distance = distance_m(lat, lng, float(location["lat"]), float(location["lng"]))
+            if distance <= radius_m and (best is None or distance < best[1]):
+                best = (doc.id, distance)
+    return best
+
+
+def group_nearby(points: Sequence[Tuple[int, float, float]], radius_m: float) -> Dict[int, int]:
+    """Greedy grouping of `(key, lat, lng)` points: maps each follower key to its leader's key.
+
+    Points are taken in order; a point within `radius_m` of an earlier leader follows the nearest
+    one, otherwise it becomes a leader itself. Used for sightings of the same new pothole within
+    one batch upload.
+    """
+    leaders: List[Tuple[int, float, float]] = []
+    followers: Dict[int, int] = {}
+    for key, lat, lng in points:
+        nearest: Optional[Tuple[float, int]] = None
+        for leader, l_lat, l_lng in leaders:
+            distance = distance_m(lat, lng, l_lat, l_lng)
+            if distance <= radius_m and (nearest is None or distance < nearest[0]):
+                nearest = (distance, leader)
+        if nearest is None:
+            leaders.append((key, lat, lng))
+        else:
+            followers[key] = nearest[1]
+    return followers
+
+
+def sighting_from_record(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """The `Sighting` entry for a new record payload (JSON form) being merged into another."""
+    boxes = (payload.get("detection") or {}).get("boundingBoxes") or []
+    metadata = payload.get("metadata") or {}
+    return {
+        "id": payload["id"],
+        "seenAt": payload.get("createdAt"),
+        "storagePath": payload.get("storagePath"),
+        "deviceId": metadata.get("deviceId"),
+        "capturedAt": metadata.get("capturedAt"),
+        "confidence": max((float(b.get("confidence") or 0.0) for b in boxes), default=0.0),
+        "numDetections": (payload.get("detection") or {}).get("numDetections", 0),
+    }
+
+
+def best_confidence(data: Dict[str, Any]) -> float:
+    stored = data.get("bestConfidence")
+    if stored is not None:
+        return float(stored)
+    boxes = (data.get("detection") or {}).get("boundingBoxes") or []
+    return max((float(b.get("confidence") or 0.0) for b in boxes), default=0.0)
+
+
+def merge_updates(
+    existing: Dict[str, Any], payload: Dict[str, Any], max_recent: int
+) -> Tuple[Dict[str, Any], List[str]]:
+    """Fields to update on `existing` (a stored detection) when `payload` is a repeat sighting of it.
+
+    The sighting count, last-seen time, best confidence and the bounded list of recent sighting
+    images always change. When the new upload is more severe (or scores higher at the same
+    severity), the record takes its severity, urgency, base priority, detection result and image,
+    keeping its own age bonus.
+
+    Also returns the storage paths of images no longer referenced by the record (sightings that
+    fell off the list, or a replaced image), which can go.
+    """
+    sighting = sighting_from_record(payload)
+    recent = list(existing.get("recentSightings") or [])
+    recent.append(sighting)
+    cut = max(len(recent) - max(max_recent, 0), 0)
+    dropped = [str(s.get("storagePath")) for s in recent[:cut] if s.get("storagePath")]
+    updates: Dict[str, Any] = {
+        "sightings": int(existing.get("sightings") or 1) + 1,
+        "lastSeenAt": sighting["seenAt"],
+        "bestConfidence": max(best_confidence(existing), sighting["confidence"]),
+        "recentSightings": recent[cut:],
+    }
+
+    old_rank = (_SEVERITY_RANK.get(existing.get("severity") or "low", 0), int(existing.get("priority_base") or 0))
+    new_rank = (_SEVERITY_RANK.get(payload.get("severity") or "low", 0), int(payload.get("priority_base") or 0))
+    if new_rank > old_rank:
+        base = int(payload.get("priority_base") or 0)
+        bonus = int(existing.get("age_bucket") or 0) * AGE_POINTS_PER_DAY
+        updates.update({
+            "severity": payload.get("severity"),
+            "repair_urgency": payload.get("repair_urgency"),
+            "priority_base": base,
+            "priority_score": min(max(base + bonus, 0), 100),
+            "detection": payload.get("detection"),
+            "storagePath": payload.get("storagePath"),
+        })
+        previous = existing.get("storagePath")
+        if previous and previous not in {s.get("storagePath") for s in updates["recentSightings"]}:
+            dropped.append(str(previous))
+    # The record's own image stays even when its sighting entry falls off the list
+    image = updates.get("storagePath", existing.get("storagePath"))
+    return updates, [path for path in dropped if path != image]
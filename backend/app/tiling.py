@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .backends import MAX_DETECTIONS
+from .preprocess import Letterbox, LetterboxBuffers, letterbox_image, oriented_size, to_rgb
+
+
+# Bounds for an estimated horizon, as fractions of the frame height. Outside them the estimate is
+# more likely a bridge, a wall or a tilted mount than the horizon.
+HORIZON_MIN = 0.15
+HORIZON_MAX = 0.7
+# Width the horizon is estimated at; enough rows to place it within ~1% of the frame height
+_HORIZON_SAMPLE_WIDTH = 160
+# Rows below the horizon that must all look like road for it to count
+_HORIZON_RUN = 4
+
+
+@dataclass(frozen=True)
+class RoadROI:
+    """Region of a dashcam frame that can contain road, as fractions of the frame size.
+
+    Typical mounts see sky above ~40% of the height and the hood below ~90%; everything outside
+    the region is skipped before inference.
+    """
+
+    top: float
+    bottom: float
+    left: float = 0.0
+    right: float = 1.0
+
+    def __post_init__(self) -> None:
+        if not (0.0 <= self.top < self.bottom <= 1.0 and 0.0 <= self.left < self.right <= 1.0):
+            raise ValueError(f"Invalid road ROI {self}: expected 0 <= top < bottom <= 1 and 0 <= left < right <= 1")
+
+    @classmethod
+    def parse(cls, spec: str) -> "RoadROI":
+        """`top,bottom` or `top,bottom,left,right` fractions, e.g. `0.4,0.92`."""
+        try:
+            values = [float(v) for v in spec.split(",")]
+        except ValueError:
+            raise ValueError(f"Invalid road ROI '{spec}': expected comma-separated fractions")
+        if len(values) not in (2, 4):
+            raise ValueError(f"Invalid road ROI '{spec}': expected top,bottom or top,bottom,left,right")
+        return cls(*values)
+
+
+def parse_roi_profiles(spec: str) -> Dict[str, RoadROI]:
+    """`deviceId=top,bottom[,left,right]` entries separated by `;` (one per dashcam mount)."""
+    profiles: Dict[str, RoadROI] = {}
+    for entry in filter(None, (e.strip() for e in spec.split(";"))):
+        device_id, sep, roi = entry.partition("=")
+        if not sep or not device_id.strip():
+            raise ValueError(f"Invalid ROI profile '{entry}': expected deviceId=top,bottom[,left,right]")
+        profiles[device_id.strip()] = RoadROI.parse(roi)
+    return profiles
+
+
+def estimate_horizon(img: Image.Image) -> Optional[float]:
+    """Estimated horizon row as a fraction of the frame height, or None if no clear one.
+
+    Sky is smooth and road is textured (asphalt grain, lane markings, cracks), so the horizon is
+    taken as the first row from which horizontal texture stays at least half the road's level.
+    Trees and buildings above the road also count as texture and push the estimate up, which only
+    makes the ROI larger; road is never cropped because of them.
+    """
+    width, height = img.size
+    sample_h = max(1, round(height * _HORIZON_SAMPLE_WIDTH / width))
+    gray = np.asarray(img.convert("L").resize((_HORIZON_SAMPLE_WIDTH, sample_h), Image.BILINEAR), dtype=np.float32)
+    if sample_h < 4 * _HORIZON_RUN:
+        return None
+    texture = np.abs(np.diff(gray, axis=1)).mean(axis=1)
+    texture = np.convolve(texture, np.ones(3) / 3.0, mode="same")
+    road_level = float(np.median(texture[sample_h // 2:]))
+    if road_level <= 1.0:
+        return None  # Uniform frame (night, lens cover): nothing to go on
+
+    textured = texture >= 0.5 * road_level
+    first = int(HORIZON_MIN * sample_h)
+    last = int(HORIZON_MAX * sample_h)
+    for row in range(first, last + 1):
+        if textured[row:row + _HORIZON_RUN].all():
+            return row / sample_h
+    return None
+
+
+def _spans(length: float, tile: float, overlap: float, max_count: int) -> List[Tuple[float, float]]:
+    """Start/end of tiles of about `tile` covering `0..length`, neighbours overlapping by `overlap`.
+
+    The count is rounded to the nearest whole number of tiles and the tile length adjusted to fit,
+    so a region slightly longer than one tile doesn't get a second, almost identical one. At most
+    `max_count` tiles are used; they grow to cover the length if more would be needed.
+    """
+    count = round((length - tile * overlap) / (tile * (1.0 - overlap)))
+    count = min(max(1, count), max_count)
+    tile = length / (count - (count - 1) * overlap)
+    step = tile * (1.0 - overlap)
+    return [(i * step, i * step + tile) for i in range(count)]
+
+
+@dataclass
+class Tile:
+    """One crop of the frame and where its model input sits inside it."""
+
+    left: float
+    top: float
+    geometry: Letterbox
+
+
+@dataclass
+class TiledFrame:
+    width: int
+    height: int
+    roi: Tuple[float, float, float, float]
+    # Decoded pixels per original pixel (< 1 when the frame was decoded at reduced resolution)
+    decode_scale: float
+    tiles: List[Tile]
+
+    @property
+    def geometry(self) -> Letterbox:
+        """Identity geometry: merged boxes are already in original-frame pixels."""
+        return Letterbox(self.width, self.height, 1.0, 1.0, 0, 0)
+
+
+class TilePlanner:
+    """Crops the road region of a frame and splits it into overlapping model-sized tiles.
+
+    Business:
+    - Distant potholes are a few pixels tall once a 12 MP frame is shrunk to 640 px; tiling the
+      road band keeps them at several times that size, so more are found.
+
+    Cost:
+    - Sky, hood and sidewalk are never decoded at tile resolution or run through the model. For
+      the same recall this is cheaper than a larger `imgsz` over the full frame: tiles cover only
+      the ROI and the model keeps its fixed input size (and the exported graphs keep working).
+
+    Operations:
+    - The ROI comes from the device's profile, else (with `horizon`) the estimated horizon with
+      the default ROI's bottom and sides, else the default ROI.
+    - The ROI width is split into `columns` roughly square tiles overlapping by `overlap`; as many rows as
+      needed cover its height, capped so a frame never exceeds `max_tiles` tiles.
+    - JPEGs are decoded at the smallest DCT scale that still gives a tile at least `imgsz` pixels.
+    """
+
+    def __init__(
+        self,
+        imgsz: int,
+        default_roi: RoadROI,
+        profiles: Optional[Dict[str, RoadROI]] = None,
+        columns: int = 3,
+        overlap: float = 0.2,
+        max_tiles: int = 8,
+        horizon: bool = False,
+    ) -> None:
+        if not 0.0 <= overlap < 0.9:
+            raise ValueError(f"Tile overlap must be in [0, 0.9), got {overlap}")
+        self.imgsz = imgsz
+        self.default_roi = default_roi
+        self.profiles = profiles or {}
+        self.columns = max(1, columns)
+        self.overlap = overlap
+        self.max_tiles = max(self.columns, max_tiles)
+        self.horizon = horizon
+
+    def prepare(
+        self, fh: BinaryIO, device_id: Optional[str], buffers: LetterboxBuffers
+    ) -> Tuple[TiledFrame, List[np.ndarray]]:
+        """Decode the frame and letterbox its tiles into `buffers`, ready for one batched predict."""
+        profile = self.profiles.get(device_id) if device_id else None
+        roi = profile or self.default_roi
+        with Image.open(fh) as im:
+            stored_w, stored_h = im.size
+            width, height = oriented_size(im)
+            roi_w = (roi.right - roi.left) * width
+            tile = roi_w / (self.columns - (self.columns - 1) * self.overlap)
+
+            ratio = self.imgsz / tile
+            if ratio < 1.0:
+                im.draft("RGB", (max(1, int(stored_w * ratio + 0.5)), max(1, int(stored_h * ratio + 0.5))))
+            img = to_rgb(im)
+            img.load()
+
+        top = roi.top
+        if profile is None and self.horizon:
+            estimate = estimate_horizon(img)
+            if estimate is not None and estimate < roi.bottom:
+                top = estimate
+
+        decode_scale = img.width / width
+        x0, x1 = roi.left * width, roi.right * width
+        y0, y1 = top * height, roi.bottom * height
+        xs = _spans(x1 - x0, tile, self.overlap, self.columns)
+        ys = _spans(y1 - y0, tile, self.overlap, self.max_tiles // len(xs))
+
+        arrays = buffers.get(len(xs) * len(ys))
+        tiles: List[Tile] = []
+        for ty0, ty1 in ys:
+            for tx0, tx1 in xs:
+                box = (
+                    round((x0 + tx0) * decode_scale),
+                    round((y0 + ty0) * decode_scale),
+                    max(round((x0 + tx1) * decode_scale), round((x0 + tx0) * decode_scale) + 1),
+                    max(round((y0 + ty1) * decode_scale), round((y0 + ty0) * decode_scale) + 1),
+                )
+                crop = img.crop(box)
+                geometry = letterbox_image(crop, arrays[len(tiles)], crop.width, crop.height)
+                tiles.append(Tile(left=box[0], top=box[1], geometry=geometry))
+
+        frame = TiledFrame(width=width, height=height, roi=(x0, y0, x1, y1), decode_scale=decode_scale, tiles=tiles)
+        return frame, arrays
+
+    def merge(self, frame: TiledFrame, outputs: Sequence[np.ndarray], threshold: float) -> np.ndarray:
+        """Per-tile detections -> one `(k, 6)` array in original-frame pixels, duplicates merged."""
+        rows: List[np.ndarray] = []
+        for tile, detections in zip(frame.tiles, outputs):
+            if not len(detections):
+                continue
+            g = tile.geometry
+            boxes = detections[:, :4].astype(np.float64)
+            boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - g.pad_x) / g.scale_x, 0, g.orig_width) + tile.left
+            boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - g.pad_y) / g.scale_y, 0, g.orig_height) + tile.top
+            boxes /= frame.decode_scale
+            rows.append(np.column_stack([boxes, detections[:, 4:6]]))
+        if not rows:
+            return np.empty((0, 6), dtype=np.float32)
+        return merge_overlapping(np.concatenate(rows), threshold)[:MAX_DETECTIONS].astype(np.float32)
+
+
+def merge_overlapping(detections: np.ndarray, threshold: float) -> np.ndarray:
+    """Greedy cross-tile merge of `x1, y1, x2, y2, conf, cls` rows, best first.
+
+    A pothole on a tile seam is seen whole in one tile and cut off in its neighbour, so the two
+    boxes have a low IoU. Overlap is measured against the smaller box instead, and a suppressed
+    box widens the one kept to their union, which restores the full extent across the seam. Only
+    boxes of the same class are merged.
+    """
+    order = detections[:, 4].argsort()[::-1]
+    detections = detections[order]
+    x1, y1, x2, y2, _, cls = detections.T
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    alive = np.ones(len(detections), dtype=bool)
+    merged: List[np.ndarray] = []
+    for i in range(len(detections)):
+        if not alive[i]:
+            continue
+        inter_w = np.clip(np.minimum(x2[i], x2) - np.maximum(x1[i], x1), 0, None)
+        inter_h = np.clip(np.minimum(y2[i], y2) - np.maximum(y1[i], y1), 0, None)
+        smaller = np.maximum(np.minimum(areas[i], areas), 1e-9)
+        group = alive & (cls == cls[i]) & (inter_w * inter_h / smaller > threshold)
+        group[i] = True
+        row = detections[i].copy()
+        row[0], row[1] = x1[group].min(), y1[group].min()
+        row[2], row[3] = x2[group].max(), y2[group].max()
+        merged.append(row)
+        alive &= ~group
+    return np.stack(merged)
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import io
+import os
+import tempfile
+from typing import Any, BinaryIO, Dict, Optional, Union
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from loguru import logger
+from starlette.concurrency import run_in_threadpool
+
+
+# Read uploads in 1 MiB chunks: large enough for throughput, small enough to bound memory
+CHUNK_SIZE = 1024 * 1024
+
+
+class PayloadTooLarge(HTTPException):
+    """413 raised while streaming a body or file past its size limit.
+
+    Subclasses `HTTPException` so FastAPI's body parsing re-raises it as-is instead of turning it
+    into a generic 400.
+    """
+
+    def __init__(self, detail: str = "File too large") -> None:
+        super().__init__(status_code=413, detail=detail)
+
+
+class _PositionalReader(io.RawIOBase):
+    """Reader with its own offset over a shared file descriptor.
+
+    Reads use `os.pread`, so any number of readers can share one open file without seeking it
+    under each other.
+    """
+
+    def __init__(self, fd: int, size: int) -> None:
+        super().__init__()
+        self._fd = fd
+        self._size = size
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b: Any) -> int:
+        n = min(len(b), self._size - self._pos)
+        if n <= 0:
+            return 0
+        data = os.pread(self._fd, n, self._pos)
+        b[: len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._size}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+class UploadBuffer:
+    """An uploaded file, held in memory up to `spool_threshold` bytes and on disk beyond.
+
+    Operations:
+    - Multipart uploads are already spooled by the form parser; `from_upload` wraps that file in
+      place instead of copying it, taking the size from the file and enforcing the limit with it.
+      Uploads up to `spool_threshold` are read into memory.
+    - Other sources (zip archive members) are filled chunk by chunk with the size limit enforced as
+      data arrives, so peak memory per upload is bounded by `spool_threshold` no matter how large
+      the file claims to be.
+    - `open()` returns an independent binary reader; decoding and the Cloud Storage upload can read
+      the same buffer concurrently without copying it. Small uploads are read straight from the
+      in-memory bytes; wrapped uploads use positional reads; spooled ones reopen the temp file.
+    - `close()` deletes the temp file. Readers already open keep working until they are closed.
+      A wrapped upload file is owned (and closed) by the framework at the end of the request.
+    """
+
+    def __init__(self, spool_threshold: int) -> None:
+        self.spool_threshold = spool_threshold
+        self.size = 0
+        self._memory: Optional[bytearray] = bytearray()
+        self._data: Optional[bytes] = None
+        self._file: Optional[BinaryIO] = None
+        self._path: Optional[str] = None
+        self._source: Optional[BinaryIO] = None
+
+    # Filling -------------------------------------------------------------------
+
+    @classmethod
+    async def from_upload(
+        cls, upload: Any, max_bytes: int, spool_threshold: int, detail: str = "File too large"
+    ) -> "UploadBuffer":
+        """Wrap a Starlette `UploadFile` without copying it, raising `PayloadTooLarge` past `max_bytes`."""
+        file = upload.file
+        size = await run_in_threadpool(file.seek, 0, io.SEEK_END)
+        if size > max_bytes:
+            raise PayloadTooLarge(detail)
+        buffer = cls(spool_threshold)
+        buffer.size = size
+        buffer._memory = None
+        if size <= spool_threshold:
+            await run_in_threadpool(file.seek, 0)
+            buffer._data = await upload.read()
+        else:
+            # fileno() rolls a still in-memory spool over to disk, so positional reads work on it
+            await run_in_threadpool(file.fileno)
+            buffer._source = file
+        return buffer
+
+    @classmethod
+    def from_stream(
+        cls, stream: BinaryIO, max_bytes: int, spool_threshold: int, detail: str = "File too large"
+    ) -> "UploadBuffer":
+        """Fill a buffer from a file-like source (e.g. a zip archive member), raising
+        `PayloadTooLarge` past `max_bytes`."""
+        buffer = cls(spool_threshold)
+        try:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                buffer._check(len(chunk), max_bytes, detail)
+                buffer.write(chunk)
+            buffer.finish()
+        except BaseException:
+            buffer.close()
+            raise
+        return buffer
+
+    def _check(self, incoming: int, max_bytes: int, detail: str) -> None:
+        if self.size + incoming > max_bytes:
+            raise PayloadTooLarge(detail)
+
+    def write(self, chunk: bytes) -> None:
+        if self._memory is not None and self.size + len(chunk) > self.spool_threshold:
+            fd, self._path = tempfile.mkstemp(prefix="upload-")
+            self._file = os.fdopen(fd, "wb")
+            self._file.write(self._memory)
+            self._memory = None
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            assert self._memory is not None
+            self._memory += chunk
+        self.size += len(chunk)
+
+    def finish(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        elif self._memory is not None:
+            self._data = bytes(self._memory)
+            self._memory = None
+
+    # Reading -------------------------------------------------------------------
+
+    @property
+    def path(self) -> Optional[str]:
+        """File holding an on-disk buffer, for decoders that need a file name (e.g. video)."""
+        if self._source is not None:
+            # The form parser's temp file is unlinked; /proc exposes it by descriptor
+            fd_path = f"/proc/self/fd/{self._source.fileno()}"
+            if os.path.exists(fd_path):
+                return fd_path
+            self._materialize()
+        return self._path
+
+    def _materialize(self) -> None:
+        """Copy a wrapped upload to a temp file of our own (platforms without /proc)."""
+        assert self._source is not None
+        fd, path = tempfile.mkstemp(prefix="upload-")
+        with os.fdopen(fd, "wb") as out, self.open() as src:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                out.write(chunk)
+        self._path = path
+        self._source = None
+
+    def open(self) -> BinaryIO:
+        if self._source is not None:
+            return io.BufferedReader(_PositionalReader(self._source.fileno(), self.size), CHUNK_SIZE)
+        if self._path is not None:
+            return open(self._path, "rb")
+        # BytesIO shares the immutable bytes object; no copy is made
+        return io.BytesIO(self._data or b"")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._path is not None:
+            try:
+                os.unlink(self._path)
+            except FileNotFoundError:
+                pass
+            self._path = None
+        self._source = None
+        self._memory = None
+        self._data = None
+
+    def __enter__(self) -> "UploadBuffer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+ImageSource = Union[bytes, UploadBuffer]
+
+
+def open_source(source: ImageSource) -> BinaryIO:
+    """Binary reader over raw bytes or an `UploadBuffer`."""
+    if isinstance(source, UploadBuffer):
+        return source.open()
+    return io.BytesIO(source)
+
+
+class BodySizeLimitMiddleware:
+    """Reject request bodies over a per-path byte limit before they are buffered.
+
+    Operations:
+    - A `Content-Length` over the limit is rejected with 413 before any of the body is read.
+    - Chunked or mis-declared bodies are counted while streaming; the request fails with 413 as
+      soon as the limit is crossed instead of after the whole body has been spooled by the
+      multipart parser.
+    """
+
+    def __init__(self, app: Any, default_limit: int, path_limits: Optional[Dict[str, int]] = None) -> None:
+        self.app = app
+        self.default_limit = default_limit
+        self.path_limits = dict(path_limits or {})
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.path_limits.get(scope.get("path", ""), self.default_limit)
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break
+                if declared > limit:
+                    await self._reject(scope, receive, send)
+                    return
+                break
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Dict[str, Any]:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise PayloadTooLarge("Request body too large")
+            return message
+
+        async def tracking_send(message: Dict[str, Any]) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except PayloadTooLarge:
+            if response_started:
+                raise
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        logger.warning(f"Rejected oversized request body: {scope.get('method')} {scope.get('path')}")
+        response = JSONResponse(status_code=413, content={"detail": "Request body too large"})
+        await response(scope, receive, send)
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import TypeAdapter, ValidationError
+
+from .geo import distance_m
+from .models import TrackPoint
+
+
+# A track is only trusted this far beyond its first and last fix (GPS often starts late)
+_TRACK_EDGE_S = 2.0
+# Grayscale thumbnail compared for scene changes; small enough to ignore sensor noise
+_SCENE_THUMB_SIZE = (64, 36)
+
+_TRACK_ADAPTER = TypeAdapter(List[TrackPoint])
+
+
+class VideoRequestError(ValueError):
+    """The clip or its GPS track can't be used (unreadable video, malformed track)."""
+
+
+class GpsTrack:
+    """GPS fixes recorded alongside a clip, interpolated to frame timestamps."""
+
+    def __init__(self, points: Sequence[TrackPoint]) -> None:
+        self.points = sorted(points, key=lambda p: p.t)
+        self._times = np.array([p.t for p in self.points], dtype=np.float64)
+
+    @classmethod
+    def parse(cls, raw: Optional[str]) -> "GpsTrack":
+        """A track from a JSON array of `{t, lat, lng, alt}` fixes; empty when none is given."""
+        if not raw:
+            return cls([])
+        try:
+            return cls(_TRACK_ADAPTER.validate_json(raw))
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()[:5])
+            raise VideoRequestError(f"Invalid track: {errors}") from e
+
+    def __bool__(self) -> bool:
+        return bool(self.points)
+
+    def position(self, t: float) -> Optional[Tuple[float, float, Optional[float]]]:
+        """Interpolated `(lat, lng, alt)` at `t` seconds, or None outside the recorded track."""
+        if not self.points or t < self.points[0].t - _TRACK_EDGE_S or t > self.points[-1].t + _TRACK_EDGE_S:
+            return None
+        i = int(np.searchsorted(self._times, t))
+        if i == 0:
+            p = self.points[0]
+            return p.lat, p.lng, p.alt
+        if i == len(self.points):
+            p = self.points[-1]
+            return p.lat, p.lng, p.alt
+        a, b = self.points[i - 1], self.points[i]
+        w = (t - a.t) / (b.t - a.t) if b.t > a.t else 0.0
+        alt = a.alt + (b.alt - a.alt) * w if a.alt is not None and b.alt is not None else a.alt
+        return a.lat + (b.lat - a.lat) * w, a.lng + (b.lng - a.lng) * w, alt
+
+
+@dataclass
+class SampledFrame:
+    index: int
+    t: float
+    jpeg: bytes
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    alt: Optional[float] = None
+    reason: str = "first"
+
+
+@dataclass
+class SamplingStats:
+    frames_decoded: int = 0
+    frames_sampled: int = 0
+    duration_s: float = 0.0
+    truncated: bool = False
+    reasons: Dict[str, int] = field(default_factory=dict)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "framesDecoded": self.frames_decoded,
+            "framesSampled": self.frames_sampled,
+            "durationS": round(self.duration_s, 2),
+            "truncated": self.truncated,
+            "sampledBy": dict(self.reasons),
+        }
+
+
+class FrameSampler:
+    """Picks the frames of a dashcam clip worth running through the model.
+
+    Business:
+    - Consecutive frames at 30 fps are ~0.5 m apart at city speeds and show the same potholes;
+      one frame every few meters covers the road just as well.
+
+    Cost:
+    - Frames are decoded one at a time from the spooled clip and dropped unless kept, so memory
+      stays at a frame or two regardless of clip length. Only kept frames are color-converted and
+      JPEG-encoded; the rest cost only their decode.
+
+    Operations:
+    - With a GPS position for the frame, a frame is kept once the vehicle has moved `distance_m`
+      since the last kept frame (none are kept while it is stopped).
+    - Without one (no track, or outside it), a frame is kept when the view has changed by more
+      than `scene_threshold` (mean absolute difference of a small grayscale thumbnail, 0..1) from
+      the last kept frame, checked every `scene_check_s` seconds.
+    - The first frame is always kept; at most `max_frames` frames are kept per clip.
+    """
+
+    def __init__(
+        self,
+        distance_m: float = 5.0,
+        scene_threshold: float = 0.15,
+        scene_check_s: float = 0.5,
+        max_frames: int = 600,
+        jpeg_quality: int = 90,
+    ) -> None:
+        self.distance_m = distance_m
+        self.scene_threshold = scene_threshold
+        self.scene_check_s = scene_check_s
+        self.max_frames = max(1, max_frames)
+        self.jpeg_quality = jpeg_quality
+
+    def frames(self, path: str, track: GpsTrack, stats: SamplingStats) -> Iterator[SampledFrame]:
+        """Yield kept frames in order. Blocking (decodes video); iterate from a worker thread."""
+        import cv2
+
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            raise VideoRequestError("Unreadable video (expected MP4, MOV, MKV or WebM)")
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        last_position: Optional[Tuple[float, float, Optional[float]]] = None
+        last_thumb: Optional[np.ndarray] = None
+        last_check = float("-inf")
+        try:
+            while capture.grab():
+                index = stats.frames_decoded
+                stats.frames_decoded += 1
+                t = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                if t <= 0.0 and index and fps > 0:
+                    t = index / fps
+                stats.duration_s = max(stats.duration_s, t)
+
+                position = track.position(t)
+                frame: Optional[np.ndarray] = None
+                thumb: Optional[np.ndarray] = None
+                if last_thumb is None:
+                    reason: Optional[str] = "first"
+                elif position is not None:
+                    moved = last_position is None or distance_m(
+                        last_position[0], last_position[1], position[0], position[1]
+                    ) >= self.distance_m
+                    reason = "distance" if moved else None
+                elif self.scene_threshold > 0 and t - last_check >= self.scene_check_s:
+                    last_check = t
+                    ok, frame = capture.retrieve()
+                    if not ok:
+                        continue
+                    thumb = _thumbnail(frame)
+                    change = float(np.abs(thumb - last_thumb).mean()) / 255.0
+                    reason = "scene" if change >= self.scene_threshold else None
+                else:
+                    reason = None
+                if reason is None:
+                    continue
+
+                if stats.frames_sampled >= self.max_frames:
+                    stats.truncated = True
+                    break
+                if frame is None:
+                    ok, frame = capture.retrieve()
+                    if not ok:
+                        continue
+                ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                if not ok:
+                    continue
+                last_thumb = thumb if thumb is not None else _thumbnail(frame)
+                last_check = t
+                if position is not None:
+                    last_position = position
+                stats.frames_sampled += 1
+                stats.reasons[reason] = stats.reasons.get(reason, 0) + 1
+                lat, lng, alt = position if position is not None else (None, None, None)
+                yield SampledFrame(index=index, t=t, jpeg=encoded.tobytes(), lat=lat, lng=lng, alt=alt, reason=reason)
+        finally:
+            capture.release()
+
+
+def take(frames: Iterator[SampledFrame], n: int) -> List[SampledFrame]:
+    """Up to `n` more frames from a sampler. Blocking; run in a worker thread."""
+    chunk: List[SampledFrame] = []
+    for frame in frames:
+        chunk.append(frame)
+        if len(chunk) >= n:
+            break
+    return chunk
+
+
+def _thumbnail(frame: np.ndarray) -> np.ndarray:
+    import cv2
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, _SCENE_THUMB_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, TypeVar
+
+from loguru import logger
+
+
+T = TypeVar("T")
+
+# Writes `items` in one go and returns a committed flag per item. Blocking; runs in a worker
+# thread. Raising counts as every item failing. Failed items are flushed again, so the write must
+# be safe to repeat for items that did land (see `_persist_records`: create preconditions).
+FlushFn = Callable[[List[T]], Sequence[bool]]
+
+
+class WriteBehindFull(Exception):
+    """The queue stayed full for the whole enqueue timeout (the backing store is not keeping up)."""
+
+
+@dataclass
+class WriteBehindStats:
+    enqueued: int = 0
+    flushed: int = 0
+    batches: int = 0
+    retries: int = 0
+    dropped: int = 0
+    rejected: int = 0
+    flush_ms_sum: float = 0.0
+    queue_ms_sum: float = 0.0
+    max_depth: int = 0
+
+    def snapshot(self, depth: int, capacity: int) -> Dict[str, Any]:
+        return {
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "avgBatchSize": round(self.flushed / self.batches, 2) if self.batches else 0.0,
+            "avgFlushMs": round(self.flush_ms_sum / self.batches, 2) if self.batches else 0.0,
+            "avgQueueMs": round(self.queue_ms_sum / self.flushed, 2) if self.flushed else 0.0,
+            "depth": depth,
+            "maxDepth": self.max_depth,
+            "capacity": capacity,
+        }
+
+
+@dataclass
+class _Entry(Generic[T]):
+    key: str
+    item: T
+    future: asyncio.Future
+    enqueued_at: float
+    attempts: int = 0
+
+
+class WriteBehindQueue(Generic[T]):
+    """Bounded in-process queue drained into batched writes by a background task.
+
+    Latency/cost:
+    - `put` returns as soon as the item is queued; requests no longer wait on a write round trip.
+      The worker flushes once `batch_size` items are queued or the oldest has waited
+      `max_delay_ms`, so a burst of uploads costs one commit instead of one RPC each.
+
+    Reliability:
+    - Items whose write failed are retried with exponential backoff and jitter, ahead of newer
+      items, up to `max_attempts` flushes; then they are dropped and passed to `on_dropped`. A
+      failure can be ambiguous (a timed-out commit may have landed), so `flush_fn` must not apply
+      an item twice when it is flushed again.
+    - Backpressure: when `max_pending` items are waiting, `put` waits for room, and raises
+      `WriteBehindFull` after `enqueue_timeout_s` so callers can shed load instead of queueing
+      without bound.
+    - `close()` flushes what is left (call it on shutdown). Items still queued when the process is
+      killed are lost, which is the trade-off for not waiting on the write.
+
+    Consistency:
+    - `get` returns an item that is queued but not yet written, and `wait_flushed` waits for it
+      to be written (flushing immediately), for reads and updates that need it in the store.
+
+    Runs on the event loop only (not thread-safe).
+    """
+
+    def __init__(
+        self,
+        flush_fn: FlushFn,
+        max_pending: int = 1000,
+        batch_size: int = 100,
+        max_delay_ms: float = 100.0,
+        max_attempts: int = 5,
+        enqueue_timeout_s: float = 5.0,
+        retry_base_s: float = 0.5,
+        retry_max_s: float = 30.0,
+        on_flushed: Optional[Callable[[List[T]], None]] = None,
+        on_dropped: Optional[Callable[[List[T]], None]] = None,
+        name: str = "write-behind",
+    ) -> None:
+        self._flush_fn = flush_fn
+        self.max_pending = max(1, max_pending)
+        self.batch_size = max(1, batch_size)
+        self.max_delay_s = max(0.0, max_delay_ms) / 1000.0
+        self.max_attempts = max(1, max_attempts)
+        self.enqueue_timeout_s = enqueue_timeout_s
+        self.retry_base_s = retry_base_s
+        self.retry_max_s = retry_max_s
+        self._on_flushed = on_flushed
+        self._on_dropped = on_dropped
+        self._name = name
+        # Insertion order is flush order; retried items are moved back to the front
+        self._pending: "OrderedDict[str, _Entry[T]]" = OrderedDict()
+        self._in_flight: Dict[str, _Entry[T]] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._room: Optional[asyncio.Condition] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._retry_at = 0.0
+        self._flush_now = False
+        self._closing = False
+        self.stats = WriteBehindStats()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._wake = asyncio.Event()
+            self._room = asyncio.Condition()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    # Producers ----------------------------------------------------------------
+
+    async def put(self, key: str, item: T) -> None:
+        """Queue `item` for writing under `key`, waiting for room if the queue is full."""
+        if self._closing:
+            raise WriteBehindFull(f"{self._name} is shutting down")
+        self._ensure_worker()
+        assert self._room is not None and self._wake is not None
+        if len(self._pending) >= self.max_pending:
+            try:
+                async with self._room:
+                    await asyncio.wait_for(
+                        self._room.wait_for(lambda: len(self._pending) < self.max_pending),
+                        timeout=self.enqueue_timeout_s,
+                    )
+            except asyncio.TimeoutError:
+                self.stats.rejected += 1
+                raise WriteBehindFull(f"{self._name} queue full ({len(self._pending)} items waiting)")
+
+        entry = _Entry(key, item, asyncio.get_running_loop().create_future(), time.perf_counter())
+        self._pending[key] = entry
+        self.stats.enqueued += 1
+        self.stats.max_depth = max(self.stats.max_depth, len(self._pending))
+        # A full batch flushes now; the first item of a new batch starts its delay timer
+        if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def get(self, key: str) -> Optional[T]:
+        """The item queued under `key` if it hasn't been written yet."""
+        entry = self._pending.get(key) or self._in_flight.get(key)
+        return entry.item if entry is not None else None
+
+    async def wait_flushed(self, key: str) -> bool:
+        """Wait until the item under `key` is written. False if it was dropped; True if it was
+        written or is not queued (anymore)."""
+        entry = self._pending.get(key) or self._in_flight.get(key)
+        if entry is None:
+            return True
+        if key in self._pending:
+            self._flush_now = True
+            assert self._wake is not None
+            self._wake.set()
+        return await asyncio.shield(entry.future)
+
+    def __len__(self) -> int:
+        return len(self._pending) + len(self._in_flight)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return self.stats.snapshot(len(self), self.max_pending)
+
+    async def close(self, timeout_s: float = 8.0) -> None:
+        """Flush everything still queued (up to `timeout_s`), then stop the worker."""
+        self._closing = True
+        if self._worker is None:
+            return
+        assert self._wake is not None
+        self._flush_now = True
+        self._retry_at = 0.0
+        self._wake.set()
+        deadline = time.perf_counter() + timeout_s
+        while len(self) and time.perf_counter() < deadline and not self._worker.done():
+            await asyncio.sleep(0.05)
+        lost = len(self)
+        self._worker.cancel()
+        try:
+            await self._worker
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._worker = None
+        if lost:
+            logger.error(f"{self._name}: {lost} queued writes were not flushed before shutdown")
+
+    # Worker -------------------------------------------------------------------
+
+    async def _next_batch(self) -> List[_Entry[T]]:
+        assert self._wake is not None
+        while True:
+            if not self._pending:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            now = time.perf_counter()
+            if now < self._retry_at and not self._closing:
+                await self._sleep_or_wake(self._retry_at - now)
+                continue
+            oldest = next(iter(self._pending.values()))
+            due = oldest.enqueued_at + self.max_delay_s
+            if len(self._pending) < self.batch_size and now < due and not (self._flush_now or self._closing):
+                await self._sleep_or_wake(due - now)
+                continue
+            self._flush_now = False
+            batch: List[_Entry[T]] = []
+            while self._pending and len(batch) < self.batch_size:
+                batch.append(self._pending.popitem(last=False)[1])
+            return batch
+
+    async def _sleep_or_wake(self, seconds: float) -> None:
+        assert self._wake is not None
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self) -> None:
+        assert self._room is not None
+        while True:
+            batch = await self._next_batch()
+            for entry in batch:
+                self._in_flight[entry.key] = entry
+            async with self._room:
+                self._room.notify_all()
+
+            started = time.perf_counter()
+            try:
+                committed = list(await asyncio.to_thread(self._flush_fn, [e.item for e in batch]))
+                if len(committed) != len(batch):
+                    raise RuntimeError(f"flush returned {len(committed)} results for {len(batch)} items")
+            except Exception as e:
+                logger.error(f"{self._name}: flush of {len(batch)} items failed: {e}")
+                committed = [False] * len(batch)
+            self.stats.batches += 1
+            self.stats.flush_ms_sum += (time.perf_counter() - started) * 1000.0
+
+            written: List[_Entry[T]] = []
+            failed: List[_Entry[T]] = []
+            for entry, ok in zip(batch, committed):
+                del self._in_flight[entry.key]
+                (written if ok else failed).append(entry)
+            for entry in written:
+                self.stats.flushed += 1
+                self.stats.queue_ms_sum += (started - entry.enqueued_at) * 1000.0
+                if not entry.future.done():
+                    entry.future.set_result(True)
+            if written and self._on_flushed is not None:
+                self._safe_callback(self._on_flushed, [e.item for e in written])
+            if failed:
+                self._retry_or_drop(failed)
+
+    def _retry_or_drop(self, failed: List[_Entry[T]]) -> None:
+        dropped: List[_Entry[T]] = []
+        retry: List[_Entry[T]] = []
+        for entry in failed:
+            entry.attempts += 1
+            (dropped if entry.attempts >= self.max_attempts else retry).append(entry)
+        # Back to the front, in their original order, ahead of anything queued since
+        for entry in reversed(retry):
+            self._pending[entry.key] = entry
+            self._pending.move_to_end(entry.key, last=False)
+        if retry:
+            self.stats.retries += len(retry)
+            attempt = max(e.attempts for e in retry)
+            delay = min(self.retry_max_s, self.retry_base_s * (2 ** (attempt - 1)))
+            self._retry_at = time.perf_counter() + random.uniform(delay / 2, delay)
+        if dropped:
+            self.stats.dropped += len(dropped)
+            logger.error(f"{self._name}: dropping {len(dropped)} writes after {self.max_attempts} attempts")
+            for entry in dropped:
+                if not entry.future.done():
+                    entry.future.set_result(False)
+            if self._on_dropped is not None:
+                self._safe_callback(self._on_dropped, [e.item for e in dropped])
+
+    def _safe_callback(self, callback: Callable[[List[T]], None], items: List[T]) -> None:
+        try:
+            callback(items)
+        except Exception as e:
+            logger.exception(f"{self._name}: callback failed: {e}")
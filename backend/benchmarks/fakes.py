@@ -0,0 +1,552 @@
+"""
+In-process stand-ins for Cloud Storage, Firestore and the Google Maps client, for benchmarks.
+
+They implement the subset of each client library the API uses, with a configurable latency
+injected per call, so throughput can be measured locally without a GCP project.
+
+Notes:
+- Latency is slept in the calling thread, exactly where the real client would block on the
+  network; the API's thread pool and concurrency limits behave as in production.
+- Firestore transactions are optimistic: a commit whose reads changed underneath it raises
+  `Aborted` and the real `@firestore.transactional` decorator retries it, as under contention.
+- Snapshot listeners receive the initial result only (the API updates its priority index on its
+  own writes; cross-instance changes don't exist in-process).
+- Images are not kept, only their sizes, so long runs don't grow memory.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from google.api_core import exceptions as gexc
+from google.cloud import firestore
+from google.cloud.firestore_v1 import transforms
+
+from app.backends import InferenceBackend
+
+
+@dataclass
+class Latency:
+    """Injected latency for one kind of call: `mean_ms` +/- `jitter` (fraction of the mean)."""
+
+    mean_ms: float = 0.0
+    jitter: float = 0.25
+
+    def sleep(self) -> None:
+        if self.mean_ms <= 0:
+            return
+        spread = self.mean_ms * self.jitter
+        time.sleep(max(0.0, random.uniform(self.mean_ms - spread, self.mean_ms + spread)) / 1000.0)
+
+
+# Cloud Storage ---------------------------------------------------------------
+
+
+class FakeStorageClient:
+    """`storage.Client` stand-in: buckets of blob sizes."""
+
+    def __init__(self, upload: Latency, delete: Optional[Latency] = None) -> None:
+        self.upload_latency = upload
+        self.delete_latency = delete or upload
+        self.objects: Dict[str, int] = {}
+        self.uploaded_bytes = 0
+        self._lock = threading.Lock()
+
+    def bucket(self, name: str) -> "_FakeBucket":
+        return _FakeBucket(self, name)
+
+
+class _FakeBucket:
+    def __init__(self, client: FakeStorageClient, name: str) -> None:
+        self._client = client
+        self.name = name
+
+    def blob(self, object_name: str) -> "_FakeBlob":
+        return _FakeBlob(self._client, f"{self.name}/{object_name}")
+
+
+class _FakeBlob:
+    def __init__(self, client: FakeStorageClient, path: str) -> None:
+        self._client = client
+        self._path = path
+
+    def upload_from_file(self, fh: Any, size: Optional[int] = None, content_type: Optional[str] = None, **_: Any) -> None:
+        self._store(len(fh.read()) if size is None else size)
+
+    def upload_from_string(self, data: Any, content_type: Optional[str] = None, **_: Any) -> None:
+        self._store(len(data))
+
+    def _store(self, size: int) -> None:
+        self._client.upload_latency.sleep()
+        with self._client._lock:
+            self._client.objects[self._path] = size
+            self._client.uploaded_bytes += size
+
+    def delete(self) -> None:
+        self._client.delete_latency.sleep()
+        with self._client._lock:
+            if self._client.objects.pop(self._path, None) is None:
+                raise gexc.NotFound(f"No such object: {self._path}")
+
+
+# Google Maps -----------------------------------------------------------------
+
+
+class FakeMapsClient:
+    """`googlemaps.Client` stand-in. Addresses are deterministic per ~1 km grid square."""
+
+    def __init__(self, latency: Latency, areas: int = 12) -> None:
+        self.latency = latency
+        self.areas = max(1, areas)
+        self.calls = 0
+
+    def reverse_geocode(self, latlng: Tuple[float, float], **_: Any) -> List[Dict[str, Any]]:
+        self.latency.sleep()
+        self.calls += 1
+        lat, lng = latlng
+        cell = f"{round(lat, 2)}:{round(lng, 2)}"
+        n = int(hashlib.md5(cell.encode()).hexdigest(), 16)
+        street = ["Main Street", "Queen Street", "Steeles Avenue", "Highway 410", "Bovaird Drive"][n % 5]
+        return [{
+            "address_components": [
+                {"long_name": street, "types": ["route"]},
+                {"long_name": f"Area {n % self.areas + 1}", "types": ["neighborhood", "political"]},
+                {"long_name": "Brampton", "types": ["locality", "political"]},
+            ]
+        }]
+
+
+# Inference -------------------------------------------------------------------
+
+
+class SyntheticBackend(InferenceBackend):
+    """Inference stand-in costing `fixed_ms + per_image_ms * len(batch)` per batch.
+
+    Each image gets one box whose confidence follows the image's mean brightness, so severities
+    vary across a run the way they do with real uploads.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, imgsz: int, fixed_ms: float, per_image_ms: float) -> None:
+        super().__init__("synthetic", imgsz)
+        self.class_names = ["pothole"]
+        self.fixed_ms = fixed_ms
+        self.per_image_ms = per_image_ms
+
+    def predict(self, batch: Sequence[np.ndarray], conf: float, iou: float) -> List[np.ndarray]:
+        time.sleep((self.fixed_ms + self.per_image_ms * len(batch)) / 1000.0)
+        c = self.imgsz / 2
+        outputs = []
+        for image in batch:
+            confidence = 0.3 + 0.7 * float(image[::16, ::16].mean()) / 255.0
+            boxes = np.array([[c - 40, c - 30, c + 40, c + 30, confidence, 0]], dtype=np.float32)
+            outputs.append(boxes[boxes[:, 4] >= conf])
+        return outputs
+
+
+# Firestore -------------------------------------------------------------------
+
+
+def _get_path(data: Optional[Dict[str, Any]], path: str) -> Any:
+    current: Any = data
+    for part in path.split("."):
+        if not isinstance(current, dict) or part not in current:
+            return None
+        current = current[part]
+    return current
+
+
+def _apply(target: Dict[str, Any], key: str, value: Any) -> None:
+    if value is firestore.DELETE_FIELD:
+        target.pop(key, None)
+    elif value is firestore.SERVER_TIMESTAMP:
+        target[key] = datetime.now(timezone.utc)
+    elif isinstance(value, transforms.Increment):
+        target[key] = (target.get(key) or 0) + value.value
+    elif isinstance(value, transforms.ArrayUnion):
+        current = list(target.get(key) or [])
+        target[key] = current + [v for v in value.values if v not in current]
+    elif isinstance(value, transforms.ArrayRemove):
+        target[key] = [v for v in (target.get(key) or []) if v not in value.values]
+    else:
+        target[key] = copy.deepcopy(value)
+
+
+def _merge(target: Dict[str, Any], data: Dict[str, Any]) -> None:
+    """`set(..., merge=True)` semantics: nested maps merge, transforms apply."""
+    for key, value in data.items():
+        if isinstance(value, dict) and value:
+            child = target.get(key)
+            if not isinstance(child, dict):
+                child = {}
+            _merge(child, value)
+            target[key] = child
+        else:
+            _apply(target, key, value)
+
+
+def _update(target: Dict[str, Any], data: Dict[str, Any]) -> None:
+    """`update()` semantics: dotted keys address nested fields."""
+    for key, value in data.items():
+        *parents, leaf = key.split(".")
+        current = target
+        for part in parents:
+            current = current.setdefault(part, {})
+        _apply(current, leaf, value)
+
+
+class FakeSnapshot:
+    def __init__(self, reference: "FakeDocumentRef", data: Optional[Dict[str, Any]]) -> None:
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.exists = data is not None
+        self.create_time = self.update_time = datetime.now(timezone.utc)
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path: str) -> Any:
+        return _get_path(self._data, field_path)
+
+
+class FakeDocumentRef:
+    def __init__(self, client: "FakeFirestoreClient", collection: str, doc_id: str) -> None:
+        self._client = client
+        self._collection = collection
+        self.id = doc_id
+        self.path = f"{collection}/{doc_id}"
+
+    def get(self, field_paths: Optional[Iterable[str]] = None, transaction: Optional["FakeTransaction"] = None) -> FakeSnapshot:
+        self._client.read_latency.sleep()
+        with self._client._lock:
+            data, version = self._client._read(self)
+        if transaction is not None:
+            transaction._reads.setdefault(self.path, version)
+        self._client.reads += 1
+        return FakeSnapshot(self, data)
+
+    def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        self._client._commit([("set", self, data, merge)])
+
+    def update(self, data: Dict[str, Any]) -> None:
+        self._client._commit([("update", self, data, False)])
+
+    def delete(self) -> None:
+        self._client._commit([("delete", self, None, False)])
+
+    def collection(self, name: str) -> "FakeCollection":
+        return FakeCollection(self._client, f"{self.path}/{name}")
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, FakeDocumentRef) and other.path == self.path
+
+    def __hash__(self) -> int:
+        return hash(self.path)
+
+
+def _comparable(a: Any, b: Any) -> bool:
+    """Like Firestore, range filters only match values of the filter's type (strings vs timestamps)."""
+    if a is None:
+        return False
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return True
+    return isinstance(a, type(b)) or isinstance(b, type(a))
+
+
+def _order_key(value: Any) -> Tuple[int, Any]:
+    """Firestore's cross-type order: booleans, numbers, timestamps, strings, then everything else."""
+    if isinstance(value, bool):
+        return 0, value
+    if isinstance(value, (int, float)):
+        return 1, value
+    if isinstance(value, datetime):
+        return 2, value
+    if isinstance(value, str):
+        return 3, value
+    return 4, str(value)
+
+
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a is not None and a != b,
+    "<": lambda a, b: _comparable(a, b) and a < b,
+    "<=": lambda a, b: _comparable(a, b) and a <= b,
+    ">": lambda a, b: _comparable(a, b) and a > b,
+    ">=": lambda a, b: _comparable(a, b) and a >= b,
+    "in": lambda a, b: a in b,
+    "not-in": lambda a, b: a is not None and a not in b,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+    "array_contains_any": lambda a, b: isinstance(a, list) and any(v in a for v in b),
+}
+
+
+class FakeQuery:
+    """Filters, ordering, projection, limit and `start_after` cursors over one collection."""
+
+    def __init__(
+        self,
+        client: "FakeFirestoreClient",
+        collection: str,
+        filters: Sequence[Tuple[str, str, Any]] = (),
+        orders: Sequence[Tuple[str, str]] = (),
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[FakeSnapshot] = None,
+    ) -> None:
+        self._client = client
+        self._collection = collection
+        self._filters = list(filters)
+        self._orders = list(orders)
+        self._limit = limit
+        self._fields = fields
+        self._cursor = cursor
+
+    def _copy(self, **changes: Any) -> "FakeQuery":
+        state = dict(
+            filters=self._filters, orders=self._orders, limit=self._limit, fields=self._fields, cursor=self._cursor
+        )
+        state.update(changes)
+        return FakeQuery(self._client, self._collection, **state)
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value: Any = None, filter: Any = None) -> "FakeQuery":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string not in _OPERATORS:
+            raise ValueError(f"Unsupported operator: {op_string}")
+        return self._copy(filters=self._filters + [(field_path, op_string, value)])
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING") -> "FakeQuery":
+        return self._copy(orders=self._orders + [(field_path, direction)])
+
+    def limit(self, count: int) -> "FakeQuery":
+        return self._copy(limit=count)
+
+    def select(self, field_paths: Iterable[str]) -> "FakeQuery":
+        return self._copy(fields=list(field_paths))
+
+    def start_after(self, snapshot: Any) -> "FakeQuery":
+        # Also `{"__name__": doc_id}`, the cursor for document-ID order
+        if isinstance(snapshot, dict):
+            snapshot = FakeSnapshot(FakeDocumentRef(self._client, self._collection, snapshot["__name__"]), None)
+        return self._copy(cursor=snapshot)
+
+    def _value(self, doc_id: str, data: Dict[str, Any], field_path: str) -> Any:
+        return doc_id if field_path == "__name__" else _get_path(data, field_path)
+
+    def _sort_key(self, doc_id: str, data: Dict[str, Any]) -> Tuple[Any, ...]:
+        return tuple(self._value(doc_id, data, f) for f, _ in self._orders) + (doc_id,)
+
+    def _run(self) -> List[FakeSnapshot]:
+        self._client.read_latency.sleep()
+        # Filter before copying: range queries over a large collection match a handful of documents
+        with self._client._lock:
+            docs = list(self._client._collection(self._collection).items())
+            for field_path, op, value in self._filters:
+                docs = [(i, entry) for i, entry in docs if _OPERATORS[op](self._value(i, entry[0], field_path), value)]
+            docs = [(i, copy.deepcopy(entry[0])) for i, entry in docs]
+        # Like Firestore, ordering on a field excludes documents without it
+        for field_path, _ in self._orders:
+            docs = [(i, d) for i, d in docs if self._value(i, d, field_path) is not None]
+        docs.sort(key=lambda item: item[0])
+        for field_path, direction in reversed(self._orders):
+            docs.sort(key=lambda item: _order_key(self._value(item[0], item[1], field_path)), reverse=direction == "DESCENDING")
+        if self._cursor is not None:
+            ids = [i for i, _ in docs]
+            if self._cursor.id in ids:
+                docs = docs[ids.index(self._cursor.id) + 1:]
+        if self._limit is not None:
+            docs = docs[: self._limit]
+
+        snapshots = []
+        for doc_id, data in docs:
+            if self._fields is not None:
+                projected: Dict[str, Any] = {}
+                for field_path in self._fields:
+                    value = _get_path(data, field_path)
+                    if value is not None:
+                        _update(projected, {field_path: value})
+                data = projected
+            snapshots.append(FakeSnapshot(FakeDocumentRef(self._client, self._collection, doc_id), data))
+        self._client.reads += max(1, len(snapshots))
+        return snapshots
+
+    def stream(self, transaction: Optional["FakeTransaction"] = None) -> Iterator[FakeSnapshot]:
+        return iter(self._run())
+
+    def get(self, transaction: Optional["FakeTransaction"] = None) -> List[FakeSnapshot]:
+        return self._run()
+
+    def on_snapshot(self, callback: Callable[[Any, Any, Any], None]) -> "_Watch":
+        callback(self._run(), [], datetime.now(timezone.utc))
+        return _Watch()
+
+
+class _Watch:
+    def unsubscribe(self) -> None:
+        pass
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, client: "FakeFirestoreClient", path: str) -> None:
+        super().__init__(client, path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, document_id: Optional[str] = None) -> FakeDocumentRef:
+        return FakeDocumentRef(self._client, self._collection, document_id or uuid.uuid4().hex[:20])
+
+
+class FakeWriteBatch:
+    def __init__(self, client: "FakeFirestoreClient") -> None:
+        self._client = client
+        self._writes: List[Tuple[str, FakeDocumentRef, Optional[Dict[str, Any]], bool]] = []
+
+    def set(self, reference: FakeDocumentRef, data: Dict[str, Any], merge: bool = False) -> "FakeWriteBatch":
+        self._writes.append(("set", reference, data, merge))
+        return self
+
+    def update(self, reference: FakeDocumentRef, data: Dict[str, Any]) -> "FakeWriteBatch":
+        self._writes.append(("update", reference, data, False))
+        return self
+
+    def delete(self, reference: FakeDocumentRef) -> "FakeWriteBatch":
+        self._writes.append(("delete", reference, None, False))
+        return self
+
+    def create(self, reference: FakeDocumentRef, data: Dict[str, Any]) -> "FakeWriteBatch":
+        self._writes.append(("create", reference, data, False))
+        return self
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def commit(self) -> List[Any]:
+        writes, self._writes = self._writes, []
+        self._client._commit(writes)
+        return []
+
+
+class FakeTransaction(FakeWriteBatch):
+    """Driven by the real `@firestore.transactional` decorator (`_begin` / `_commit` / `_rollback`)."""
+
+    def __init__(self, client: "FakeFirestoreClient", max_attempts: int = 5) -> None:
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = False
+        self._id: Optional[bytes] = None
+        self._reads: Dict[str, int] = {}
+
+    @property
+    def in_progress(self) -> bool:
+        return self._id is not None
+
+    def _clean_up(self) -> None:
+        self._writes = []
+        self._reads = {}
+        self._id = None
+
+    def _begin(self, retry_id: Optional[bytes] = None) -> None:
+        if self.in_progress:
+            raise ValueError("Transaction already in progress")
+        self._id = uuid.uuid4().bytes
+
+    def _rollback(self) -> None:
+        self._clean_up()
+
+    def _commit(self) -> List[Any]:
+        writes, reads = self._writes, self._reads
+        self._clean_up()
+        self._client._commit(writes, reads)
+        return []
+
+
+class FakeFirestoreClient:
+    """`firestore.Client` stand-in: documents in memory, one lock, injected read/write latency."""
+
+    def __init__(self, read: Latency, write: Latency) -> None:
+        self.read_latency = read
+        self.write_latency = write
+        self.reads = 0
+        self.writes = 0
+        self.commits = 0
+        self.aborted = 0
+        # collection path -> document id -> (data, version); versions come from one counter so a
+        # deleted and recreated document never matches a version read earlier
+        self._data: Dict[str, Dict[str, Tuple[Dict[str, Any], int]]] = {}
+        self._clock = 0
+        self._lock = threading.RLock()
+
+    def collection(self, path: str) -> FakeCollection:
+        return FakeCollection(self, path)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def transaction(self, max_attempts: int = 5, read_only: bool = False) -> FakeTransaction:
+        return FakeTransaction(self, max_attempts)
+
+    def get_all(self, references: Iterable[FakeDocumentRef], field_paths: Any = None, transaction: Any = None) -> Iterator[FakeSnapshot]:
+        self.read_latency.sleep()
+        with self._lock:
+            found = [(ref, self._read(ref)[0]) for ref in references]
+        self.reads += len(found)
+        return iter([FakeSnapshot(ref, data) for ref, data in found])
+
+    def document_count(self, collection: str) -> int:
+        with self._lock:
+            return len(self._data.get(collection, {}))
+
+    def _collection(self, path: str) -> Dict[str, Tuple[Dict[str, Any], int]]:
+        return self._data.setdefault(path, {})
+
+    def _read(self, ref: FakeDocumentRef) -> Tuple[Optional[Dict[str, Any]], int]:
+        entry = self._collection(ref._collection).get(ref.id)
+        if entry is None:
+            return None, 0
+        return copy.deepcopy(entry[0]), entry[1]
+
+    def _commit(
+        self,
+        writes: List[Tuple[str, FakeDocumentRef, Optional[Dict[str, Any]], bool]],
+        reads: Optional[Dict[str, int]] = None,
+    ) -> None:
+        if len(writes) > 500:
+            raise gexc.InvalidArgument("maximum 500 writes allowed per request")
+        self.write_latency.sleep()
+        with self._lock:
+            for path, version in (reads or {}).items():
+                collection, doc_id = path.rsplit("/", 1)
+                if self._collection(collection).get(doc_id, (None, 0))[1] != version:
+                    self.aborted += 1
+                    raise gexc.Aborted("Transaction contention; retry")
+            for kind, ref, data, merge in writes:
+                if kind == "update" and ref.id not in self._collection(ref._collection):
+                    raise gexc.NotFound(f"No document to update: {ref.path}")
+                if kind == "create" and ref.id in self._collection(ref._collection):
+                    raise gexc.AlreadyExists(f"Document already exists: {ref.path}")
+            # Validated up front so a failing commit changes nothing, like Firestore
+            for kind, ref, data, merge in writes:
+                docs = self._collection(ref._collection)
+                current = docs.get(ref.id, (None, 0))[0]
+                if kind == "delete":
+                    docs.pop(ref.id, None)
+                    continue
+                document = current if (kind == "update" or merge) and current is not None else {}
+                if kind == "update":
+                    _update(document, data or {})
+                else:
+                    _merge(document, data or {})
+                self._clock += 1
+                docs[ref.id] = (document, self._clock)
+            self.writes += len(writes)
+            self.commits += 1
@@ -0,0 +1,318 @@
+"""
+Inference micro-benchmark: the model path across image size, imgsz, threads and batch size.
+
+Runs the same code the API runs (`_infer_potholes` / `_infer_batch`), and times its sub-stages
+separately: decode (reduced-resolution JPEG decode + letterbox), predict (the runtime call) and
+post-processing. Every grid cell runs in a fresh process so runtime thread pools, memory arenas and
+peak RSS are measured per configuration. CPU only; no GPU or network needed.
+
+Usage:
+    python benchmarks/inference_bench.py --images samples/ --backend onnxruntime \\
+        --image-sizes 1280,1920,4032 --imgsz 480,640 --threads 1,2,4 --batch-sizes 1,4,8
+    python benchmarks/inference_bench.py --backend synthetic   # pipeline overhead without a model
+
+Notes:
+- `--image-sizes` is the longest side corpus images are resized (and re-encoded as JPEG) to before
+  timing; `orig` keeps them as they are. Without `--images`, synthetic frames are generated.
+- Throughput is end-to-end images/s on one inference thread, as in the API.
+- Peak RSS is the child process high-water mark (model + buffers + runtime arenas).
+"""
+
+import argparse
+import io
+import itertools
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from PIL import Image
+
+# Allow `python benchmarks/<name>.py` from the backend/ directory
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.report import (  # noqa: E402
+    compare_rows,
+    latency_summary,
+    load_report,
+    new_report,
+    print_comparison,
+    write_report,
+)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def _rss_mb() -> float:
+    """Current resident set size (Linux), in MB."""
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return 0.0
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _corpus(images_dir: Optional[str], limit: int, seed: int) -> List[bytes]:
+    """Encoded corpus images, or synthetic 1920x1080 road-like frames when no directory is given."""
+    if images_dir:
+        paths = sorted(p for p in Path(images_dir).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS)[:limit]
+        if not paths:
+            raise ValueError(f"No JPEG/PNG images found in {images_dir}")
+        return [p.read_bytes() for p in paths]
+
+    rng = random.Random(seed)
+    frames = []
+    for _ in range(min(limit, 16)):
+        im = Image.new("RGB", (32, 18), (120, 120, 120))
+        im.putdata([(v, v, v) for v in (rng.randrange(60, 200) for _ in range(32 * 18))])
+        buf = io.BytesIO()
+        im.resize((1920, 1080), Image.BILINEAR).save(buf, "JPEG", quality=90)
+        frames.append(buf.getvalue())
+    return frames
+
+
+def _resize(data: bytes, longest_side: Optional[int]) -> bytes:
+    if longest_side is None:
+        return data
+    with Image.open(io.BytesIO(data)) as im:
+        im = im.convert("RGB")
+        scale = longest_side / max(im.size)
+        size = (max(1, round(im.width * scale)), max(1, round(im.height * scale)))
+        buf = io.BytesIO()
+        im.resize(size, Image.BILINEAR).save(buf, "JPEG", quality=90)
+        return buf.getvalue()
+
+
+def _run_cell(cell: Dict[str, Any], options: Dict[str, Any], results: Any) -> None:
+    """Benchmark one grid cell. Child-process entry point; sends its result on `results`."""
+    os.environ.update({
+        "LOG_LEVEL": "WARNING",
+        "INFERENCE_PRECISION": options["precision"],
+        "INFERENCE_IMGSZ": str(cell["imgsz"]),
+        "INFERENCE_INTRA_OP_THREADS": str(cell["threads"]),
+        "INFERENCE_MAX_BATCH_SIZE": str(cell["batchSize"]),
+        # Numpy/OpenCV pools follow the same budget so cells don't oversubscribe the CPU
+        "OMP_NUM_THREADS": str(cell["threads"]),
+    })
+    if options["backend"] != "synthetic":
+        os.environ["INFERENCE_BACKEND"] = options["backend"]
+    if options["weights"]:
+        os.environ["YOLO_MODEL_PATH"] = options["weights"]
+    if options["model_path"]:
+        os.environ["INFERENCE_MODEL_PATH"] = options["model_path"]
+
+    try:
+        from loguru import logger
+
+        logger.remove()
+        logger.add(sys.stderr, level="WARNING")
+
+        import app.main as main
+
+        start = time.perf_counter()
+        if options["backend"] == "synthetic":
+            from benchmarks.fakes import SyntheticBackend
+
+            main._inference_backend = SyntheticBackend(cell["imgsz"], options["synthetic_ms"], options["synthetic_per_image_ms"])
+        else:
+            main._load_model()
+        if main._inference_backend is None:
+            raise RuntimeError("Model failed to load (see log above)")
+        load_ms = (time.perf_counter() - start) * 1000.0
+        rss_loaded = _rss_mb()
+
+        corpus = [_resize(data, cell["imageSize"]) for data in _corpus(options["images"], options["max_images"], options["seed"])]
+        batch_size = cell["batchSize"]
+        stream = itertools.cycle(corpus)
+        batches = [[next(stream) for _ in range(batch_size)] for _ in range(max(1, options["iterations"] // batch_size))]
+
+        # Warm-up: first calls pay runtime initialization, as after a cold start
+        for batch in batches[: options["warmup"]]:
+            main._infer_batch(batch)
+
+        # Sub-stages, timed separately on the same inputs
+        buffers = main._letterbox_buffers.get(batch_size)
+        conf, iou = main.settings.YOLO_CONFIDENCE_THRESHOLD, main.settings.INFERENCE_NMS_IOU
+        decode_ms: List[float] = []
+        predict_ms: List[float] = []
+        postprocess_ms: List[float] = []
+        for batch in batches:
+            geometries = []
+            for out, data in zip(buffers, batch):
+                t = time.perf_counter()
+                geometries.append(main._preprocess_image(data, out))
+                decode_ms.append((time.perf_counter() - t) * 1000.0)
+            t = time.perf_counter()
+            outputs = main._inference_backend.predict(list(buffers[: len(batch)]), conf=conf, iou=iou)
+            predict_ms.append((time.perf_counter() - t) * 1000.0)
+            for output, geometry in zip(outputs, geometries):
+                t = time.perf_counter()
+                main._to_detection_result(output, 0, geometry)
+                postprocess_ms.append((time.perf_counter() - t) * 1000.0)
+
+        # End to end, as the API calls it (single uploads go through `_infer_potholes`)
+        e2e_ms: List[float] = []
+        started = time.perf_counter()
+        for batch in batches:
+            t = time.perf_counter()
+            if batch_size == 1:
+                main._infer_potholes(batch[0])
+            else:
+                failed = [r for r in main._infer_batch(batch) if isinstance(r, Exception)]
+                if failed:
+                    raise failed[0]
+            e2e_ms.append((time.perf_counter() - t) * 1000.0)
+        elapsed = time.perf_counter() - started
+        images = len(batches) * batch_size
+
+        results.send({
+            **cell,
+            "images": images,
+            "imagesPerSecond": round(images / elapsed, 2) if elapsed > 0 else 0.0,
+            "endToEnd": latency_summary(e2e_ms),
+            "decode": latency_summary(decode_ms),
+            "predict": latency_summary(predict_ms),
+            "postprocess": latency_summary(postprocess_ms),
+            "modelLoadMs": round(load_ms, 1),
+            "rssAfterLoadMb": rss_loaded,
+            "peakRssMb": _peak_rss_mb(),
+        })
+    except Exception as e:
+        results.send({**cell, "error": str(e)})
+
+
+def _parse_ints(raw: str, allow_orig: bool = False) -> List[Optional[int]]:
+    values: List[Optional[int]] = []
+    for part in raw.split(","):
+        part = part.strip()
+        if allow_orig and part == "orig":
+            values.append(None)
+        else:
+            values.append(int(part))
+    return values
+
+
+def _cell_key(cell: Dict[str, Any]) -> str:
+    return f"img{cell['imageSize'] or 'orig'}/sz{cell['imgsz']}/t{cell['threads']}/b{cell['batchSize']}"
+
+
+def run_grid(args: argparse.Namespace) -> Dict[str, Any]:
+    grid = {
+        "imageSizes": _parse_ints(args.image_sizes, allow_orig=True),
+        "imgsz": _parse_ints(args.imgsz),
+        "threads": _parse_ints(args.threads),
+        "batchSizes": _parse_ints(args.batch_sizes),
+    }
+    for size in grid["imgsz"]:
+        if size is None or size < 32 or size % 32:
+            raise ValueError(f"--imgsz values must be multiples of 32, got {size}")
+    options = {
+        "backend": args.backend,
+        "precision": args.precision,
+        "weights": args.weights,
+        "model_path": args.model_path,
+        "images": args.images,
+        "max_images": args.max_images,
+        "iterations": args.iterations,
+        "warmup": args.warmup,
+        "seed": args.seed,
+        "synthetic_ms": args.synthetic_ms,
+        "synthetic_per_image_ms": args.synthetic_per_image_ms,
+    }
+    report = new_report("inference", {**options, "grid": grid})
+
+    context = multiprocessing.get_context("spawn")
+    cells = []
+    combos = list(itertools.product(grid["imageSizes"], grid["imgsz"], grid["threads"], grid["batchSizes"]))
+    for n, (image_size, imgsz, threads, batch_size) in enumerate(combos, 1):
+        cell = {"imageSize": image_size, "imgsz": imgsz, "threads": threads, "batchSize": batch_size}
+        receiver, sender = context.Pipe(duplex=False)
+        worker = context.Process(target=_run_cell, args=(cell, options, sender))
+        worker.start()
+        sender.close()
+        try:
+            result = receiver.recv() if receiver.poll(args.cell_timeout) else {**cell, "error": "timed out"}
+        except EOFError:
+            result = {**cell, "error": f"worker exited with code {worker.exitcode}"}
+        worker.join(timeout=10)
+        if worker.is_alive():
+            worker.kill()
+        cells.append(result)
+        _print_cell(n, len(combos), result)
+
+    report["cells"] = cells
+    return report
+
+
+def _print_cell(n: int, total: int, cell: Dict[str, Any]) -> None:
+    prefix = f"[{n}/{total}] {_cell_key(cell):<28}"
+    if "error" in cell:
+        print(f"{prefix} ✗ {cell['error']}")
+        return
+    print(
+        f"{prefix} {cell['imagesPerSecond']:>8} img/s"
+        f"  e2e p50/p95 {cell['endToEnd']['p50Ms']}/{cell['endToEnd']['p95Ms']} ms"
+        f"  decode {cell['decode']['p50Ms']}  predict {cell['predict']['p50Ms']}"
+        f"  post {cell['postprocess']['p50Ms']} ms  peak RSS {cell['peakRssMb']} MB"
+    )
+
+
+def _flatten(report: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Cell key -> comparable metrics, for `--compare`."""
+    return {
+        _cell_key(c): {"imagesPerSecond": c["imagesPerSecond"], "p95Ms": c["endToEnd"]["p95Ms"], "peakRssMb": c["peakRssMb"]}
+        for c in report.get("cells", [])
+        if "error" not in c
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the inference path over a parameter grid")
+    parser.add_argument("--images", help="Directory of JPEG/PNG images (default: synthetic frames)")
+    parser.add_argument("--max-images", type=int, default=64, help="Corpus images used per cell")
+    parser.add_argument(
+        "--backend", choices=["ultralytics", "onnxruntime", "openvino", "synthetic"], default="onnxruntime"
+    )
+    parser.add_argument("--precision", choices=["fp32", "int8"], default="fp32")
+    parser.add_argument("--weights", help="YOLO_MODEL_PATH override (exported models are found next to it)")
+    parser.add_argument("--model-path", help="INFERENCE_MODEL_PATH override")
+    parser.add_argument("--image-sizes", default="1280,1920", help="Longest image side, comma-separated ('orig' = as is)")
+    parser.add_argument("--imgsz", default="640", help="Model input sizes, comma-separated (multiples of 32)")
+    parser.add_argument("--threads", default="1,2", help="Intra-op thread counts, comma-separated")
+    parser.add_argument("--batch-sizes", default="1,4,8", help="Batch sizes, comma-separated")
+    parser.add_argument("--iterations", type=int, default=64, help="Images timed per cell")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed batches per cell")
+    parser.add_argument("--synthetic-ms", type=float, default=25.0, help="Synthetic backend: cost per batch")
+    parser.add_argument("--synthetic-per-image-ms", type=float, default=12.0, help="Synthetic backend: cost per image")
+    parser.add_argument("--cell-timeout", type=float, default=900.0, help="Seconds before a cell is abandoned")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/inference-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier report to compare against")
+
+    args = parser.parse_args()
+
+    try:
+        report = run_grid(args)
+        path = write_report(report, args.output)
+        print(f"✓ Report written to {path}")
+        if args.compare:
+            baseline = load_report(args.compare)
+            rows = compare_rows(_flatten(report), _flatten(baseline), ["imagesPerSecond", "p95Ms", "peakRssMb"])
+            print_comparison(rows, baseline.get("commit"))
+        failed = [c for c in report["cells"] if "error" in c]
+        sys.exit(1 if failed and len(failed) == len(report["cells"]) else 0)
+    except Exception as e:
+        print(f"Fatal error: {str(e)}")
+        sys.exit(1)
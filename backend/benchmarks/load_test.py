@@ -0,0 +1,429 @@
+"""
+End-to-end load benchmark: the API against local Cloud Storage / Firestore / Maps stand-ins.
+
+Starts the FastAPI app in a child process (uvicorn, real HTTP) with the in-memory fakes from
+`benchmarks/fakes.py` and a configurable latency per call, seeds it with detections, then drives
+`POST /v1/detections` and the analytics endpoints with concurrent clients. Reports requests/s and
+p50/p95/p99 latency per endpoint, the server's per-stage timings (from `/metrics`) and its
+batching/cache counters, and writes them as JSON for comparison across commits.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 32 --duration 60
+    python benchmarks/load_test.py --mix detections=1 --env INFERENCE_MAX_BATCH_SIZE=4
+    python benchmarks/load_test.py --compare benchmarks/results/load-abc1234-....json --max-regression 10
+
+Notes:
+- The model is a synthetic backend (`--inference-ms` per batch plus `--inference-per-image-ms`
+  per image) unless `--model real`, which loads the configured `INFERENCE_BACKEND` weights.
+- `--firestore emulator` uses the real client against `FIRESTORE_EMULATOR_HOST` instead of the
+  in-memory fake (no injected Firestore latency then).
+- Clients are closed-loop: each waits for its response before sending the next request.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import random
+import re
+import socket
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import httpx
+from PIL import Image
+
+# Allow `python benchmarks/<name>.py` from the backend/ directory
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.report import (  # noqa: E402
+    compare_rows,
+    latency_summary,
+    load_report,
+    new_report,
+    print_comparison,
+    write_report,
+)
+
+API_KEY = "benchmark"
+
+ENDPOINTS = {
+    "detections": ("POST", "/v1/detections"),
+    "batch": ("POST", "/v1/detections/batch"),
+    "priority-queue": ("GET", "/v1/detections/priority-queue"),
+    "by-area": ("GET", "/v1/analytics/by-area"),
+    "statistics": ("GET", "/v1/analytics/statistics"),
+}
+DEFAULT_MIX = "detections=70,priority-queue=15,by-area=10,statistics=5"
+
+# Uploads are spread over a Brampton-sized area (~15 x 15 km)
+CENTER = (43.7315, -79.7624)
+SPAN_DEG = 0.13
+
+
+# Server (child process) ------------------------------------------------------
+
+
+def _serve(options: Dict[str, Any], port: int) -> None:
+    """Run the API with fakes installed. Child-process entry point."""
+    os.environ.update({
+        "ENV": "benchmark",
+        "API_KEYS": API_KEY,
+        "GCS_BUCKET": "benchmark-images",
+        "GCP_PROJECT_ID": "benchmark",
+        "LOG_LEVEL": "WARNING",
+        **options["env"],
+    })
+
+    import uvicorn
+
+    import app.main as main
+    from benchmarks.fakes import FakeFirestoreClient, FakeMapsClient, FakeStorageClient, Latency, SyntheticBackend
+
+    jitter = options["jitter"]
+    storage_client = FakeStorageClient(Latency(options["storage_ms"], jitter))
+    main.storage.Client = lambda *args, **kwargs: storage_client  # type: ignore[assignment]
+    if options["firestore"] == "memory":
+        firestore_client = FakeFirestoreClient(
+            Latency(options["firestore_read_ms"], jitter), Latency(options["firestore_write_ms"], jitter)
+        )
+        main.firestore.Client = lambda *args, **kwargs: firestore_client  # type: ignore[assignment]
+
+    maps_client = FakeMapsClient(Latency(options["maps_ms"], jitter), areas=options["areas"])
+
+    def _init_maps_client() -> None:
+        if main.settings.ENABLE_REVERSE_GEOCODING:
+            main._gmaps_client = maps_client
+
+    main._init_maps_client = _init_maps_client
+
+    if options["model"] == "synthetic":
+        def _load_model() -> None:
+            main._inference_backend = SyntheticBackend(
+                main.settings.INFERENCE_IMGSZ, options["inference_ms"], options["inference_per_image_ms"]
+            )
+
+        main._load_model = _load_model
+
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(client: httpx.AsyncClient, server: Any, timeout_s: float) -> None:
+    deadline = time.monotonic() + timeout_s
+    last = None
+    while time.monotonic() < deadline:
+        if not server.is_alive():
+            raise RuntimeError(f"Server process exited with code {server.exitcode}")
+        try:
+            r = await client.get("/v1/health/ready")
+            last = r.json()
+            if last.get("status") == "ready":
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server not ready after {timeout_s:.0f}s: {last}")
+
+
+# Workload --------------------------------------------------------------------
+
+
+class ImagePool:
+    """Pre-encoded JPEGs. Each upload appends a unique trailer so retries of the same bytes are
+    only sent on purpose (`--duplicate-rate`); decoders ignore data after the end marker."""
+
+    def __init__(self, count: int, size: Tuple[int, int], seed: int) -> None:
+        rng = random.Random(seed)
+        self.images: List[bytes] = []
+        for _ in range(count):
+            im = Image.new("RGB", (16, 9), tuple(rng.randrange(256) for _ in range(3)))
+            im.putdata([tuple(rng.randrange(256) for _ in range(3)) for _ in range(16 * 9)])
+            buf = io.BytesIO()
+            im.resize(size, Image.BILINEAR).save(buf, "JPEG", quality=85)
+            self.images.append(buf.getvalue())
+        self.sent: List[Tuple[bytes, Dict[str, Any]]] = []
+
+    def upload(self, rng: random.Random, duplicate_rate: float) -> Tuple[bytes, Dict[str, Any]]:
+        if self.sent and rng.random() < duplicate_rate:
+            return rng.choice(self.sent)
+        body = rng.choice(self.images) + rng.randbytes(16)
+        meta = {
+            "deviceId": f"device-{rng.randrange(200)}",
+            "lat": round(CENTER[0] + rng.uniform(-SPAN_DEG, SPAN_DEG) / 2, 6),
+            "lng": round(CENTER[1] + rng.uniform(-SPAN_DEG, SPAN_DEG) / 2, 6),
+        }
+        if len(self.sent) < 1000:
+            self.sent.append((body, meta))
+        return body, meta
+
+
+def parse_mix(raw: str) -> Dict[str, float]:
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in --mix: {name} (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def _send(
+    client: httpx.AsyncClient, name: str, images: ImagePool, rng: random.Random, args: argparse.Namespace
+) -> int:
+    if name == "detections":
+        body, meta = images.upload(rng, args.duplicate_rate)
+        r = await client.post("/v1/detections", files={"image": ("upload.jpg", body, "image/jpeg")}, params=meta)
+    elif name == "batch":
+        uploads = [images.upload(rng, args.duplicate_rate) for _ in range(args.batch_size)]
+        files = [("images", (f"img{i}.jpg", body, "image/jpeg")) for i, (body, _) in enumerate(uploads)]
+        metadata = json.dumps([{"filename": f"img{i}.jpg", **meta} for i, (_, meta) in enumerate(uploads)])
+        r = await client.post("/v1/detections/batch", files=files, data={"metadata": metadata})
+    elif name == "priority-queue":
+        r = await client.get("/v1/detections/priority-queue", params={"limit": 50})
+    elif name == "by-area":
+        r = await client.get("/v1/analytics/by-area")
+    else:
+        r = await client.get("/v1/analytics/statistics", params={"days": 30})
+    return r.status_code
+
+
+async def _seed(client: httpx.AsyncClient, images: ImagePool, count: int, rng: random.Random) -> None:
+    sent = 0
+    while sent < count:
+        size = min(50, count - sent)
+        uploads = [images.upload(rng, 0.0) for _ in range(size)]
+        files = [("images", (f"seed{i}.jpg", body, "image/jpeg")) for i, (body, _) in enumerate(uploads)]
+        metadata = json.dumps([{"filename": f"seed{i}.jpg", **meta} for i, (_, meta) in enumerate(uploads)])
+        r = await client.post("/v1/detections/batch", files=files, data={"metadata": metadata})
+        if r.status_code >= 400:
+            raise RuntimeError(f"Seeding failed: {r.status_code} {r.text[:200]}")
+        sent += size
+
+
+async def _run_load(
+    client: httpx.AsyncClient, args: argparse.Namespace, mix: Dict[str, float], images: ImagePool
+) -> Tuple[Dict[str, List[Tuple[int, float]]], float]:
+    samples: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+    names, weights = list(mix), list(mix.values())
+    started = time.perf_counter()
+    measure_from = started + args.warmup
+    stop_at = measure_from + args.duration
+
+    async def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                return
+            name = rng.choices(names, weights)[0]
+            try:
+                status_code = await _send(client, name, images, rng, args)
+            except httpx.HTTPError:
+                status_code = 0
+            if now >= measure_from:
+                samples[name].append((status_code, (time.perf_counter() - now) * 1000.0))
+
+    await asyncio.gather(*(worker(args.random_seed + i) for i in range(args.concurrency)))
+    return samples, time.perf_counter() - measure_from
+
+
+def _summarize(samples: Dict[str, List[Tuple[int, float]]], elapsed_s: float) -> Dict[str, Dict[str, Any]]:
+    endpoints: Dict[str, Dict[str, Any]] = {}
+    everything: List[Tuple[int, float]] = []
+    for name, rows in sorted(samples.items()):
+        everything.extend(rows)
+        endpoints[name] = _summary(rows, elapsed_s)
+    endpoints["all"] = _summary(everything, elapsed_s)
+    return endpoints
+
+
+def _summary(rows: List[Tuple[int, float]], elapsed_s: float) -> Dict[str, Any]:
+    statuses: Dict[str, int] = defaultdict(int)
+    for status_code, _ in rows:
+        statuses[str(status_code)] += 1
+    errors = sum(n for code, n in statuses.items() if int(code) == 0 or int(code) >= 400)
+    return {
+        "requests": len(rows),
+        "errors": errors,
+        "statuses": dict(sorted(statuses.items())),
+        "rps": round(len(rows) / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+        **latency_summary([ms for _, ms in rows]),
+    }
+
+
+_STAGE_LINE = re.compile(r'^roadsense_stage_duration_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$')
+
+
+def _stage_totals(metrics_text: str) -> Dict[str, Dict[str, float]]:
+    totals: Dict[str, Dict[str, float]] = defaultdict(lambda: {"sum": 0.0, "count": 0.0})
+    for line in metrics_text.splitlines():
+        match = _STAGE_LINE.match(line)
+        if match:
+            kind, stage, value = match.groups()
+            totals[stage][kind] = float(value)
+    return totals
+
+
+def _stage_means(before: str, after: str) -> Dict[str, Dict[str, float]]:
+    """Mean duration per pipeline stage during the measured window (difference of two scrapes)."""
+    start, end = _stage_totals(before), _stage_totals(after)
+    stages = {}
+    for stage, total in sorted(end.items()):
+        count = total["count"] - start.get(stage, {}).get("count", 0.0)
+        if count > 0:
+            seconds = total["sum"] - start.get(stage, {}).get("sum", 0.0)
+            stages[stage] = {"count": int(count), "meanMs": round(seconds / count * 1000.0, 2)}
+    return stages
+
+
+async def _benchmark(args: argparse.Namespace, mix: Dict[str, float], server: Any, base_url: str) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency + 4, max_keepalive_connections=args.concurrency + 4)
+    timeout = httpx.Timeout(args.timeout)
+    async with httpx.AsyncClient(
+        base_url=base_url, headers={"x-api-key": API_KEY}, limits=limits, timeout=timeout
+    ) as client:
+        await _wait_ready(client, server, args.startup_timeout)
+        print("✓ Server ready")
+
+        rng = random.Random(args.random_seed)
+        images = ImagePool(args.image_pool, (args.image_width, args.image_height), args.random_seed)
+        if args.seed:
+            start = time.perf_counter()
+            await _seed(client, images, args.seed, rng)
+            print(f"✓ Seeded {args.seed} detections ({time.perf_counter() - start:.1f}s)")
+
+        before = (await client.get("/metrics")).text
+        print(f"Running {args.concurrency} clients for {args.duration}s (+{args.warmup}s warm-up)...")
+        samples, elapsed = await _run_load(client, args, mix, images)
+        after = (await client.get("/metrics")).text
+        health = (await client.get("/v1/health")).json()
+
+    return {
+        "elapsedS": round(elapsed, 2),
+        "endpoints": _summarize(samples, elapsed),
+        "stages": _stage_means(before, after),
+        "server": {k: health.get(k) for k in ("inferenceBatching", "dedupCache", "geocodeCache", "startupMs")},
+    }
+
+
+def run_load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    env = dict(item.split("=", 1) for item in args.env)
+    options = {
+        "env": env,
+        "model": args.model,
+        "firestore": args.firestore,
+        "jitter": args.jitter,
+        "storage_ms": args.storage_ms,
+        "firestore_read_ms": args.firestore_read_ms,
+        "firestore_write_ms": args.firestore_write_ms,
+        "maps_ms": args.maps_ms,
+        "areas": args.areas,
+        "inference_ms": args.inference_ms,
+        "inference_per_image_ms": args.inference_per_image_ms,
+    }
+    if args.firestore == "emulator" and not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        raise RuntimeError("--firestore emulator needs FIRESTORE_EMULATOR_HOST (gcloud emulators firestore start)")
+
+    config = {
+        "concurrency": args.concurrency,
+        "durationS": args.duration,
+        "warmupS": args.warmup,
+        "mix": mix,
+        "seed": args.seed,
+        "batchSize": args.batch_size,
+        "duplicateRate": args.duplicate_rate,
+        "image": [args.image_width, args.image_height],
+        **{k: v for k, v in options.items() if k != "env"},
+        "env": env,
+    }
+    report = new_report("load", config)
+
+    port = _free_port()
+    server = multiprocessing.get_context("spawn").Process(target=_serve, args=(options, port), daemon=True)
+    server.start()
+    try:
+        report.update(asyncio.run(_benchmark(args, mix, server, f"http://127.0.0.1:{port}")))
+    finally:
+        server.terminate()
+        server.join(timeout=10)
+    return report
+
+
+def _print_results(report: Dict[str, Any]) -> None:
+    print("-" * 78)
+    print(f"{'endpoint':<16}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, row in report["endpoints"].items():
+        print(
+            f"{name:<16}{row['requests']:>9}{row['errors']:>8}{row['rps']:>9}"
+            f"{row['p50Ms']:>9}{row['p95Ms']:>9}{row['p99Ms']:>9}"
+        )
+    if report["stages"]:
+        print("Stage means (ms): " + ", ".join(f"{k}={v['meanMs']}" for k, v in report["stages"].items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the API against local GCP stand-ins")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent closed-loop clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of load before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted endpoint mix (default: {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=500, help="Detections created before the run")
+    parser.add_argument("--batch-size", type=int, default=20, help="Images per request for the `batch` endpoint")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0, help="Fraction of uploads resending earlier bytes")
+    parser.add_argument("--image-width", type=int, default=1280)
+    parser.add_argument("--image-height", type=int, default=720)
+    parser.add_argument("--image-pool", type=int, default=32, help="Distinct images to draw uploads from")
+    parser.add_argument("--model", choices=["synthetic", "real"], default="synthetic")
+    parser.add_argument("--inference-ms", type=float, default=25.0, help="Synthetic model: cost per batch")
+    parser.add_argument("--inference-per-image-ms", type=float, default=12.0, help="Synthetic model: cost per image")
+    parser.add_argument("--firestore", choices=["memory", "emulator"], default="memory")
+    parser.add_argument("--storage-ms", type=float, default=45.0, help="Injected Cloud Storage latency per call")
+    parser.add_argument("--firestore-read-ms", type=float, default=8.0, help="Injected Firestore read latency")
+    parser.add_argument("--firestore-write-ms", type=float, default=20.0, help="Injected Firestore commit latency")
+    parser.add_argument("--maps-ms", type=float, default=80.0, help="Injected Geocoding API latency")
+    parser.add_argument("--jitter", type=float, default=0.25, help="Latency jitter as a fraction of the mean")
+    parser.add_argument("--areas", type=int, default=12, help="Distinct neighbourhoods returned by the Maps fake")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Server setting override")
+    parser.add_argument("--random-seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Report path (default: benchmarks/results/load-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier report to compare against")
+    parser.add_argument(
+        "--max-regression", type=float, default=None, help="Exit 2 if any endpoint's p95 grew by more than this %%"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        report = run_load_test(args)
+        _print_results(report)
+        path = write_report(report, args.output)
+        print(f"✓ Report written to {path}")
+
+        if args.compare:
+            baseline = load_report(args.compare)
+            rows = compare_rows(report["endpoints"], baseline.get("endpoints", {}), ["rps", "p50Ms", "p95Ms", "p99Ms"])
+            print_comparison(rows, baseline.get("commit"))
+            if args.max_regression is not None:
+                regressed = [r for r in rows if r["metric"] == "p95Ms" and r["changePct"] > args.max_regression]
+                if regressed:
+                    print(f"✗ p95 regression above {args.max_regression}%: {', '.join(r['key'] for r in regressed)}")
+                    sys.exit(2)
+        sys.exit(0)
+    except Exception as e:
+        print(f"Fatal error: {str(e)}")
+        sys.exit(1)
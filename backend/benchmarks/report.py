@@ -0,0 +1,124 @@
+"""
+Result summaries and JSON reports shared by the benchmarks.
+
+Reports carry the git commit they were measured on so runs can be compared across commits with
+`--compare`.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Linear-interpolated percentile (`q` in 0..100) of an already sorted sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * q / 100.0
+    low, high = math.floor(rank), math.ceil(rank)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def latency_summary(latencies_ms: Sequence[float]) -> Dict[str, float]:
+    values = sorted(latencies_ms)
+    return {
+        "meanMs": round(sum(values) / len(values), 2) if values else 0.0,
+        "p50Ms": round(percentile(values, 50), 2),
+        "p95Ms": round(percentile(values, 95), 2),
+        "p99Ms": round(percentile(values, 99), 2),
+        "maxMs": round(values[-1], 2) if values else 0.0,
+    }
+
+
+def git_revision() -> Dict[str, Any]:
+    """Commit of the working tree, and whether it has uncommitted changes."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--", "."], cwd=BACKEND_DIR, capture_output=True, text=True
+            ).stdout.strip()
+        )
+        return {"commit": commit, "dirty": dirty}
+    except Exception:
+        return {"commit": None, "dirty": None}
+
+
+def machine_info() -> Dict[str, Any]:
+    """CPU shape the run was measured on; results are only comparable on the same shape."""
+    cpu = platform.processor() or platform.machine()
+    try:
+        with open("/proc/cpuinfo") as fh:
+            cpu = next((line.split(":", 1)[1].strip() for line in fh if line.startswith("model name")), cpu)
+    except OSError:
+        pass
+    usable = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    return {"cpu": cpu, "cpus": usable, "python": platform.python_version(), "platform": platform.platform()}
+
+
+def new_report(benchmark: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "benchmark": benchmark,
+        **git_revision(),
+        "startedAt": datetime.now(tz=timezone.utc).isoformat(),
+        "machine": machine_info(),
+        "config": config,
+    }
+
+
+def write_report(report: Dict[str, Any], output: Optional[str]) -> Path:
+    """Write `report` to `output`, or to results/<benchmark>-<commit>-<timestamp>.json."""
+    if output:
+        path = Path(output)
+    else:
+        stamp = datetime.now(tz=timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = RESULTS_DIR / f"{report['benchmark']}-{report.get('commit') or 'unknown'}-{stamp}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, sort_keys=False))
+    return path
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text())
+
+
+def compare_rows(
+    current: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    metrics: Sequence[str],
+) -> List[Dict[str, Any]]:
+    """Per-key, per-metric changes between two result maps (e.g. endpoint -> summary)."""
+    rows = []
+    for key in current:
+        if key not in baseline:
+            continue
+        for metric in metrics:
+            new, old = current[key].get(metric), baseline[key].get(metric)
+            if new is None or old is None:
+                continue
+            change = (new - old) / old * 100.0 if old else 0.0
+            rows.append({"key": key, "metric": metric, "baseline": old, "current": new, "changePct": round(change, 1)})
+    return rows
+
+
+def print_comparison(rows: Sequence[Dict[str, Any]], baseline_commit: Optional[str]) -> None:
+    print(f"Compared with {baseline_commit or 'baseline'}:")
+    key_width = max((len(row["key"]) for row in rows), default=0)
+    metric_width = max((len(row["metric"]) for row in rows), default=0)
+    for row in rows:
+        print(
+            f"  {row['key']:<{key_width}} {row['metric']:<{metric_width}} {row['baseline']:>10} -> {row['current']:>10}"
+            f"  ({row['changePct']:+.1f}%)"
+        )
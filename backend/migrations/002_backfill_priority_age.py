@@ -0,0 +1,53 @@
+"""
+Migration: Backfill age-bonus fields (`priority_base`, `age_bucket`) on existing detections.
+
+The priority refresh job (`POST /v1/analytics/refresh-priorities`) only selects detections by
+`age_bucket`, and Firestore never matches a missing field, so detections written before the age
+bonus existed were never re-aged. This migration gives them the fields new detections are created
+with: `priority_base` is the current `priority_score` (which has no age bonus in it yet) and
+`age_bucket` is 0. The next refresh then applies the bonus their age calls for, together with the
+matching area aggregate update.
+
+Usage:
+    python migrations/002_backfill_priority_age.py --project PROJECT_ID
+
+Notes:
+- Run after 001_add_priority_fields.py; detections without a `priority_score` are skipped.
+- Idempotent - detections that already have both fields are skipped.
+- Trigger a priority refresh afterwards to apply the age bonus straight away.
+"""
+
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Allow `python migrations/<name>.py` from the backend/ directory
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from migrations.runner import Migration, run_cli  # noqa: E402
+
+
+class BackfillPriorityAge(Migration):
+    """Sets `priority_base` and `age_bucket` where they are missing."""
+
+    name = "002_backfill_priority_age"
+    # Missing fields can't be queried for, so every document is read (projected) and checked here
+    fields = ["priority_score", "priority_base", "age_bucket"]
+
+    def updates(self, doc_id: str, doc_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if doc_data.get("priority_base") is not None and doc_data.get("age_bucket") is not None:
+            return None
+        score = doc_data.get("priority_score")
+        if score is None:
+            return None  # Not migrated by 001 yet
+
+        updates: Dict[str, Any] = {}
+        if doc_data.get("priority_base") is None:
+            updates["priority_base"] = int(score)
+        if doc_data.get("age_bucket") is None:
+            updates["age_bucket"] = 0
+        return updates
+
+
+if __name__ == "__main__":
+    run_cli(BackfillPriorityAge(), "Backfill priority_base and age_bucket on detections")
@@ -0,0 +1,49 @@
+"""
+Migration: Backfill `geohash` on existing detections.
+
+Sighting merge finds the open detection near an upload with geohash prefix queries, and Firestore
+never matches a missing field, so detections written before sighting merge existed could never
+receive a repeat sighting. This migration gives them the geohash new detections are created with
+(same precision, from `metadata.location`). Detections without a location or without any
+detections are left alone, as at ingest: they are never merge targets.
+
+Usage:
+    python migrations/003_backfill_geohash.py --project PROJECT_ID
+
+Notes:
+- Idempotent - detections that already have a geohash are skipped.
+- The lookup also needs the composite index on `detections` (`status` ASC, `geohash` ASC).
+"""
+
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Allow `python migrations/<name>.py` from the backend/ directory
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.sightings import record_geohash  # noqa: E402
+from migrations.runner import Migration, run_cli  # noqa: E402
+
+
+class BackfillGeohash(Migration):
+    """Sets `geohash` from the detection's location where it is missing."""
+
+    name = "003_backfill_geohash"
+    # Missing fields can't be queried for, so every document is read (projected) and checked here
+    fields = ["geohash", "metadata.location", "detection.numDetections"]
+
+    def updates(self, doc_id: str, doc_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if doc_data.get("geohash"):
+            return None
+        if not (doc_data.get("detection") or {}).get("numDetections"):
+            return None
+        location = (doc_data.get("metadata") or {}).get("location") or {}
+        geohash = record_geohash(location.get("lat"), location.get("lng"))
+        if geohash is None:
+            return None
+        return {"geohash": geohash}
+
+
+if __name__ == "__main__":
+    run_cli(BackfillGeohash(), "Backfill geohash on detections for sighting merge")
@@ -0,0 +1,392 @@
+"""
+Resumable, batched migration runner for Firestore collections.
+
+A migration is a `Migration` subclass that turns one document into the writes that migrate it
+(nothing if it is already migrated). The runner:
+1. Pages through the collection in document-ID order (`--page-size` docs per read), fetching only
+   the fields the migration reads and, where the migration can express it as an equality filter,
+   only unmigrated documents.
+2. Packs each document's writes into batched commits (`--batch-size`, max 500) committed by a pool
+   of `--workers` threads while the next page is read; transient errors are retried with backoff.
+3. Checkpoints the last document ID once every page up to it has committed, so a crashed or
+   interrupted run resumes after it instead of starting over.
+4. Prints progress and docs/sec as it goes.
+
+Usage (from a migration script):
+    from migrations.runner import Migration, run_cli
+
+    class BackfillFoo(Migration):
+        name = "002_backfill_foo"
+        fields = ["foo"]
+
+        def updates(self, doc_id, data):
+            return None if "foo" in data else {"foo": 0}
+
+    if __name__ == "__main__":
+        run_cli(BackfillFoo(), "Backfill foo on detections")
+
+Notes:
+- Migrations must be idempotent: a resumed run re-reads up to one page past the checkpoint.
+- Checkpoints live in `migrations/.checkpoints/` (one file per migration, project and collection)
+  and are removed when a run completes without errors. `--restart` ignores an existing one.
+- A page with a failed batch stops the checkpoint there; documents after it are still migrated,
+  and a rerun picks up from the failed page.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+# Allow `python migrations/<name>.py` from the backend/ directory
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.batch_writer import MAX_BATCH_OPS, RETRYABLE_ERRORS, ParallelBatchWriter, WriteOp  # noqa: E402
+
+CHECKPOINT_DIR = Path(__file__).resolve().parent / ".checkpoints"
+
+# Attempts per page read before the run fails (the checkpoint keeps the progress made so far)
+READ_ATTEMPTS = 5
+
+
+class Migration:
+    """One schema migration, applied document by document.
+
+    Subclasses set `name` and implement `updates` (or `writes` for anything other than a single
+    update of the document itself).
+    """
+
+    # Identifies the migration in checkpoint file names
+    name: str = ""
+    # Fields read per document; None reads whole documents
+    fields: Optional[List[str]] = None
+
+    def pending_filter(self, query: Any) -> Any:
+        """Narrow `query` to unmigrated documents where Firestore can express it.
+
+        Only equality filters combine with the runner's document-ID order without a composite
+        index. Firestore can't match a field that is missing, so migrations that add new fields
+        usually can't filter and rely on `updates` returning None instead.
+        """
+        return query
+
+    def updates(self, doc_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Fields to update on the document, or None if it is already migrated."""
+        raise NotImplementedError
+
+    def writes(self, ref: Any, data: Dict[str, Any]) -> List[WriteOp]:
+        """Writes that migrate one document; they commit together in one batch."""
+        updates = self.updates(ref.id, data)
+        return [WriteOp("update", ref, updates)] if updates else []
+
+
+@dataclass
+class MigrationStats:
+    scanned: int = 0
+    migrated: int = 0
+    skipped: int = 0
+    failed: int = 0
+
+    def add(self, other: "MigrationStats") -> None:
+        self.scanned += other.scanned
+        self.migrated += other.migrated
+        self.skipped += other.skipped
+        self.failed += other.failed
+
+
+@dataclass
+class _Page:
+    last_id: str
+    stats: MigrationStats = field(default_factory=MigrationStats)
+    # Documents with writes whose batch hasn't finished yet
+    pending: int = 0
+    # All of the page's documents have been handed to the writer
+    sealed: bool = False
+
+
+class MigrationRunner:
+    """Runs a `Migration` over one collection; see the module docstring."""
+
+    def __init__(
+        self,
+        client: Any,
+        migration: Migration,
+        collection: str,
+        page_size: int = 1000,
+        batch_size: int = MAX_BATCH_OPS,
+        workers: int = 8,
+        dry_run: bool = False,
+        checkpoint_path: Optional[Path] = None,
+        progress_interval_s: float = 5.0,
+    ) -> None:
+        if not migration.name:
+            raise ValueError(f"{type(migration).__name__} has no name")
+        self._client = client
+        self.migration = migration
+        self.collection = collection
+        self.page_size = max(1, page_size)
+        self.dry_run = dry_run
+        self.checkpoint_path = checkpoint_path
+        self.progress_interval_s = progress_interval_s
+        self._writer = ParallelBatchWriter(client, batch_size=batch_size, max_workers=workers)
+
+        # Totals up to the checkpoint (including earlier runs) and for everything seen this run
+        self.checkpointed = MigrationStats()
+        self.stats = MigrationStats()
+        self.cursor: Optional[str] = None
+        self._pages: List[_Page] = []
+        self._group_pages: Dict[int, _Page] = {}
+        self._next_group = 0
+        self._blocked = False
+        self._started = 0.0
+        self._last_progress = 0.0
+
+    # Checkpoints --------------------------------------------------------------
+
+    def load_checkpoint(self) -> bool:
+        """Resume from the checkpoint file if there is one; True if resuming."""
+        if self.checkpoint_path is None or not self.checkpoint_path.exists():
+            return False
+        with open(self.checkpoint_path) as fh:
+            saved = json.load(fh)
+        self.cursor = saved["cursor"]
+        self.checkpointed = MigrationStats(**saved["stats"])
+        return True
+
+    def _save_checkpoint(self) -> None:
+        if self.checkpoint_path is None or self.dry_run:
+            return
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.checkpoint_path.with_suffix(".tmp")
+        with open(tmp, "w") as fh:
+            json.dump({
+                "migration": self.migration.name,
+                "collection": self.collection,
+                "cursor": self.cursor,
+                "stats": asdict(self.checkpointed),
+                "updatedAt": datetime.now(timezone.utc).isoformat(),
+            }, fh, indent=2)
+        tmp.replace(self.checkpoint_path)
+
+    def clear_checkpoint(self) -> None:
+        if self.checkpoint_path is not None and self.checkpoint_path.exists():
+            self.checkpoint_path.unlink()
+
+    def _advance(self) -> None:
+        """Move the checkpoint past every leading page whose writes have all committed."""
+        moved = False
+        while self._pages and not self._blocked:
+            page = self._pages[0]
+            if not page.sealed or page.pending:
+                break
+            if page.stats.failed:
+                # Everything from this page on is re-read by the next run
+                self._blocked = True
+                break
+            self._pages.pop(0)
+            self.cursor = page.last_id
+            self.checkpointed.add(page.stats)
+            moved = True
+        if moved:
+            self._save_checkpoint()
+
+    # Reading ------------------------------------------------------------------
+
+    def _fetch_page(self, cursor: Optional[str]) -> List[Any]:
+        query = self.migration.pending_filter(self._client.collection(self.collection))
+        if self.migration.fields is not None:
+            query = query.select(self.migration.fields)
+        query = query.order_by("__name__")
+        if cursor is not None:
+            query = query.start_after({"__name__": cursor})
+        query = query.limit(self.page_size)
+
+        attempt = 0
+        while True:
+            try:
+                return list(query.stream())
+            except RETRYABLE_ERRORS as e:
+                attempt += 1
+                if attempt >= READ_ATTEMPTS:
+                    raise
+                delay = random.uniform(0, min(16.0, 0.5 * (2 ** attempt)))
+                print(f"⚠️  Page read failed ({e}); retry {attempt} in {delay:.2f}s")
+                time.sleep(delay)
+
+    def _groups(self) -> Iterator[Sequence[WriteOp]]:
+        """Write groups (one per document to migrate), page by page from the cursor."""
+        cursor = self.cursor
+        while True:
+            docs = self._fetch_page(cursor)
+            if not docs:
+                return
+            page = _Page(last_id=docs[-1].id)
+            self._pages.append(page)
+            for doc in docs:
+                page.stats.scanned += 1
+                self.stats.scanned += 1
+                try:
+                    ops = self.migration.writes(doc.reference, doc.to_dict() or {})
+                except Exception as e:
+                    page.stats.failed += 1
+                    self.stats.failed += 1
+                    print(f"✗ Error: {doc.id} - {str(e)}")
+                    continue
+                if not ops:
+                    page.stats.skipped += 1
+                    self.stats.skipped += 1
+                    continue
+                if self.dry_run:
+                    page.stats.migrated += 1
+                    self.stats.migrated += 1
+                    continue
+                page.pending += 1
+                self._group_pages[self._next_group] = page
+                self._next_group += 1
+                yield ops
+            page.sealed = True
+            self._advance()
+            self._maybe_report()
+            if len(docs) < self.page_size:
+                return
+            cursor = page.last_id
+
+    def _on_batch(self, groups: List[int], committed: bool) -> None:
+        for index in groups:
+            page = self._group_pages.pop(index)
+            page.pending -= 1
+            if committed:
+                page.stats.migrated += 1
+                self.stats.migrated += 1
+            else:
+                page.stats.failed += 1
+                self.stats.failed += 1
+        self._advance()
+        self._maybe_report()
+
+    # Running ------------------------------------------------------------------
+
+    def run(self) -> MigrationStats:
+        """Migrate every document after the cursor; returns this run's totals."""
+        self._started = self._last_progress = time.perf_counter()
+        if self.dry_run:
+            for _ in self._groups():
+                pass
+        else:
+            report = self._writer.commit_groups(self._groups(), on_batch=self._on_batch)
+            for error in report.errors[:5]:
+                print(f"✗ Batch failed: {error}")
+        self._report()
+        return self.stats
+
+    def _maybe_report(self) -> None:
+        now = time.perf_counter()
+        if now - self._last_progress >= self.progress_interval_s:
+            self._last_progress = now
+            self._report()
+
+    def _report(self) -> None:
+        elapsed = max(time.perf_counter() - self._started, 1e-9)
+        s = self.stats
+        print(
+            f"  {s.scanned:,} scanned  {s.migrated:,} {'to migrate' if self.dry_run else 'migrated'}"
+            f"  {s.skipped:,} skipped  {s.failed:,} failed"
+            f"  | {s.scanned / elapsed:,.0f} docs/s scanned, {s.migrated / elapsed:,.0f} docs/s migrated"
+            f"  | checkpoint: {self.cursor or '-'}"
+        )
+
+
+def checkpoint_file(migration: Migration, project_id: str, collection: str) -> Path:
+    return CHECKPOINT_DIR / f"{migration.name}-{project_id}-{collection}.json"
+
+
+def run_migration(
+    migration: Migration,
+    project_id: str,
+    collection: str,
+    page_size: int = 1000,
+    batch_size: int = MAX_BATCH_OPS,
+    workers: int = 8,
+    dry_run: bool = False,
+    restart: bool = False,
+    client: Any = None,
+) -> MigrationStats:
+    """Run `migration` over `collection`, resuming from its checkpoint unless `restart`."""
+    if client is None:
+        from google.cloud import firestore
+
+        client = firestore.Client(project=project_id)
+
+    runner = MigrationRunner(
+        client,
+        migration,
+        collection,
+        page_size=page_size,
+        batch_size=batch_size,
+        workers=workers,
+        dry_run=dry_run,
+        checkpoint_path=checkpoint_file(migration, project_id, collection),
+    )
+    print(f"Starting migration {migration.name} for project: {project_id}")
+    print(f"Collection: {collection}")
+    print(f"Page size: {runner.page_size}  Batch size: {runner._writer.batch_size}  Workers: {runner._writer.max_workers}")
+    print(f"Mode: {'DRY RUN' if dry_run else 'LIVE'}")
+    if restart:
+        runner.clear_checkpoint()
+    elif runner.load_checkpoint():
+        print(f"Resuming after {runner.cursor} ({runner.checkpointed.scanned:,} documents already scanned)")
+    print("-" * 60)
+
+    stats = runner.run()
+
+    print("-" * 60)
+    print(f"Migration {'preview' if dry_run else 'complete'}!")
+    print(f"  {'Would migrate' if dry_run else 'Migrated'}: {stats.migrated}")
+    print(f"  Skipped: {stats.skipped}")
+    print(f"  Errors: {stats.failed}")
+    print(f"  Total: {stats.scanned}")
+    if not dry_run:
+        if stats.failed:
+            print(f"  Checkpoint kept at {runner.cursor or 'start'}; rerun to retry from there")
+        else:
+            runner.clear_checkpoint()
+    return stats
+
+
+def run_cli(migration: Migration, description: str, collection: str = "detections") -> None:
+    """Command-line entry point shared by migration scripts; exits 1 if any document failed."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--project", required=True, help="GCP Project ID")
+    parser.add_argument("--collection", default=collection, help="Firestore collection name")
+    parser.add_argument("--page-size", type=int, default=1000, help="Documents read per page")
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH_OPS, help="Writes per batched commit (max 500)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent batch commits")
+    parser.add_argument("--dry-run", action="store_true", help="Dry run mode (no actual updates)")
+    parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and start from the beginning")
+
+    args = parser.parse_args()
+
+    if args.dry_run:
+        print("⚠️  DRY RUN MODE - No changes will be made")
+        print()
+
+    try:
+        stats = run_migration(
+            migration,
+            args.project,
+            args.collection,
+            page_size=args.page_size,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            dry_run=args.dry_run,
+            restart=args.restart,
+        )
+        sys.exit(1 if stats.failed else 0)
+    except Exception as e:
+        print(f"Fatal error: {str(e)}")
+        sys.exit(1)
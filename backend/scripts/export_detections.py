@@ -0,0 +1,427 @@
+"""
+Export detections as date-partitioned Parquet snapshots for offline analytics.
+
+Analysts query the snapshots (DuckDB, BigQuery external tables, pandas/pyarrow) instead of the
+serving API or full Firestore scans. Each document becomes one row with flattened columns
+(location, severity, priority, area, status, box statistics), stored under hive-style partitions
+by creation date:
+
+    <output>/date=2025-10-28/part-<run>.parquet
+    <output>/_watermark.json
+
+Usage:
+    python scripts/export_detections.py --project PROJECT_ID --output gs://BUCKET/exports/detections
+    python scripts/export_detections.py --project PROJECT_ID --output exports/detections --full
+
+Notes:
+- Requires pyarrow, which is not part of the serving image: `pip install pyarrow==17.0.0`.
+- Incremental by default: only documents created or updated (`createdAt` / `updatedAt`) since the
+  watermark of the previous run are read, and only the date partitions they fall in are rewritten.
+  Each partition holds one row per document (the latest export of it).
+- The watermark is the run's start time minus `--overlap-minutes`, so records written late (e.g.
+  write-behind retries) are picked up by the next run; re-exported rows simply replace themselves.
+- Deleted and expired detections are only dropped by a `--full` export, which rewrites every
+  partition. The first run (no watermark yet) is always full.
+- Schedule it as a Cloud Run job (e.g. hourly incremental, weekly full).
+"""
+
+import argparse
+import importlib
+import io
+import json
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from google.cloud import firestore
+
+# Allow `python scripts/<name>.py` from the backend/ directory
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.aggregates import created_date, stream_snapshots  # noqa: E402
+from app.priority import parse_created_at  # noqa: E402
+
+WATERMARK_FILE = "_watermark.json"
+# Hive's name for rows without a partition value (records without a usable `createdAt`)
+UNKNOWN_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Fields read per document; everything else (sightings history, expiresAt) stays in Firestore
+EXPORT_FIELDS = [
+    "createdAt",
+    "updatedAt",
+    "lastSeenAt",
+    "metadata",
+    "detection",
+    "severity",
+    "priority_score",
+    "priority_base",
+    "area",
+    "street_name",
+    "status",
+    "repair_urgency",
+    "cluster_id",
+    "road_type",
+    "sightings",
+    "bestConfidence",
+    "storagePath",
+]
+
+
+def _schema():
+    import pyarrow as pa
+
+    ts = pa.timestamp("us", tz="UTC")
+    return pa.schema([
+        ("id", pa.string()),
+        ("created_at", ts),
+        ("updated_at", ts),
+        ("last_seen_at", ts),
+        ("captured_at", ts),
+        ("device_id", pa.string()),
+        ("lat", pa.float64()),
+        ("lng", pa.float64()),
+        ("alt", pa.float64()),
+        ("severity", pa.string()),
+        ("priority_score", pa.int32()),
+        ("priority_base", pa.int32()),
+        ("area", pa.string()),
+        ("street_name", pa.string()),
+        ("status", pa.string()),
+        ("repair_urgency", pa.string()),
+        ("road_type", pa.string()),
+        ("cluster_id", pa.string()),
+        ("sightings", pa.int32()),
+        ("num_detections", pa.int32()),
+        ("max_confidence", pa.float64()),
+        ("mean_confidence", pa.float64()),
+        ("best_confidence", pa.float64()),
+        ("max_box_area", pa.float64()),
+        ("total_box_area", pa.float64()),
+        ("model_version", pa.string()),
+        ("storage_path", pa.string()),
+    ])
+
+
+def _float(value: Any) -> Optional[float]:
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def _int(value: Any) -> Optional[int]:
+    return int(value) if isinstance(value, (int, float)) else None
+
+
+def flatten(doc_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """One export row from a stored detection document."""
+    metadata = data.get("metadata") or {}
+    location = metadata.get("location") or {}
+    detection = data.get("detection") or {}
+    boxes = [b for b in detection.get("boundingBoxes") or [] if isinstance(b, dict)]
+    confidences = [float(b.get("confidence") or 0.0) for b in boxes]
+    areas = [float(b.get("width") or 0.0) * float(b.get("height") or 0.0) for b in boxes]
+    return {
+        "id": doc_id,
+        "created_at": parse_created_at(data.get("createdAt")),
+        "updated_at": parse_created_at(data.get("updatedAt")),
+        "last_seen_at": parse_created_at(data.get("lastSeenAt")),
+        "captured_at": parse_created_at(metadata.get("capturedAt")),
+        "device_id": metadata.get("deviceId"),
+        "lat": _float(location.get("lat")),
+        "lng": _float(location.get("lng")),
+        "alt": _float(location.get("alt")),
+        "severity": data.get("severity"),
+        "priority_score": _int(data.get("priority_score")),
+        "priority_base": _int(data.get("priority_base")),
+        "area": data.get("area"),
+        "street_name": data.get("street_name"),
+        "status": data.get("status"),
+        "repair_urgency": data.get("repair_urgency"),
+        "road_type": data.get("road_type"),
+        "cluster_id": data.get("cluster_id"),
+        "sightings": _int(data.get("sightings")),
+        "num_detections": _int(detection.get("numDetections")),
+        "max_confidence": max(confidences) if confidences else None,
+        "mean_confidence": sum(confidences) / len(confidences) if confidences else None,
+        "best_confidence": _float(data.get("bestConfidence")),
+        "max_box_area": max(areas) if areas else None,
+        "total_box_area": sum(areas) if areas else None,
+        "model_version": detection.get("modelVersion"),
+        "storage_path": data.get("storagePath"),
+    }
+
+
+class LocalStore:
+    """Export destination on the local filesystem."""
+
+    def __init__(self, root: str) -> None:
+        self.root = Path(root)
+        self.url = str(self.root)
+
+    def read(self, path: str) -> Optional[bytes]:
+        target = self.root / path
+        return target.read_bytes() if target.exists() else None
+
+    def write(self, path: str, data: bytes) -> None:
+        target = self.root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.tmp")
+        tmp.write_bytes(data)
+        tmp.replace(target)
+
+    def list(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return [str(p.relative_to(self.root)) for p in self.root.rglob("*.parquet")]
+
+    def delete(self, path: str) -> None:
+        (self.root / path).unlink(missing_ok=True)
+
+
+class GcsStore:
+    """Export destination under a `gs://bucket/prefix` URL."""
+
+    def __init__(self, url: str, project_id: str) -> None:
+        from google.cloud import storage
+
+        bucket, _, prefix = url[len("gs://"):].partition("/")
+        self._bucket = storage.Client(project=project_id).bucket(bucket)
+        self._prefix = prefix.strip("/")
+        self.url = url
+
+    def _key(self, path: str) -> str:
+        return f"{self._prefix}/{path}" if self._prefix else path
+
+    def read(self, path: str) -> Optional[bytes]:
+        from google.api_core.exceptions import NotFound
+
+        try:
+            return self._bucket.blob(self._key(path)).download_as_bytes()
+        except NotFound:
+            return None
+
+    def write(self, path: str, data: bytes) -> None:
+        content_type = "application/json" if path.endswith(".json") else "application/vnd.apache.parquet"
+        self._bucket.blob(self._key(path)).upload_from_string(data, content_type=content_type)
+
+    def list(self) -> List[str]:
+        base = f"{self._prefix}/" if self._prefix else ""
+        return [
+            blob.name[len(base):]
+            for blob in self._bucket.list_blobs(prefix=base or None)
+            if blob.name.endswith(".parquet")
+        ]
+
+    def delete(self, path: str) -> None:
+        from google.api_core.exceptions import NotFound
+
+        try:
+            self._bucket.blob(self._key(path)).delete()
+        except NotFound:
+            pass
+
+
+def open_store(output: str, project_id: str):
+    return GcsStore(output, project_id) if output.startswith("gs://") else LocalStore(output)
+
+
+class PartitionWriter:
+    """Writes one Parquet file per date partition, replacing the rows of re-exported documents."""
+
+    def __init__(self, store: Any, full: bool, compression: str = "zstd") -> None:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        self._pa, self._pc, self._pq = pa, pc, pq
+        self._schema = _schema()
+        self.store = store
+        self.full = full
+        self.compression = compression
+        self.run_id = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self._files: Dict[str, List[str]] = defaultdict(list)
+        for path in store.list():
+            self._files[path.split("/", 1)[0]].append(path)
+        self._written: Dict[str, str] = {}
+        self.rows_written = 0
+
+    def write(self, date: Optional[str], rows: List[Dict[str, Any]]) -> None:
+        partition = f"date={date or UNKNOWN_PARTITION}"
+        table = self._pa.Table.from_pylist(rows, schema=self._schema)
+
+        # A full export starts each partition over (its first write this run); otherwise rows
+        # already in the partition are kept unless this export has a newer copy of them
+        existing = self._files.get(partition, [])
+        if existing and (not self.full or partition in self._written):
+            kept = []
+            ids = self._pa.array([row["id"] for row in rows], type=self._pa.string())
+            for path in existing:
+                data = self.store.read(path)
+                if data is None:
+                    continue
+                old = self._pq.read_table(io.BytesIO(data))
+                old = old.filter(self._pc.invert(self._pc.is_in(old["id"], value_set=ids)))
+                kept.append(self._conform(old))
+            table = self._pa.concat_tables(kept + [table])
+
+        table = table.sort_by([("created_at", "ascending")])
+        buf = io.BytesIO()
+        self._pq.write_table(table, buf, compression=self.compression)
+        path = f"{partition}/part-{self.run_id}-{len(self._written)}.parquet"
+        self.store.write(path, buf.getvalue())
+        for old_path in existing:
+            self.store.delete(old_path)
+        self._files[partition] = [path]
+        self._written[partition] = path
+        self.rows_written += len(rows)
+
+    def _conform(self, table: Any) -> Any:
+        """A file written by an older version of this job, in the current schema (new columns null)."""
+        for name in self._schema.names:
+            if name not in table.column_names:
+                table = table.append_column(name, self._pa.nulls(len(table), self._schema.field(name).type))
+        return table.select(self._schema.names).cast(self._schema)
+
+    def drop_unwritten(self) -> int:
+        """After a full export: delete partitions no document belongs to anymore."""
+        stale = [p for p in self._files if p not in self._written]
+        for partition in stale:
+            for path in self._files.pop(partition):
+                self.store.delete(path)
+        return len(stale)
+
+    @property
+    def partitions(self) -> List[str]:
+        return sorted(self._written)
+
+
+def _changed_since(detections: Any, since: datetime, page_size: int) -> Iterable[Any]:
+    """Documents created or updated at or after `since`.
+
+    `createdAt` is stored as an ISO string (see `_iso_key` in app.main), older records may hold a
+    native timestamp, and `updatedAt` is a native timestamp; each is a single-field range query.
+    """
+    iso = since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    for field_path, value in (("createdAt", iso), ("createdAt", since), ("updatedAt", since)):
+        query = detections.where(field_path, ">=", value)
+        yield from stream_snapshots(query, page_size, EXPORT_FIELDS, order_by=field_path)
+
+
+def run_export(
+    project_id: str,
+    collection_name: str,
+    output: str,
+    full: bool = False,
+    overlap_minutes: float = 10.0,
+    page_size: int = 1000,
+    compression: str = "zstd",
+    client: Any = None,
+    store: Any = None,
+) -> Dict[str, Any]:
+    store = store or open_store(output, project_id)
+    db = client or firestore.Client(project=project_id)
+    detections = db.collection(collection_name)
+
+    saved = store.read(WATERMARK_FILE)
+    previous = json.loads(saved) if saved else None
+    since = None if full or previous is None else datetime.fromisoformat(previous["watermark"])
+    full = since is None
+
+    print(f"Exporting detections for project: {project_id}")
+    print(f"Collection: {collection_name}")
+    print(f"Output: {store.url}")
+    print(f"Mode: {'FULL' if full else f'INCREMENTAL (since {since.isoformat()})'}")
+    print("-" * 60)
+
+    started_at = datetime.now(timezone.utc)
+    start = time.monotonic()
+    writer = PartitionWriter(store, full=full, compression=compression)
+    documents = 0
+
+    if full:
+        # In `createdAt` order a day's rows arrive together, so one partition is held at a time
+        current: Optional[str] = None
+        rows: List[Dict[str, Any]] = []
+        for doc in stream_snapshots(detections, page_size, EXPORT_FIELDS, order_by="createdAt"):
+            data = doc.to_dict() or {}
+            date = created_date(data.get("createdAt"))
+            if rows and date != current:
+                writer.write(current, rows)
+                rows = []
+            current = date
+            rows.append(flatten(doc.id, data))
+            documents += 1
+        if rows:
+            writer.write(current, rows)
+        dropped = writer.drop_unwritten()
+    else:
+        changed: Dict[str, Tuple[Optional[str], Dict[str, Any]]] = {}
+        for doc in _changed_since(detections, since, page_size):
+            data = doc.to_dict() or {}
+            changed[doc.id] = (created_date(data.get("createdAt")), flatten(doc.id, data))
+        documents = len(changed)
+        by_date: Dict[Optional[str], List[Dict[str, Any]]] = defaultdict(list)
+        for date, row in changed.values():
+            by_date[date].append(row)
+        for date in sorted(by_date, key=lambda d: d or ""):
+            writer.write(date, by_date[date])
+        dropped = 0
+
+    watermark = started_at - timedelta(minutes=overlap_minutes)
+    if previous is not None and not full:
+        # Never move backwards (e.g. a larger overlap than the previous run used)
+        watermark = max(watermark, datetime.fromisoformat(previous["watermark"]))
+    summary = {
+        "watermark": watermark.isoformat(),
+        "exportedAt": started_at.isoformat(),
+        "mode": "full" if full else "incremental",
+        "documents": documents,
+        "partitions": writer.partitions,
+    }
+    store.write(WATERMARK_FILE, json.dumps(summary, indent=2).encode("utf-8"))
+
+    elapsed = time.monotonic() - start
+    print(f"✓ {documents} documents exported into {len(writer.partitions)} partitions ({elapsed:.1f}s, {documents / max(elapsed, 1e-9):.0f} docs/s)")
+    if dropped:
+        print(f"✓ {dropped} partitions without detections removed")
+    print(f"✓ Watermark: {summary['watermark']}")
+    return summary
+
+
+def _require_pyarrow() -> None:
+    """Fail fast (before reading Firestore) when the Parquet writer is not installed."""
+    try:
+        importlib.import_module("pyarrow.parquet")
+    except ImportError:
+        raise RuntimeError("pyarrow is required for exports: pip install pyarrow==17.0.0")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export detections as date-partitioned Parquet snapshots")
+    parser.add_argument("--project", required=True, help="GCP Project ID")
+    parser.add_argument("--collection", default="detections", help="Firestore detections collection name")
+    parser.add_argument("--output", required=True, help="Local directory or gs://bucket/prefix")
+    parser.add_argument("--full", action="store_true", help="Rewrite every partition (also drops deleted detections)")
+    parser.add_argument("--overlap-minutes", type=float, default=10.0, help="Re-export window before the watermark")
+    parser.add_argument("--page-size", type=int, default=1000, help="Documents read per page")
+    parser.add_argument("--compression", choices=["zstd", "snappy", "gzip", "none"], default="zstd")
+
+    args = parser.parse_args()
+
+    try:
+        _require_pyarrow()
+        run_export(
+            args.project,
+            args.collection,
+            args.output,
+            full=args.full,
+            overlap_minutes=args.overlap_minutes,
+            page_size=args.page_size,
+            compression=args.compression,
+        )
+        sys.exit(0)
+    except Exception as e:
+        print(f"Fatal error: {str(e)}")
+        sys.exit(1)
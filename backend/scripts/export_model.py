@@ -0,0 +1,126 @@
+"""
+Export the PyTorch pothole weights for the CPU-optimized inference backends.
+
+The API can serve the model through ONNX Runtime or OpenVINO instead of the PyTorch/ultralytics
+stack (`INFERENCE_BACKEND`). This script converts the `.pt` weights once, at build time, and
+checks the export against the original model.
+
+Usage:
+    python scripts/export_model.py --weights models/pothole_yolov8n.pt --format onnx
+    python scripts/export_model.py --weights models/pothole_yolov8n.pt --format openvino --verify samples/
+
+Notes:
+- Requires the full requirements.txt (ultralytics + torch); the serving image does not.
+- Exports are written next to the weights (`pothole_yolov8n.onnx`, `pothole_yolov8n_openvino_model/`),
+  which is where the API looks for them unless INFERENCE_MODEL_PATH is set.
+- The batch dimension is dynamic so micro-batches run in one call (`--static` fixes it to 1).
+- OpenVINO exports/serving need `pip install openvino` (not in requirements.txt).
+- `--imgsz` must match the INFERENCE_IMGSZ the API runs with.
+"""
+
+import argparse
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+# Allow `python scripts/<name>.py` from the backend/ directory
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.backends import load_backend, resolve_model_path  # noqa: E402
+from app.preprocess import LetterboxBuffers, letterbox_into  # noqa: E402
+
+BACKEND_FOR_FORMAT = {"onnx": "onnxruntime", "openvino": "openvino"}
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png"}
+
+
+def export(weights: str, fmt: str, imgsz: int, dynamic: bool, simplify: bool, opset: Optional[int] = None) -> str:
+    from ultralytics import YOLO
+
+    print(f"Exporting {weights} to {fmt} (imgsz={imgsz}, dynamic={dynamic})")
+    kwargs = {"format": fmt, "imgsz": imgsz, "dynamic": dynamic, "device": "cpu"}
+    if fmt == "onnx":
+        kwargs["simplify"] = simplify
+        if opset:
+            kwargs["opset"] = opset
+    exported = YOLO(weights).export(**kwargs)
+
+    # Move the export to the path the API resolves by default
+    target = resolve_model_path(BACKEND_FOR_FORMAT[fmt], weights)
+    if Path(exported).resolve() != Path(target).resolve():
+        if Path(target).is_dir():
+            shutil.rmtree(target)
+        elif Path(target).exists():
+            Path(target).unlink()
+        shutil.move(str(exported), target)
+    print(f"✓ Exported: {target}")
+    return target
+
+
+def _iou(a, b) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def verify(weights: str, exported: str, fmt: str, samples: str, imgsz: int, conf: float, iou: float) -> bool:
+    """Compare the export with the PyTorch model on sample images: detections and latency."""
+    paths = sorted(p for p in Path(samples).rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES)
+    if not paths:
+        print(f"No sample images found in {samples}")
+        return False
+
+    reference = load_backend("ultralytics", weights, imgsz)
+    candidate = load_backend(BACKEND_FOR_FORMAT[fmt], exported, imgsz)
+    buffer = LetterboxBuffers(imgsz).get(1)[0]
+
+    timings = {reference.name: 0.0, candidate.name: 0.0}
+    matched = total = 0
+    for path in paths:
+        with open(path, "rb") as fh:
+            letterbox_into(fh, buffer)
+        outputs = {}
+        for backend in (reference, candidate):
+            start = time.perf_counter()
+            outputs[backend.name] = backend.predict([buffer], conf=conf, iou=iou)[0]
+            timings[backend.name] += time.perf_counter() - start
+        ref, cand = outputs[reference.name], outputs[candidate.name]
+        total += len(ref)
+        matched += sum(1 for r in ref if any(_iou(r, c) >= 0.9 for c in cand))
+        if len(ref) != len(cand):
+            print(f"  {path.name}: {len(ref)} detections (pt) vs {len(cand)} ({fmt})")
+
+    n = len(paths)
+    for name, seconds in timings.items():
+        print(f"  {name}: {seconds / n * 1000:.1f} ms/image")
+    agreement = matched / total if total else 1.0
+    print(f"Detection agreement (IoU >= 0.9): {matched}/{total} ({agreement:.1%}) over {n} images")
+    return agreement >= 0.95
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export pothole weights for ONNX Runtime / OpenVINO serving")
+    parser.add_argument("--weights", default="models/pothole_yolov8n.pt", help="PyTorch weights (.pt)")
+    parser.add_argument("--format", choices=sorted(BACKEND_FOR_FORMAT), default="onnx", help="Export format")
+    parser.add_argument("--imgsz", type=int, default=640, help="Model input size (must match INFERENCE_IMGSZ)")
+    parser.add_argument("--static", action="store_true", help="Fixed batch size of 1 instead of a dynamic batch")
+    parser.add_argument("--no-simplify", action="store_true", help="Skip ONNX graph simplification")
+    parser.add_argument("--opset", type=int, default=None, help="ONNX opset (default: exporter's choice)")
+    parser.add_argument("--verify", metavar="DIR", help="Compare the export with the .pt model on images in DIR")
+    parser.add_argument("--conf", type=float, default=0.35, help="Confidence threshold used by --verify")
+    parser.add_argument("--iou", type=float, default=0.7, help="NMS IoU threshold used by --verify")
+
+    args = parser.parse_args()
+
+    try:
+        output = export(args.weights, args.format, args.imgsz, not args.static, not args.no_simplify, args.opset)
+        if args.verify and not verify(args.weights, output, args.format, args.verify, args.imgsz, args.conf, args.iou):
+            print("Export verification failed: detections differ from the PyTorch model")
+            sys.exit(1)
+        sys.exit(0)
+    except Exception as e:
+        print(f"Fatal error: {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,309 @@
+"""
+INT8 post-training quantization of the exported pothole model, with an accuracy regression report.
+
+Two steps, both run against a local folder of representative road images (dashcam/phone frames
+from our routes, not augmented training data):
+
+    # 1. Calibrate: writes models/pothole_yolov8n.int8.onnx next to the FP32 export
+    python scripts/quantize_model.py calibrate --model models/pothole_yolov8n.onnx --images samples/calibration
+
+    # 2. Validate: compare INT8 against FP32 on a held-out set and write a JSON report
+    python scripts/quantize_model.py validate --model models/pothole_yolov8n.onnx --images samples/validation \
+        --report int8_report.json
+
+Serve the quantized model with INFERENCE_BACKEND=onnxruntime and INFERENCE_PRECISION=int8.
+
+Notes:
+- Export the FP32 model first (scripts/export_model.py --format onnx).
+- Quantization needs the `onnx` package in addition to onnxruntime (`pip install onnx`); serving
+  the INT8 model only needs onnxruntime.
+- Static quantization (QDQ, per-channel INT8 weights, UINT8 activations). Activation ranges are
+  calibrated on the images in --images; 100-300 images covering day/night/wet roads is enough.
+- The detection head (box decoding after the last model layer) stays in FP32 by default: quantizing
+  the box regression costs far more accuracy than it saves time.
+- The report includes severity agreement using the API's severity thresholds, so it shows directly
+  whether severity levels would change on the same images.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Allow `python scripts/<name>.py` from the backend/ directory
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.backends import OnnxRuntimeBackend, resolve_model_path, to_model_input  # noqa: E402
+from app.preprocess import LetterboxBuffers, letterbox_into  # noqa: E402
+from app.priority import severity_level  # noqa: E402
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png"}
+
+
+def list_images(folder: str, limit: Optional[int] = None) -> List[Path]:
+    paths = sorted(p for p in Path(folder).rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES)
+    return paths[:limit] if limit else paths
+
+
+def load_input(path: Path, imgsz: int, buffer: np.ndarray) -> np.ndarray:
+    """The exact tensor the API feeds the model for this image."""
+    with open(path, "rb") as fh:
+        letterbox_into(fh, buffer)
+    return to_model_input([buffer])
+
+
+def head_nodes(model_path: str) -> List[str]:
+    """Nodes of the last top-level module (`/model.<N>/...`), i.e. the YOLOv8 detect head."""
+    import onnx
+
+    model = onnx.load(model_path, load_external_data=False)
+    pattern = re.compile(r"^/model\.(\d+)/")
+    indices = [int(m.group(1)) for node in model.graph.node if (m := pattern.match(node.name))]
+    if not indices:
+        return []
+    prefix = f"/model.{max(indices)}/"
+    return [node.name for node in model.graph.node if node.name.startswith(prefix)]
+
+
+def calibrate(
+    model_path: str,
+    images: str,
+    output: str,
+    imgsz: int,
+    limit: Optional[int],
+    method: str,
+    quantize_head: bool,
+) -> str:
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        CalibrationMethod,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    paths = list_images(images, limit)
+    if not paths:
+        raise ValueError(f"No calibration images found in {images}")
+    print(f"Calibrating {model_path} on {len(paths)} images ({method})")
+
+    import onnxruntime as ort
+
+    input_name = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    buffer = LetterboxBuffers(imgsz).get(1)[0]
+
+    class ImageFolderReader(CalibrationDataReader):
+        def __init__(self) -> None:
+            self._paths = iter(paths)
+            self.count = 0
+
+        def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+            path = next(self._paths, None)
+            if path is None:
+                return None
+            self.count += 1
+            if self.count % 50 == 0:
+                print(f"  {self.count}/{len(paths)} images")
+            return {input_name: load_input(path, imgsz, buffer)}
+
+    excluded = [] if quantize_head else head_nodes(model_path)
+    if excluded:
+        print(f"Keeping {len(excluded)} detect-head nodes in FP32")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepared = os.path.join(tmp, "prepared.onnx")
+        # ONNX shape inference is enough for exported YOLO graphs; symbolic inference needs sympy
+        quant_pre_process(model_path, prepared, skip_symbolic_shape=True)
+        start = time.monotonic()
+        quantize_static(
+            prepared,
+            output,
+            ImageFolderReader(),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            calibrate_method=getattr(CalibrationMethod, method),
+            nodes_to_exclude=excluded,
+        )
+    size_fp32 = os.path.getsize(model_path) / 1e6
+    size_int8 = os.path.getsize(output) / 1e6
+    print(f"✓ Quantized model: {output} ({size_fp32:.1f} MB -> {size_int8:.1f} MB, {time.monotonic() - start:.0f}s)")
+    return output
+
+
+def _iou(a: np.ndarray, b: np.ndarray) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _severity(detections: np.ndarray) -> str:
+    return severity_level(len(detections), float(detections[:, 4].max()) if len(detections) else 0.0)
+
+
+def validate(
+    fp32_path: str,
+    int8_path: str,
+    images: str,
+    imgsz: int,
+    limit: Optional[int],
+    conf: float,
+    iou: float,
+    threads: int,
+) -> Dict:
+    """Run both models on the same images and compare boxes, confidences, severity and latency."""
+    paths = list_images(images, limit)
+    if not paths:
+        raise ValueError(f"No validation images found in {images}")
+
+    models = {
+        "fp32": OnnxRuntimeBackend(fp32_path, imgsz, intra_op_threads=threads),
+        "int8": OnnxRuntimeBackend(int8_path, imgsz, intra_op_threads=threads),
+    }
+    buffer = LetterboxBuffers(imgsz).get(1)[0]
+    latency: Dict[str, List[float]] = {name: [] for name in models}
+    boxes = {name: 0 for name in models}
+    matched = 0
+    conf_deltas: List[float] = []
+    count_mismatch: List[str] = []
+    severity_pairs: Dict[str, int] = {}
+
+    for path in paths:
+        with open(path, "rb") as fh:
+            letterbox_into(fh, buffer)
+        outputs = {}
+        for name, model in models.items():
+            start = time.perf_counter()
+            outputs[name] = model.predict([buffer], conf=conf, iou=iou)[0]
+            latency[name].append((time.perf_counter() - start) * 1000)
+            boxes[name] += len(outputs[name])
+
+        ref, cand = outputs["fp32"], outputs["int8"]
+        for r in ref:
+            best = max(((c, _iou(r, c)) for c in cand), key=lambda pair: pair[1], default=(None, 0.0))
+            if best[0] is not None and best[1] >= 0.5:
+                matched += 1
+                conf_deltas.append(float(best[0][4] - r[4]))
+        if len(ref) != len(cand):
+            count_mismatch.append(path.name)
+        pair = f"{_severity(ref)}->{_severity(cand)}"
+        severity_pairs[pair] = severity_pairs.get(pair, 0) + 1
+
+    n = len(paths)
+    same_severity = sum(v for k, v in severity_pairs.items() if k.split("->")[0] == k.split("->")[1])
+    deltas = np.asarray(conf_deltas) if conf_deltas else np.zeros(1)
+    report = {
+        "images": n,
+        "fp32Model": fp32_path,
+        "int8Model": int8_path,
+        "conf": conf,
+        "iou": iou,
+        "boxes": boxes,
+        "recallVsFp32": round(matched / boxes["fp32"], 4) if boxes["fp32"] else 1.0,
+        "imagesWithDifferentCount": len(count_mismatch),
+        "confidenceDelta": {
+            "mean": round(float(deltas.mean()), 4),
+            "meanAbs": round(float(np.abs(deltas).mean()), 4),
+            "p95Abs": round(float(np.percentile(np.abs(deltas), 95)), 4),
+        },
+        "severityAgreement": round(same_severity / n, 4),
+        "severityTransitions": dict(sorted(severity_pairs.items())),
+        "latencyMs": {
+            name: {"p50": round(float(np.percentile(v, 50)), 1), "p95": round(float(np.percentile(v, 95)), 1)}
+            for name, v in latency.items()
+        },
+        "modelSizeMb": {name: round(os.path.getsize(m.model_path) / 1e6, 2) for name, m in models.items()},
+        "mismatchedImages": count_mismatch[:50],
+    }
+    return report
+
+
+def print_report(report: Dict) -> None:
+    print("-" * 60)
+    print(f"Images: {report['images']}")
+    print(f"Boxes: fp32={report['boxes']['fp32']} int8={report['boxes']['int8']}")
+    print(f"INT8 recall vs FP32 (IoU >= 0.5): {report['recallVsFp32']:.1%}")
+    print(f"Images with a different box count: {report['imagesWithDifferentCount']}")
+    delta = report["confidenceDelta"]
+    print(f"Confidence delta: mean={delta['mean']:+.3f} |mean|={delta['meanAbs']:.3f} |p95|={delta['p95Abs']:.3f}")
+    print(f"Severity agreement: {report['severityAgreement']:.1%} {report['severityTransitions']}")
+    for name, lat in report["latencyMs"].items():
+        print(f"Latency {name}: p50={lat['p50']} ms p95={lat['p95']} ms ({report['modelSizeMb'][name]} MB)")
+    print("-" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="INT8 quantization and validation for the pothole model")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    cal = sub.add_parser("calibrate", help="Quantize the FP32 ONNX model using calibration images")
+    cal.add_argument("--model", default="models/pothole_yolov8n.onnx", help="FP32 ONNX model")
+    cal.add_argument("--images", required=True, help="Folder of representative road images")
+    cal.add_argument("--output", default=None, help="INT8 output path (default: <model>.int8.onnx)")
+    cal.add_argument("--limit", type=int, default=300, help="Maximum calibration images")
+    cal.add_argument("--method", choices=["MinMax", "Entropy", "Percentile"], default="MinMax",
+                     help="Activation range calibration method")
+    cal.add_argument("--quantize-head", action="store_true", help="Also quantize the detect head")
+
+    val = sub.add_parser("validate", help="Compare INT8 against FP32 on a folder of images")
+    val.add_argument("--model", default="models/pothole_yolov8n.onnx", help="FP32 ONNX model")
+    val.add_argument("--int8", default=None, help="INT8 model (default: <model>.int8.onnx)")
+    val.add_argument("--images", required=True, help="Folder of held-out road images")
+    val.add_argument("--limit", type=int, default=None, help="Maximum validation images")
+    val.add_argument("--report", default=None, help="Write the JSON report to this path")
+    val.add_argument("--threads", type=int, default=2, help="Intra-op threads (match Cloud Run vCPUs)")
+    val.add_argument("--conf", type=float, default=0.35, help="Confidence threshold (YOLO_CONFIDENCE_THRESHOLD)")
+    val.add_argument("--iou", type=float, default=0.7, help="NMS IoU threshold (INFERENCE_NMS_IOU)")
+    val.add_argument("--min-recall", type=float, default=0.95, help="Fail if INT8 recall vs FP32 is lower")
+
+    for p in (cal, val):
+        p.add_argument("--imgsz", type=int, default=640, help="Model input size (INFERENCE_IMGSZ)")
+
+    args = parser.parse_args()
+
+    try:
+        int8_default = resolve_model_path("onnxruntime", args.model, precision="int8")
+        if args.command == "calibrate":
+            calibrate(
+                args.model,
+                args.images,
+                args.output or int8_default,
+                args.imgsz,
+                args.limit,
+                args.method,
+                args.quantize_head,
+            )
+        else:
+            result = validate(
+                args.model,
+                args.int8 or int8_default,
+                args.images,
+                args.imgsz,
+                args.limit,
+                args.conf,
+                args.iou,
+                args.threads,
+            )
+            print_report(result)
+            if args.report:
+                with open(args.report, "w", encoding="utf-8") as fh:
+                    json.dump(result, fh, indent=2)
+                print(f"✓ Report written: {args.report}")
+            if result["recallVsFp32"] < args.min_recall:
+                print(f"INT8 recall {result['recallVsFp32']:.1%} is below --min-recall {args.min_recall:.0%}")
+                sys.exit(1)
+        sys.exit(0)
+    except Exception as e:
+        print(f"Fatal error: {str(e)}")
+        sys.exit(1)
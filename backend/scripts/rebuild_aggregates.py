@@ -0,0 +1,79 @@
+"""
+Rebuild analytics aggregates from the detections collection (initial build and drift repair).
+
+Aggregate documents are maintained incrementally by the API on every create, status update and
+delete, starting from when they are enabled. Run this once before enabling them on a deployment
+with existing detections, and whenever they drift (e.g. documents edited by hand in the console,
+or a writer running with aggregates disabled); it recomputes them from scratch.
+
+Usage:
+    python scripts/rebuild_aggregates.py --project PROJECT_ID
+
+Notes:
+- Reads only the fields needed for aggregation, paging through the collection by document ID.
+- Run with ingestion paused or during low traffic: detections written while the rebuild runs may be
+  counted twice or missed until the next rebuild.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from google.cloud import firestore
+
+# Allow `python scripts/<name>.py` from the backend/ directory
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.aggregates import AreaAggregates, DailyRollups  # noqa: E402
+
+
+def run_rebuild(
+    project_id: str,
+    collection_name: str,
+    area_collection: str,
+    daily_collection: str,
+    page_size: int = 1000,
+):
+    print(f"Rebuilding aggregates for project: {project_id}")
+    print(f"Detections collection: {collection_name}")
+    print(f"Area aggregates collection: {area_collection}")
+    print(f"Daily rollups collection: {daily_collection}")
+    print("-" * 60)
+
+    db = firestore.Client(project=project_id)
+    detections = db.collection(collection_name)
+
+    start = time.monotonic()
+    areas = AreaAggregates(db, area_collection).rebuild(detections, page_size=page_size)
+    print(f"✓ Area aggregates rebuilt: {areas} areas ({time.monotonic() - start:.1f}s)")
+
+    start = time.monotonic()
+    days = DailyRollups(db, daily_collection).rebuild(detections, page_size=page_size)
+    print(f"✓ Daily rollups rebuilt: {days} days ({time.monotonic() - start:.1f}s)")
+
+    return areas, days
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute analytics aggregates from detections")
+    parser.add_argument("--project", required=True, help="GCP Project ID")
+    parser.add_argument("--collection", default="detections", help="Firestore detections collection name")
+    parser.add_argument("--area-collection", default="area_stats", help="Area aggregates collection name")
+    parser.add_argument("--daily-collection", default="daily_stats", help="Daily rollups collection name")
+    parser.add_argument("--page-size", type=int, default=1000, help="Documents read per page")
+
+    args = parser.parse_args()
+
+    try:
+        run_rebuild(
+            args.project,
+            args.collection,
+            args.area_collection,
+            args.daily_collection,
+            args.page_size,
+        )
+        sys.exit(0)
+    except Exception as e:
+        print(f"Fatal error: {str(e)}")
+        sys.exit(1)
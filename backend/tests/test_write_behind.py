@@ -0,0 +1,165 @@
+import asyncio
+import threading
+from typing import List
+
+import pytest
+
+from app.write_behind import WriteBehindFull, WriteBehindQueue
+
+
+def _queue(flush_fn, **kwargs) -> WriteBehindQueue:
+    options = dict(batch_size=10, max_delay_ms=5, retry_base_s=0.01, retry_max_s=0.02, enqueue_timeout_s=1.0)
+    options.update(kwargs)
+    return WriteBehindQueue(flush_fn, **options)
+
+
+def test_flushes_in_batches_and_reports_written():
+    batches: List[List[str]] = []
+    flushed: List[str] = []
+
+    async def run():
+        queue = _queue(lambda items: batches.append(list(items)) or [True] * len(items), on_flushed=flushed.extend)
+        for i in range(25):
+            await queue.put(f"k{i}", f"v{i}")
+        assert queue.get("k0") == "v0"
+        assert await queue.wait_flushed("k24") is True
+        await queue.close()
+        return queue
+
+    queue = asyncio.run(run())
+    assert [item for batch in batches for item in batch] == [f"v{i}" for i in range(25)]
+    assert all(len(batch) <= 10 for batch in batches)
+    assert sorted(flushed) == sorted(f"v{i}" for i in range(25))
+    assert queue.get("k0") is None
+    assert queue.stats.flushed == 25 and queue.stats.dropped == 0
+
+
+def test_failed_items_are_retried_ahead_of_newer_ones():
+    calls: List[List[str]] = []
+
+    def flush(items):
+        calls.append(list(items))
+        # "a" fails on its first flush only; everything else is written
+        return [not (item == "a" and len(calls) == 1) for item in items]
+
+    async def run():
+        queue = _queue(flush)
+        await queue.put("a", "a")
+        await queue.put("b", "b")
+        assert await queue.wait_flushed("a") is True
+        await queue.put("c", "c")
+        await queue.close()
+        return queue
+
+    queue = asyncio.run(run())
+    assert calls[0] == ["a", "b"]
+    assert calls[1][0] == "a"
+    assert sum(batch.count("a") for batch in calls) == 2
+    assert queue.stats.retries == 1 and queue.stats.flushed == 3
+
+
+def test_flush_that_raises_retries_every_item():
+    attempts = {"n": 0}
+
+    def flush(items):
+        attempts["n"] += 1
+        if attempts["n"] == 1:
+            raise RuntimeError("commit timed out")
+        return [True] * len(items)
+
+    async def run():
+        queue = _queue(flush)
+        await queue.put("a", "a")
+        await queue.put("b", "b")
+        assert await queue.wait_flushed("b") is True
+        await queue.close()
+        return queue
+
+    queue = asyncio.run(run())
+    assert attempts["n"] == 2
+    assert queue.stats.retries == 2 and queue.stats.flushed == 2
+
+
+def test_items_are_dropped_after_max_attempts():
+    dropped: List[str] = []
+    calls = {"n": 0}
+
+    def flush(items):
+        calls["n"] += 1
+        return [False] * len(items)
+
+    async def run():
+        queue = _queue(flush, max_attempts=3, on_dropped=dropped.extend)
+        await queue.put("a", "a")
+        assert await queue.wait_flushed("a") is False
+        await queue.close()
+        return queue
+
+    queue = asyncio.run(run())
+    assert calls["n"] == 3
+    assert dropped == ["a"]
+    assert queue.stats.dropped == 1 and queue.stats.flushed == 0
+    assert len(queue) == 0
+
+
+def test_put_rejects_when_full_for_the_enqueue_timeout():
+    release = threading.Event()
+
+    def flush(items):
+        release.wait(5)
+        return [True] * len(items)
+
+    async def run():
+        queue = _queue(flush, max_pending=2, batch_size=1, max_delay_ms=0, enqueue_timeout_s=0.05)
+        await queue.put("a", "a")
+        await asyncio.sleep(0.02)  # "a" is in flight, blocked in flush
+        await queue.put("b", "b")
+        await queue.put("c", "c")
+        with pytest.raises(WriteBehindFull):
+            await queue.put("d", "d")
+        assert queue.stats.rejected == 1
+        release.set()
+        await queue.close()
+        return queue
+
+    queue = asyncio.run(run())
+    assert queue.stats.flushed == 3
+
+
+def test_put_waits_for_room_instead_of_failing():
+    release = threading.Event()
+
+    def flush(items):
+        release.wait(5)
+        return [True] * len(items)
+
+    async def run():
+        queue = _queue(flush, max_pending=1, batch_size=1, max_delay_ms=0, enqueue_timeout_s=2.0)
+        await queue.put("a", "a")
+        await asyncio.sleep(0.02)
+        await queue.put("b", "b")
+        waiter = asyncio.ensure_future(queue.put("c", "c"))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        release.set()
+        await waiter
+        await queue.close()
+        return queue
+
+    queue = asyncio.run(run())
+    assert queue.stats.rejected == 0 and queue.stats.flushed == 3
+
+
+def test_close_flushes_what_is_queued():
+    written: List[str] = []
+
+    async def run():
+        queue = _queue(lambda items: written.extend(items) or [True] * len(items), batch_size=100, max_delay_ms=10_000)
+        for i in range(5):
+            await queue.put(f"k{i}", f"v{i}")
+        await queue.close(timeout_s=2.0)
+        with pytest.raises(WriteBehindFull):
+            await queue.put("late", "late")
+
+    asyncio.run(run())
+    assert written == [f"v{i}" for i in range(5)]